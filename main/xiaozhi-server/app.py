@@ -9,6 +9,7 @@ from core.utils.util import get_local_ip, validate_mcp_endpoint
 from core.http_server import SimpleHttpServer
 from core.websocket_server import WebSocketServer
 from core.utils.util import check_ffmpeg_installed
+from core.supervisor import Supervisor, get_worker_count, multiprocess_supported
 
 TAG = __name__
 logger = setup_logging()
@@ -42,7 +43,8 @@ async def monitor_stdin():
         await ainput()  # 异步等待输入，消费回车
 
 
-async def main():
+def prepare_config() -> dict:
+    """加载配置并补全auth_key、mcp接入点，多进程模式下在fork之前调用，各工作进程使用同一份配置"""
     check_ffmpeg_installed()
     config = load_config()
 
@@ -60,16 +62,21 @@ async def main():
     
     config["server"]["auth_key"] = auth_key
 
-    # 添加 stdin 监控任务
-    stdin_task = asyncio.create_task(monitor_stdin())
+    mcp_endpoint = config.get("mcp_endpoint", None)
+    if mcp_endpoint is not None and "你" not in mcp_endpoint:
+        # 校验MCP接入点格式
+        if validate_mcp_endpoint(mcp_endpoint):
+            logger.bind(tag=TAG).info("mcp接入点是\t{}", mcp_endpoint)
+            # 将mcp计入点地址转成调用点
+            mcp_endpoint = mcp_endpoint.replace("/mcp/", "/call/")
+            config["mcp_endpoint"] = mcp_endpoint
+        else:
+            logger.bind(tag=TAG).error("mcp接入点不符合规范")
+            config["mcp_endpoint"] = "你的接入点 websocket地址"
+    return config
 
-    # 启动 WebSocket 服务器
-    ws_server = WebSocketServer(config)
-    ws_task = asyncio.create_task(ws_server.start())
-    # 启动 Simple http 服务器
-    ota_server = SimpleHttpServer(config)
-    ota_task = asyncio.create_task(ota_server.start())
 
+def log_server_addresses(config: dict) -> None:
     read_config_from_api = config.get("read_config_from_api", False)
     port = int(config["server"].get("http_port", 8003))
     if not read_config_from_api:
@@ -83,18 +90,6 @@ async def main():
         get_local_ip(),
         port,
     )
-    mcp_endpoint = config.get("mcp_endpoint", None)
-    if mcp_endpoint is not None and "你" not in mcp_endpoint:
-        # 校验MCP接入点格式
-        if validate_mcp_endpoint(mcp_endpoint):
-            logger.bind(tag=TAG).info("mcp接入点是\t{}", mcp_endpoint)
-            # 将mcp计入点地址转成调用点
-            mcp_endpoint = mcp_endpoint.replace("/mcp/", "/call/")
-            config["mcp_endpoint"] = mcp_endpoint
-        else:
-            logger.bind(tag=TAG).error("mcp接入点不符合规范")
-            config["mcp_endpoint"] = "你的接入点 websocket地址"
-
     # 获取WebSocket配置，使用安全的默认值
     websocket_port = 8000
     server_config = config.get("server", {})
@@ -117,6 +112,20 @@ async def main():
         "=============================================================\n"
     )
 
+
+async def main(config: dict):
+    # 添加 stdin 监控任务
+    stdin_task = asyncio.create_task(monitor_stdin())
+
+    # 启动 WebSocket 服务器
+    ws_server = WebSocketServer(config)
+    ws_task = asyncio.create_task(ws_server.start())
+    # 启动 Simple http 服务器
+    ota_server = SimpleHttpServer(config)
+    ota_task = asyncio.create_task(ota_server.start())
+
+    log_server_addresses(config)
+
     try:
         await wait_for_exit()  # 阻塞直到收到退出信号
     except asyncio.CancelledError:
@@ -138,7 +147,16 @@ async def main():
 
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        print("手动中断，程序终止。")
+    config = prepare_config()
+    workers = get_worker_count(config)
+    if workers > 1 and multiprocess_supported():
+        # 多进程模式：主进程加载共享模型后fork出工作进程，各进程监听同一端口
+        log_server_addresses(config)
+        Supervisor(config, workers).run()
+    else:
+        if workers > 1:
+            logger.bind(tag=TAG).warning("当前系统不支持多进程模式，以单进程运行")
+        try:
+            asyncio.run(main(config))
+        except KeyboardInterrupt:
+            print("手动中断，程序终止。")
@@ -24,9 +24,7 @@ from core.utils.modules_initialize import (
     initialize_tts,
     initialize_asr,
 )
-from core.handle.reportHandle import report
 from core.providers.tts.default import DefaultTTS
-from concurrent.futures import ThreadPoolExecutor
 from core.utils.dialogue import Message, Dialogue
 from core.providers.asr.dto.dto import InterfaceType
 from core.handle.textHandle import handleTextMessage
@@ -39,8 +37,10 @@ from core.providers.tts.dto.dto import ContentType, TTSMessageDTO, SentenceType
 from config.logger import setup_logging, build_module_string, create_connection_logger
 from config.manage_api_client import DeviceNotFoundException, DeviceBindException
 from core.utils.prompt_manager import PromptManager
+from core.utils.worker_pools import get_worker_pool
 from core.utils.voiceprint_provider import VoiceprintProvider
 from core.utils import textUtils
+from core.utils.audio_buffer import PCMRingBuffer, PCMTimeline
 
 TAG = __name__
 
@@ -90,11 +90,9 @@ class ConnectionHandler:
         # 线程任务相关
         self.loop = asyncio.get_event_loop()
         self.stop_event = threading.Event()
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        # 组件初始化完成后在事件循环中调用，由服务器设置，用于连接准入控制
+        self.on_initialized = None
 
-        # 添加上报线程池
-        self.report_queue = queue.Queue()
-        self.report_thread = None
         # 未来可以通过修改此处，调节asr的上报和tts的上报，目前默认都开启
         self.report_asr_enable = self.read_config_from_api
         self.report_tts_enable = self.read_config_from_api
@@ -113,7 +111,9 @@ class ConnectionHandler:
         self.voiceprint_provider = None
 
         # vad相关变量
-        self.client_audio_buffer = bytearray()
+        self.client_audio_buffer = PCMRingBuffer()
+        # VAD对当前opus包的解码结果
+        self.client_pcm_frame = None
         self.client_have_voice = False
         self.client_voice_window = deque(maxlen=5)
         self.last_activity_time = 0.0  # 统一的活动时间戳（毫秒）
@@ -124,7 +124,15 @@ class ConnectionHandler:
         # 因为实际部署时可能会用到公共的本地ASR，不能把变量暴露给公共ASR
         # 所以涉及到ASR的变量，需要在这里定义，属于connection的私有变量
         self.asr_audio = []
-        self.asr_audio_queue = queue.Queue()
+        # 未检测到语音时只保留最近的若干个opus包，作为语音开始前的预录音
+        self.asr_audio_preroll = deque(maxlen=10)
+        # 与asr_audio对应的已解码PCM，避免ASR和声纹识别重复解码
+        self.asr_pcm_timeline = PCMTimeline(preroll_packets=10)
+        # 边说边识别的中间结果
+        self.asr_partial = None
+        self.asr_partial_last_voice = False
+        self.asr_audio_queue = asyncio.Queue()
+        self.asr_priority_task = None
 
         # llm相关变量
         self.llm_finish_task = True
@@ -198,7 +206,7 @@ class ConnectionHandler:
             # 获取差异化配置
             self._initialize_private_config()
             # 异步初始化
-            self.executor.submit(self._initialize_components)
+            self.submit_task("init", self._initialize_components)
 
             try:
                 async for message in self.websocket:
@@ -275,7 +283,7 @@ class ConnectionHandler:
                     return
 
             # 不需要头部处理或没有头部时，直接处理原始消息
-            self.asr_audio_queue.put(message)
+            self.asr_audio_queue.put_nowait(message)
 
     async def _process_mqtt_audio_message(self, message):
         """
@@ -302,7 +310,7 @@ class ConnectionHandler:
             elif len(message) > 16:
                 # 没有指定长度或长度无效，去掉头部后处理剩余数据
                 audio_data = message[16:]
-                self.asr_audio_queue.put(audio_data)
+                self.asr_audio_queue.put_nowait(audio_data)
                 return True
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"解析WebSocket音频包失败: {e}")
@@ -320,7 +328,7 @@ class ConnectionHandler:
 
         # 如果时间戳是递增的，直接处理
         if timestamp >= self.last_processed_timestamp:
-            self.asr_audio_queue.put(audio_data)
+            self.asr_audio_queue.put_nowait(audio_data)
             self.last_processed_timestamp = timestamp
 
             # 处理缓冲区中的后续包
@@ -330,7 +338,7 @@ class ConnectionHandler:
                 for ts in sorted(self.audio_timestamp_buffer.keys()):
                     if ts > self.last_processed_timestamp:
                         buffered_audio = self.audio_timestamp_buffer.pop(ts)
-                        self.asr_audio_queue.put(buffered_audio)
+                        self.asr_audio_queue.put_nowait(buffered_audio)
                         self.last_processed_timestamp = ts
                         processed_any = True
                         break
@@ -339,7 +347,7 @@ class ConnectionHandler:
             if len(self.audio_timestamp_buffer) < self.max_timestamp_buffer_size:
                 self.audio_timestamp_buffer[timestamp] = audio_data
             else:
-                self.asr_audio_queue.put(audio_data)
+                self.asr_audio_queue.put_nowait(audio_data)
 
     async def handle_restart(self, message):
         """处理服务器重启请求"""
@@ -430,13 +438,14 @@ class ConnectionHandler:
             self._initialize_memory()
             """加载意图识别"""
             self._initialize_intent()
-            """初始化上报线程"""
-            self._init_report_threads()
             """更新系统提示词"""
             self._init_prompt_enhancement()
 
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"实例化组件失败: {e}")
+        finally:
+            if self.on_initialized:
+                self.loop.call_soon_threadsafe(self.on_initialized)
 
     def _init_prompt_enhancement(self):
         # 更新上下文信息
@@ -448,19 +457,6 @@ class ConnectionHandler:
             self.change_system_prompt(enhanced_prompt)
             self.logger.bind(tag=TAG).info("系统提示词已增强更新")
 
-    def _init_report_threads(self):
-        """初始化ASR和TTS上报线程"""
-        if not self.read_config_from_api or self.need_bind:
-            return
-        if self.chat_history_conf == 0:
-            return
-        if self.report_thread is None or not self.report_thread.is_alive():
-            self.report_thread = threading.Thread(
-                target=self._report_worker, daemon=True
-            )
-            self.report_thread.start()
-            self.logger.bind(tag=TAG).info("TTS上报线程已启动")
-
     def _initialize_tts(self):
         """初始化TTS"""
         tts = None
@@ -946,39 +942,11 @@ class ConnectionHandler:
         else:
             pass
 
-    def _report_worker(self):
-        """聊天记录上报工作线程"""
-        while not self.stop_event.is_set():
-            try:
-                # 从队列获取数据，设置超时以便定期检查停止事件
-                item = self.report_queue.get(timeout=1)
-                if item is None:  # 检测毒丸对象
-                    break
-                try:
-                    # 检查线程池状态
-                    if self.executor is None:
-                        continue
-                    # 提交任务到线程池
-                    self.executor.submit(self._process_report, *item)
-                except Exception as e:
-                    self.logger.bind(tag=TAG).error(f"聊天记录上报线程异常: {e}")
-            except queue.Empty:
-                continue
-            except Exception as e:
-                self.logger.bind(tag=TAG).error(f"聊天记录上报工作线程异常: {e}")
-
-        self.logger.bind(tag=TAG).info("聊天记录上报线程已退出")
-
-    def _process_report(self, type, text, audio_data, report_time):
-        """处理上报任务"""
-        try:
-            # 执行上报（传入二进制数据）
-            report(self, type, text, audio_data, report_time)
-        except Exception as e:
-            self.logger.bind(tag=TAG).error(f"上报处理异常: {e}")
-        finally:
-            # 标记任务完成
-            self.report_queue.task_done()
+    def submit_task(self, pool_name, fn, *args):
+        """把阻塞任务提交到服务器级的命名线程池（llm、tool、report、init），按设备公平调度"""
+        return get_worker_pool(pool_name, self.config).submit(
+            self.device_id or self.session_id, fn, *args
+        )
 
     def clearSpeakStatus(self):
         self.client_is_speaking = False
@@ -1000,6 +968,19 @@ class ConnectionHandler:
                     pass
                 self.timeout_task = None
 
+            # 停止ASR音频处理任务（在该任务中调用close时由stop_event结束循环）
+            if (
+                self.asr_priority_task
+                and not self.asr_priority_task.done()
+                and self.asr_priority_task is not asyncio.current_task()
+            ):
+                self.asr_priority_task.cancel()
+                try:
+                    await self.asr_priority_task
+                except asyncio.CancelledError:
+                    pass
+                self.asr_priority_task = None
+
             # 清理工具处理器资源
             if hasattr(self, "func_handler") and self.func_handler:
                 try:
@@ -1013,6 +994,10 @@ class ConnectionHandler:
             if self.stop_event:
                 self.stop_event.set()
 
+            # 停止TTS文本处理和音频播放任务
+            if self.tts:
+                self.tts.stop_audio_channels()
+
             # 清空任务队列
             self.clear_queues()
 
@@ -1055,16 +1040,6 @@ class ConnectionHandler:
             if self.tts:
                 await self.tts.close()
 
-            # 最后关闭线程池（避免阻塞）
-            if self.executor:
-                try:
-                    self.executor.shutdown(wait=False)
-                except Exception as executor_error:
-                    self.logger.bind(tag=TAG).error(
-                        f"关闭线程池时出错: {executor_error}"
-                    )
-                self.executor = None
-
             self.logger.bind(tag=TAG).info("连接资源已释放")
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"关闭连接时出错: {e}")
@@ -1080,11 +1055,14 @@ class ConnectionHandler:
                 f"开始清理: TTS队列大小={self.tts.tts_text_queue.qsize()}, 音频队列大小={self.tts.tts_audio_queue.qsize()}"
             )
 
+            # 并行合成流水线中已提交但尚未播放的段
+            if getattr(self.tts, "synthesis_pipeline", None) is not None:
+                self.tts.synthesis_pipeline.clear()
+
             # 使用非阻塞方式清空队列
             for q in [
                 self.tts.tts_text_queue,
                 self.tts.tts_audio_queue,
-                self.report_queue,
             ]:
                 if not q:
                     continue
@@ -1099,7 +1077,7 @@ class ConnectionHandler:
             )
 
     def reset_vad_states(self):
-        self.client_audio_buffer = bytearray()
+        self.client_audio_buffer.clear()
         self.client_have_voice = False
         self.client_voice_stop = False
         self.logger.bind(tag=TAG).debug("VAD states reset.")
@@ -112,7 +112,7 @@ async def process_intent_result(conn, intent_result, original_text):
                     response = conn.intent.replyResult(context_prompt, original_text)
                     speak_txt(conn, response)
                 
-                conn.executor.submit(process_context_result)
+                conn.submit_task("llm", process_context_result)
                 return True
 
             function_args = {}
@@ -133,7 +133,7 @@ async def process_intent_result(conn, intent_result, original_text):
             await send_stt_message(conn, original_text)
             conn.client_abort = False
 
-            # 使用executor执行函数调用和结果处理
+            # 在工具线程池中执行函数调用和结果处理
             def process_function_call():
                 conn.dialogue.put(Message(role="user", content=original_text))
 
@@ -179,8 +179,8 @@ async def process_intent_result(conn, intent_result, original_text):
                         if text is not None:
                             speak_txt(conn, text)
 
-            # 将函数执行放在线程池中
-            conn.executor.submit(process_function_call)
+            # 将函数执行放在工具线程池中
+            conn.submit_task("tool", process_function_call)
             return True
         return False
     except json.JSONDecodeError as e:
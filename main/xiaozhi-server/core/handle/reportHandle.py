@@ -1,12 +1,8 @@
 """
-TTS上报功能已集成到ConnectionHandler类中。
+聊天记录上报
 
-上报功能包括：
-1. 每个连接对象拥有自己的上报队列和处理线程
-2. 上报线程的生命周期与连接对象绑定
-3. 使用ConnectionHandler.enqueue_tts_report方法进行上报
-
-具体实现请参考core/connection.py中的相关代码。
+enqueue_asr_report和enqueue_tts_report把上报任务提交到服务器级的report线程池，
+同一设备的上报按顺序执行，不再为每个连接创建上报线程。
 """
 
 import time
@@ -106,16 +102,20 @@ def enqueue_tts_report(conn, text, opus_data):
         opus_data: opus音频数据
     """
     try:
-        # 使用连接对象的队列，传入文本和二进制数据而非文件路径
+        # 提交到上报线程池，传入文本和二进制数据而非文件路径
         if conn.chat_history_conf == 2:
-            conn.report_queue.put((2, text, opus_data, int(time.time())))
+            conn.submit_task(
+                "report", report, conn, 2, text, opus_data, int(time.time())
+            )
             conn.logger.bind(tag=TAG).debug(
-                f"TTS数据已加入上报队列: {conn.device_id}, 音频大小: {len(opus_data)} "
+                f"TTS数据已提交上报: {conn.device_id}, 音频大小: {len(opus_data)} "
             )
         else:
-            conn.report_queue.put((2, text, None, int(time.time())))
+            conn.submit_task(
+                "report", report, conn, 2, text, None, int(time.time())
+            )
             conn.logger.bind(tag=TAG).debug(
-                f"TTS数据已加入上报队列: {conn.device_id}, 不上报音频"
+                f"TTS数据已提交上报: {conn.device_id}, 不上报音频"
             )
     except Exception as e:
         conn.logger.bind(tag=TAG).error(f"加入TTS上报队列失败: {text}, {e}")
@@ -134,16 +134,20 @@ def enqueue_asr_report(conn, text, opus_data):
         opus_data: opus音频数据
     """
     try:
-        # 使用连接对象的队列，传入文本和二进制数据而非文件路径
+        # 提交到上报线程池，传入文本和二进制数据而非文件路径
         if conn.chat_history_conf == 2:
-            conn.report_queue.put((1, text, opus_data, int(time.time())))
+            conn.submit_task(
+                "report", report, conn, 1, text, opus_data, int(time.time())
+            )
             conn.logger.bind(tag=TAG).debug(
-                f"ASR数据已加入上报队列: {conn.device_id}, 音频大小: {len(opus_data)} "
+                f"ASR数据已提交上报: {conn.device_id}, 音频大小: {len(opus_data)} "
             )
         else:
-            conn.report_queue.put((1, text, None, int(time.time())))
+            conn.submit_task(
+                "report", report, conn, 1, text, None, int(time.time())
+            )
             conn.logger.bind(tag=TAG).debug(
-                f"ASR数据已加入上报队列: {conn.device_id}, 不上报音频"
+                f"ASR数据已提交上报: {conn.device_id}, 不上报音频"
             )
     except Exception as e:
         conn.logger.bind(tag=TAG).debug(f"加入ASR上报队列失败: {text}, {e}")
@@ -2,7 +2,7 @@ import json
 import time
 import asyncio
 from core.utils import textUtils
-from core.utils.util import audio_to_data
+from core.utils.audio_assets import get_audio_frames
 from core.providers.tts.dto.dto import SentenceType
 
 TAG = __name__
@@ -214,7 +214,7 @@ async def send_tts_message(conn, state, text=None):
             stop_tts_notify_voice = conn.config.get(
                 "stop_tts_notify_voice", "config/assets/tts_notify.mp3"
             )
-            audios = audio_to_data(stop_tts_notify_voice, is_opus=True)
+            audios = get_audio_frames(stop_tts_notify_voice, is_opus=True)
             await sendAudio(conn, audios)
         # 清除服务端讲话状态
         conn.clearSpeakStatus()
@@ -29,11 +29,13 @@ class ListenTextMessageHandler(TextMessageHandler):
         elif msg_json["state"] == "stop":
             conn.client_have_voice = True
             conn.client_voice_stop = True
-            if len(conn.asr_audio) > 0:
+            if len(conn.asr_audio) > 0 or len(conn.asr_audio_preroll) > 0:
                 await handleAudioMessage(conn, b"")
         elif msg_json["state"] == "detect":
             conn.client_have_voice = False
             conn.asr_audio.clear()
+            conn.asr_audio_preroll.clear()
+            conn.asr_pcm_timeline.clear()
             if "text" in msg_json:
                 conn.last_activity_time = time.time() * 1000
                 original_text = msg_json["text"]  # 保留原始文本
@@ -8,8 +8,10 @@ TAG = __name__
 
 
 class SimpleHttpServer:
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, reuse_port: bool = False):
         self.config = config
+        # 多进程模式下各工作进程通过SO_REUSEPORT监听同一端口
+        self.reuse_port = reuse_port
         self.logger = setup_logging()
         self.ota_handler = OTAHandler(config)
         self.vision_handler = VisionHandler(config)
@@ -62,7 +64,7 @@ class SimpleHttpServer:
             # 运行服务
             runner = web.AppRunner(app)
             await runner.setup()
-            site = web.TCPSite(runner, host, port)
+            site = web.TCPSite(runner, host, port, reuse_port=self.reuse_port)
             await site.start()
 
             # 保持服务运行
@@ -12,6 +12,7 @@ from urllib import parse
 import time
 from datetime import datetime
 from config.logger import setup_logging
+from core.utils.token_cache import TOKEN_REQUEST_TIMEOUT, get_access_token
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
 
@@ -75,7 +76,7 @@ class AccessToken:
         )
         # print('url: %s' % full_url)
         # 提交HTTP GET请求
-        response = requests.get(full_url)
+        response = requests.get(full_url, timeout=TOKEN_REQUEST_TIMEOUT)
         if response.ok:
             root_obj = response.json()
             key = "Token"
@@ -118,8 +119,11 @@ class ASRProvider(ASRProviderBase):
     def _refresh_token(self):
         """刷新Token并记录过期时间"""
         if self.access_key_id and self.access_key_secret:
-            self.token, expire_time_str = AccessToken.create_token(
-                self.access_key_id, self.access_key_secret
+            self.token, expire_time_str = get_access_token(
+                "aliyun",
+                self.access_key_id,
+                self.access_key_secret,
+                AccessToken.create_token,
             )
             if not expire_time_str:
                 raise ValueError("无法获取有效的Token过期时间")
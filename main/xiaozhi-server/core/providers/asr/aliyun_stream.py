@@ -10,11 +10,14 @@ import websockets
 import opuslib_next
 import random
 from typing import Optional, Tuple, List
+from functools import partial
 from urllib import parse
 from datetime import datetime
 from config.logger import setup_logging
+from core.utils.token_cache import TOKEN_REQUEST_TIMEOUT, get_access_token
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.ws_pool import get_ws_pool
 
 TAG = __name__
 logger = setup_logging()
@@ -58,7 +61,7 @@ class AccessToken:
         signature = base64.b64encode(secreted_string)
         signature = AccessToken._encode_text(signature)
         full_url = "http://nls-meta.cn-shanghai.aliyuncs.com/?Signature=%s&%s" % (signature, query_string)
-        response = requests.get(full_url)
+        response = requests.get(full_url, timeout=TOKEN_REQUEST_TIMEOUT)
         if response.ok:
             root_obj = response.json()
             if "Token" in root_obj:
@@ -66,7 +69,33 @@ class AccessToken:
         return None, None
 
 
+async def _connect(ws_url, access_key_id, access_key_secret, token):
+    """建立到ASR服务的WebSocket连接，由共享连接池长期持有，只依赖服务配置
+
+    使用AccessKey时从进程级缓存取Token，缓存会在过期前刷新。
+    """
+    if access_key_id and access_key_secret:
+        # 缓存未命中或正在刷新时会阻塞在HTTP请求上，放到线程中执行
+        token, _ = await asyncio.to_thread(
+            get_access_token,
+            "aliyun",
+            access_key_id,
+            access_key_secret,
+            AccessToken.create_token,
+        )
+    return await websockets.connect(
+        ws_url,
+        additional_headers={"X-NLS-Token": token},
+        max_size=1000000000,
+        ping_interval=None,
+        ping_timeout=None,
+        close_timeout=5,
+    )
+
+
 class ASRProvider(ASRProviderBase):
+    blocking_recognition = False
+
     def __init__(self, config, delete_audio_file):
         super().__init__()
         self.interface_type = InterfaceType.STREAM
@@ -102,9 +131,28 @@ class ASRProvider(ASRProviderBase):
         elif not self.token:
             raise ValueError("必须提供access_key_id+access_key_secret或者直接提供token")
 
+        # 同一账号的所有设备共享预连接池
+        self.ws_pool = get_ws_pool(
+            ("aliyun_stream", self.ws_url, self.appkey, self.access_key_id or self.token),
+            "aliyun_stream",
+            partial(
+                _connect,
+                self.ws_url,
+                self.access_key_id,
+                self.access_key_secret,
+                self.token,
+            ),
+            config,
+        )
+
     def _refresh_token(self):
         """刷新Token"""
-        self.token, expire_time_str = AccessToken.create_token(self.access_key_id, self.access_key_secret)
+        self.token, expire_time_str = get_access_token(
+            "aliyun",
+            self.access_key_id,
+            self.access_key_secret,
+            AccessToken.create_token,
+        )
         if not self.token:
             raise ValueError("无法获取有效的访问Token")
         
@@ -124,6 +172,7 @@ class ASRProvider(ASRProviderBase):
 
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
+        self.ws_pool.touch()
 
     async def receive_audio(self, conn, audio, audio_have_voice):
         # 初始化音频缓存
@@ -134,8 +183,7 @@ class ASRProvider(ASRProviderBase):
         if audio:
             conn.asr_audio_for_voiceprint.append(audio)
         
-        conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio_preroll.append(audio)
 
         # 只在有声音且没有连接时建立连接
         if audio_have_voice and not self.is_processing:
@@ -156,19 +204,8 @@ class ASRProvider(ASRProviderBase):
 
     async def _start_recognition(self, conn):
         """开始识别会话"""
-        if self._is_token_expired():
-            self._refresh_token()
-        
-        # 建立连接
-        headers = {"X-NLS-Token": self.token}
-        self.asr_ws = await websockets.connect(
-            self.ws_url,
-            additional_headers=headers,
-            max_size=1000000000,
-            ping_interval=None,
-            ping_timeout=None,
-            close_timeout=5,
-        )
+        # 从预连接池取出已建立的连接
+        self.asr_ws = await self.ws_pool.acquire()
         
         self.is_processing = True
         self.server_ready = False  # 重置服务器准备状态
@@ -228,8 +265,8 @@ class ASRProvider(ASRProviderBase):
                         logger.bind(tag=TAG).info("服务器已准备，开始发送缓存音频...")
                         
                         # 发送缓存音频
-                        if conn.asr_audio:
-                            for cached_audio in conn.asr_audio[-10:]:
+                        if conn.asr_audio_preroll:
+                            for cached_audio in list(conn.asr_audio_preroll):
                                 try:
                                     pcm_frame = self.decoder.decode(cached_audio, 960)
                                     await self.asr_ws.send(pcm_frame)
@@ -4,52 +4,60 @@ import wave
 import uuid
 import json
 import time
-import queue
 import asyncio
 import traceback
-import threading
 import opuslib_next
-import concurrent.futures
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
 from core.utils.util import remove_punctuation_and_length
+from core.utils.asr_executor import get_asr_executor, get_voiceprint_executor
 from core.handle.receiveAudioHandle import handleAudioMessage
 
 TAG = __name__
 logger = setup_logging()
 
 
+class PartialHypothesis:
+    """边说边识别的中间结果：识别任务及其覆盖的PCM范围"""
+
+    def __init__(self, generation: int, length: int, task: asyncio.Task):
+        self.generation = generation
+        self.length = length
+        self.task = task
+
+
 class ASRProviderBase(ABC):
+    # 是否实现了recognize_pcm，支持边说边识别的本地ASR设置为True
+    supports_partial = False
+    # speech_to_text内部是否含有阻塞调用（本地模型、同步SDK），含有时放到识别工作线程执行，
+    # 完全异步的实现设置为False，直接在连接的事件循环中等待
+    blocking_recognition = True
+
     def __init__(self):
-        pass
+        # 边说边识别，只有supports_partial为True的ASR才会生效
+        self.streaming_partial = False
+        # 持续说话时每隔多久重新识别一次，0表示只在说话停顿时识别
+        self.partial_interval_ms = 0
 
     # 打开音频通道
     async def open_audio_channels(self, conn):
-        conn.asr_priority_thread = threading.Thread(
-            target=self.asr_text_priority_thread, args=(conn,), daemon=True
-        )
-        conn.asr_priority_thread.start()
+        conn.asr_priority_task = asyncio.create_task(self.asr_audio_consumer(conn))
 
-    # 有序处理ASR音频
-    def asr_text_priority_thread(self, conn):
+    # 在事件循环中按到达顺序处理ASR音频
+    async def asr_audio_consumer(self, conn):
         while not conn.stop_event.is_set():
+            message = await conn.asr_audio_queue.get()
             try:
-                message = conn.asr_audio_queue.get(timeout=1)
-                future = asyncio.run_coroutine_threadsafe(
-                    handleAudioMessage(conn, message),
-                    conn.loop,
-                )
-                future.result()
-            except queue.Empty:
-                continue
+                await handleAudioMessage(conn, message)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理ASR文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
-                continue
 
     # 接收音频
     async def receive_audio(self, conn, audio, audio_have_voice):
@@ -58,93 +66,210 @@ class ASRProviderBase(ABC):
         else:
             have_voice = conn.client_have_voice
         
-        conn.asr_audio.append(audio)
+        # VAD已经解码过的PCM，空包（如手动模式的结束信号）不对应任何PCM
+        track_pcm = bool(audio) and conn.audio_format != "pcm"
+        pcm_frame = conn.client_pcm_frame if track_pcm else None
+
         if not have_voice and not conn.client_have_voice:
-            conn.asr_audio = conn.asr_audio[-10:]
+            # 没有语音时只放入定长的预录音队列，不再反复切片重建列表
+            conn.asr_audio_preroll.append(audio)
+            if track_pcm:
+                conn.asr_pcm_timeline.push_preroll(pcm_frame)
             return
+        if conn.asr_audio_preroll:
+            conn.asr_audio.extend(conn.asr_audio_preroll)
+            conn.asr_audio_preroll.clear()
+        conn.asr_audio.append(audio)
+        if track_pcm:
+            conn.asr_pcm_timeline.append(pcm_frame)
+            if self.streaming_partial and self.supports_partial:
+                self._update_partial(conn, bool(audio_have_voice))
 
         if conn.client_voice_stop:
             asr_audio_task = conn.asr_audio.copy()
             conn.asr_audio.clear()
+            partial_task = self._take_partial(conn)
+            pcm_view = conn.asr_pcm_timeline.take()
             conn.reset_vad_states()
 
             if len(asr_audio_task) > 15 or conn.client_listen_mode == "manual":
-                await self.handle_voice_stop(conn, asr_audio_task)
+                await self.handle_voice_stop(
+                    conn, asr_audio_task, pcm_view, partial_task
+                )
+            elif partial_task is not None:
+                partial_task.cancel()
+
+    def load_partial_config(self, config: dict):
+        """读取边说边识别的配置，supports_partial为True的ASR在初始化时调用"""
+        streaming_partial = config.get("streaming_partial", False)
+        self.streaming_partial = str(streaming_partial).lower() in ("true", "1", "yes")
+        partial_interval_ms = config.get("partial_interval_ms", 0)
+        self.partial_interval_ms = int(partial_interval_ms) if partial_interval_ms else 0
+
+    def _update_partial(self, conn, audio_have_voice: bool):
+        """在说话停顿或达到间隔时，用截至目前的音频提前识别，保留最新的中间结果"""
+        timeline = conn.asr_pcm_timeline
+        if audio_have_voice:
+            timeline.mark_voiced()
+        pause_onset = conn.asr_partial_last_voice and not audio_have_voice
+        conn.asr_partial_last_voice = audio_have_voice
+
+        partial = conn.asr_partial
+        if partial is not None and partial.generation != timeline.generation:
+            partial.task.cancel()
+            partial = conn.asr_partial = None
+        covered = partial.length if partial is not None else 0
+        # 按音频时长计算间隔，16kHz 16位单声道每毫秒32字节
+        interval_due = (
+            audio_have_voice
+            and self.partial_interval_ms > 0
+            and len(timeline) - covered >= self.partial_interval_ms * 32
+        )
+        if not (pause_onset or interval_due) or not timeline.complete:
+            return
+        if len(timeline) <= covered:
+            return
+
+        if partial is not None and not partial.task.done():
+            partial.task.cancel()
+        pcm_data = timeline.snapshot()
+        task = asyncio.create_task(self.recognize_pcm(pcm_data))
+        # 被丢弃的中间结果不会再被等待，这里取走异常避免事件循环告警
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        conn.asr_partial = PartialHypothesis(timeline.generation, len(pcm_data), task)
+
+    def _take_partial(self, conn) -> Optional[asyncio.Task]:
+        """取出覆盖了本句全部有声音频的中间结果，不满足条件的直接取消"""
+        partial, conn.asr_partial = conn.asr_partial, None
+        conn.asr_partial_last_voice = False
+        if partial is None:
+            return None
+        timeline = conn.asr_pcm_timeline
+        if (
+            partial.generation == timeline.generation
+            and timeline.complete
+            and partial.length >= timeline.voiced_length
+        ):
+            return partial.task
+        partial.task.cancel()
+        return None
 
     # 处理语音停止
-    async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
-        """并行处理ASR和声纹识别"""
+    async def handle_voice_stop(
+        self,
+        conn,
+        asr_audio_task: List[bytes],
+        pcm_view: Optional[memoryview] = None,
+        partial_task: Optional[asyncio.Task] = None,
+    ):
+        """并行处理ASR和声纹识别
+
+        pcm_view为入口处已解码好的整句PCM，提供时直接交给ASR和声纹识别，不再重复解码；
+        partial_task为说话过程中已开始的识别任务，它覆盖了全部有声音频时直接使用其结果
+        """
         try:
             total_start_time = time.monotonic()
+
+            partial_text = None
+            if partial_task is not None:
+                # 用wait而不是wait_for：中间结果被取消或超时都只回退到整句识别，
+                # 当前任务自身被取消时仍正常向上传播
+                await asyncio.wait({partial_task}, timeout=15)
+                if not partial_task.done():
+                    partial_task.cancel()
+                    logger.bind(tag=TAG).warning("边说边识别结果超时，重新识别")
+                elif partial_task.cancelled():
+                    logger.bind(tag=TAG).warning("边说边识别任务已取消，重新识别")
+                elif partial_task.exception() is not None:
+                    logger.bind(tag=TAG).warning(
+                        f"边说边识别结果不可用，重新识别: {partial_task.exception()}"
+                    )
+                else:
+                    partial_text = partial_task.result()
+                    logger.bind(tag=TAG).info(
+                        f"使用边说边识别结果，等待耗时: {time.monotonic() - total_start_time:.3f}s"
+                    )
             
             # 准备音频数据
-            if conn.audio_format == "pcm":
+            if pcm_view is not None:
+                pcm_data = [pcm_view]
+                asr_input, asr_format = pcm_data, "pcm"
+            elif conn.audio_format == "pcm":
                 pcm_data = asr_audio_task
+                asr_input, asr_format = asr_audio_task, "pcm"
             else:
                 pcm_data = self.decode_opus(asr_audio_task)
+                asr_input, asr_format = pcm_data, "pcm"
             
-            combined_pcm_data = b"".join(pcm_data)
+            combined_pcm_data = pcm_view if pcm_view is not None else b"".join(pcm_data)
             
             # 预先准备WAV数据
             wav_data = None
             if conn.voiceprint_provider and combined_pcm_data:
                 wav_data = self._pcm_to_wav(combined_pcm_data)
             
+            executor = get_asr_executor(conn.config)
+            voiceprint_executor = get_voiceprint_executor(conn.config)
+
+            async def save_partial_audio():
+                # 使用中间结果时不再经过speech_to_text，需要保留音频时在这里补存整句音频
+                if getattr(self, "delete_audio_file", True) or not combined_pcm_data:
+                    return None
+                try:
+                    return await self.save_audio_to_file_async(pcm_data, conn.session_id)
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"音频文件保存失败: {e}")
+                    return None
+
             # 定义ASR任务
-            def run_asr():
+            async def run_asr():
+                if partial_text is not None:
+                    return partial_text, await save_partial_audio()
                 start_time = time.monotonic()
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        result = loop.run_until_complete(
-                            self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
-                        )
-                        end_time = time.monotonic()
-                        logger.bind(tag=TAG).info(f"ASR耗时: {end_time - start_time:.3f}s")
-                        return result
-                    finally:
-                        loop.close()
-                except Exception as e:
+                    result = await executor.run(
+                        self.speech_to_text,
+                        asr_input,
+                        conn.session_id,
+                        asr_format,
+                        blocking=self.blocking_recognition,
+                    )
                     end_time = time.monotonic()
+                    logger.bind(tag=TAG).info(f"ASR耗时: {end_time - start_time:.3f}s")
+                    return result
+                except asyncio.TimeoutError:
+                    logger.bind(tag=TAG).error(f"ASR超时: {executor.timeout}s")
+                    return ("", None)
+                except Exception as e:
                     logger.bind(tag=TAG).error(f"ASR失败: {e}")
                     return ("", None)
             
             # 定义声纹识别任务
-            def run_voiceprint():
+            async def run_voiceprint():
                 if not wav_data:
                     return None
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        # 使用连接的声纹识别提供者
-                        result = loop.run_until_complete(
-                            conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
-                        )
-                        return result
-                    finally:
-                        loop.close()
+                    # 使用连接的声纹识别提供者，声纹识别通过aiohttp请求，不需要工作线程
+                    return await voiceprint_executor.run(
+                        conn.voiceprint_provider.identify_speaker,
+                        wav_data,
+                        conn.session_id,
+                        blocking=False,
+                    )
+                except asyncio.TimeoutError:
+                    logger.bind(tag=TAG).error(
+                        f"声纹识别超时: {voiceprint_executor.timeout}s"
+                    )
+                    return None
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"声纹识别失败: {e}")
                     return None
             
-            # 使用线程池执行器并行运行
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as thread_executor:
-                asr_future = thread_executor.submit(run_asr)
-                
-                if conn.voiceprint_provider and wav_data:
-                    voiceprint_future = thread_executor.submit(run_voiceprint)
-                    
-                    # 等待两个线程都完成
-                    asr_result = asr_future.result(timeout=15)
-                    voiceprint_result = voiceprint_future.result(timeout=15)
-                    
-                    results = {"asr": asr_result, "voiceprint": voiceprint_result}
-                else:
-                    asr_result = asr_future.result(timeout=15)
-                    results = {"asr": asr_result, "voiceprint": None}
-            
+            # 并行运行，阻塞式识别在服务器级工作线程中执行，连接的事件循环不阻塞
+            asr_result, voiceprint_result = await asyncio.gather(
+                run_asr(), run_voiceprint()
+            )
+            results = {"asr": asr_result, "voiceprint": voiceprint_result}
             
             # 处理结果
             raw_text, _ = results.get("asr", ("", None))
@@ -219,17 +344,30 @@ class ASRProviderBase(ABC):
 
     def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
         """PCM数据保存为WAV文件"""
+        file_path = self.audio_file_path(session_id)
+        self.write_wav_file(file_path, pcm_data)
+        return file_path
+
+    async def save_audio_to_file_async(
+        self, pcm_data: List[bytes], session_id: str
+    ) -> str:
+        """在线程中保存WAV文件，供直接在事件循环中运行的speech_to_text使用"""
+        return await asyncio.to_thread(self.save_audio_to_file, pcm_data, session_id)
+
+    def audio_file_path(self, session_id: str) -> str:
+        """生成保存音频的WAV文件路径"""
         module_name = __name__.split(".")[-1]
         file_name = f"asr_{module_name}_{session_id}_{uuid.uuid4()}.wav"
-        file_path = os.path.join(self.output_dir, file_name)
+        return os.path.join(self.output_dir, file_name)
 
+    @staticmethod
+    def write_wav_file(file_path: str, pcm_data: List[bytes]):
         with wave.open(file_path, "wb") as wf:
             wf.setnchannels(1)
             wf.setsampwidth(2)  # 2 bytes = 16-bit
             wf.setframerate(16000)
-            wf.writeframes(b"".join(pcm_data))
-
-        return file_path
+            for chunk in pcm_data:
+                wf.writeframes(chunk)
 
     @abstractmethod
     async def speech_to_text(
@@ -81,6 +81,8 @@ def parse_response(res):
 
 
 class ASRProvider(ASRProviderBase):
+    blocking_recognition = False
+
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
         self.interface_type = InterfaceType.NON_STREAM
@@ -249,7 +251,7 @@ class ASRProvider(ASRProviderBase):
             if self.delete_audio_file:
                 pass
             else:
-                file_path = self.save_audio_to_file(pcm_data, session_id)
+                file_path = await self.save_audio_to_file_async(pcm_data, session_id)
 
             # 直接使用PCM数据
             # 计算分段大小 (单声道, 16bit, 16kHz采样率)
@@ -4,15 +4,44 @@ import uuid
 import asyncio
 import websockets
 import opuslib_next
+from functools import partial
 from core.providers.asr.base import ASRProviderBase
 from config.logger import setup_logging
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.ws_pool import get_ws_pool
 
 TAG = __name__
 logger = setup_logging()
 
 
+def _token_auth_headers(appid, access_token):
+    return {
+        "X-Api-App-Key": appid,
+        "X-Api-Access-Key": access_token,
+        "X-Api-Resource-Id": "volc.bigasr.sauc.duration",
+        "X-Api-Connect-Id": str(uuid.uuid4()),
+    }
+
+
+async def _connect(ws_url, appid, access_token, auth_method):
+    """建立到ASR服务的WebSocket连接，由共享连接池长期持有，只依赖服务配置"""
+    headers = (
+        _token_auth_headers(appid, access_token) if auth_method == "token" else None
+    )
+    logger.bind(tag=TAG).debug(f"正在连接ASR服务，headers: {headers}")
+    return await websockets.connect(
+        ws_url,
+        additional_headers=headers,
+        max_size=1000000000,
+        ping_interval=None,
+        ping_timeout=None,
+        close_timeout=10,
+    )
+
+
 class ASRProvider(ASRProviderBase):
+    blocking_recognition = False
+
     def __init__(self, config, delete_audio_file):
         super().__init__()
         self.interface_type = InterfaceType.STREAM
@@ -50,12 +79,22 @@ class ASRProvider(ASRProviderBase):
         self.auth_method = config.get("auth_method", "token")
         self.secret = config.get("secret", "access_secret")
 
+        # 同一账号的所有设备共享预连接池
+        self.ws_pool = get_ws_pool(
+            ("doubao_stream", self.ws_url, self.appid, self.access_token),
+            "doubao_stream",
+            partial(
+                _connect, self.ws_url, self.appid, self.access_token, self.auth_method
+            ),
+            config,
+        )
+
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
+        self.ws_pool.touch()
 
     async def receive_audio(self, conn, audio, audio_have_voice):
-        conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio_preroll.append(audio)
         
         # 存储音频数据
         if not hasattr(conn, 'asr_audio_for_voiceprint'):
@@ -71,18 +110,8 @@ class ASRProvider(ASRProviderBase):
         if audio_have_voice and self.asr_ws is None and not self.is_processing:
             try:
                 self.is_processing = True
-                # 建立新的WebSocket连接
-                headers = self.token_auth() if self.auth_method == "token" else None
-                logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
-
-                self.asr_ws = await websockets.connect(
-                    self.ws_url,
-                    additional_headers=headers,
-                    max_size=1000000000,
-                    ping_interval=None,
-                    ping_timeout=None,
-                    close_timeout=10,
-                )
+                # 从预连接池取出已建立的WebSocket连接
+                self.asr_ws = await self.ws_pool.acquire()
 
                 # 发送初始化请求
                 request_params = self.construct_request(str(uuid.uuid4()))
@@ -117,8 +146,8 @@ class ASRProvider(ASRProviderBase):
                 self.forward_task = asyncio.create_task(self._forward_asr_results(conn))
 
                 # 发送缓存的音频数据
-                if conn.asr_audio and len(conn.asr_audio) > 0:
-                    for cached_audio in conn.asr_audio[-10:]:
+                if conn.asr_audio_preroll:
+                    for cached_audio in list(conn.asr_audio_preroll):
                         try:
                             pcm_frame = self.decoder.decode(cached_audio, 960)
                             payload = gzip.compress(pcm_frame)
@@ -225,8 +254,7 @@ class ASRProvider(ASRProviderBase):
             if conn:
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
-                if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                conn.asr_audio_preroll.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
 
@@ -270,12 +298,7 @@ class ASRProvider(ASRProviderBase):
         return req
 
     def token_auth(self):
-        return {
-            "X-Api-App-Key": self.appid,
-            "X-Api-Access-Key": self.access_token,
-            "X-Api-Resource-Id": "volc.bigasr.sauc.duration",
-            "X-Api-Connect-Id": str(uuid.uuid4()),
-        }
+        return _token_auth_headers(self.appid, self.access_token)
 
     def generate_header(
         self,
@@ -375,7 +398,6 @@ class ASRProvider(ASRProviderBase):
             for conn in self._connections.values():
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
-                if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                conn.asr_audio_preroll.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
@@ -1,5 +1,6 @@
 import time
 import os
+import asyncio
 import sys
 import io
 import psutil
@@ -10,6 +11,7 @@ from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 import shutil
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.batch_scheduler import BatchScheduler
 
 TAG = __name__
 logger = setup_logging()
@@ -36,6 +38,9 @@ class CaptureOutput:
 
 
 class ASRProvider(ASRProviderBase):
+    supports_partial = True
+    blocking_recognition = False
+
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
         
@@ -61,6 +66,46 @@ class ASRProvider(ASRProviderBase):
                 # device="cuda:0",  # 启用GPU加速
             )
 
+        # 边说边识别：说话停顿时提前识别已收到的音频，语音结束时直接使用结果
+        self.load_partial_config(config)
+
+        # 所有连接共享同一个模型实例，同时结束的语音合并成一批识别
+        batch_max_size = config.get("batch_max_size", 8)
+        batch_max_wait_ms = config.get("batch_max_wait_ms", 10)
+        self.scheduler = BatchScheduler(
+            self._generate_batch,
+            max_batch=int(batch_max_size) if batch_max_size else 8,
+            max_wait_ms=float(batch_max_wait_ms) if batch_max_wait_ms else 10,
+            name="fun_local-asr",
+        )
+
+    def _generate_batch(self, pcm_list: List[bytes]) -> List[str]:
+        """一次识别多段PCM音频，按输入顺序返回文本"""
+        start_time = time.time()
+        result = self.model.generate(
+            input=pcm_list,
+            cache={},
+            language="auto",
+            use_itn=True,
+            batch_size=len(pcm_list),
+        )
+        texts = [rich_transcription_postprocess(item["text"]) for item in result]
+        logger.bind(tag=TAG).debug(
+            f"批量语音识别耗时: {time.time() - start_time:.3f}s | 批大小: {len(pcm_list)}"
+        )
+        return texts
+
+    async def recognize_pcm(self, pcm_data: bytes) -> str:
+        """识别一段PCM，用于边说边识别"""
+        return await self.scheduler.run(pcm_data)
+
+    def _save_audio_checked(self, pcm_data: List[bytes], session_id: str) -> str:
+        """检查磁盘空间后保存WAV文件"""
+        free_space = shutil.disk_usage(self.output_dir).free
+        if free_space < sum(len(chunk) for chunk in pcm_data) * 2:  # 预留2倍空间
+            raise OSError("磁盘空间不足")
+        return self.save_audio_to_file(pcm_data, session_id)
+
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
     ) -> Tuple[Optional[str], Optional[str]]:
@@ -78,28 +123,15 @@ class ASRProvider(ASRProviderBase):
 
                 combined_pcm_data = b"".join(pcm_data)
 
-                # 检查磁盘空间
+                # 检查磁盘空间并保存为WAV文件，磁盘操作放到线程中，不阻塞事件循环
                 if not self.delete_audio_file:
-                    free_space = shutil.disk_usage(self.output_dir).free
-                    if free_space < len(combined_pcm_data) * 2:  # 预留2倍空间
-                        raise OSError("磁盘空间不足")
-
-                # 判断是否保存为WAV文件
-                if self.delete_audio_file:
-                    pass
-                else:
-                    file_path = self.save_audio_to_file(pcm_data, session_id)
+                    file_path = await asyncio.to_thread(
+                        self._save_audio_checked, pcm_data, session_id
+                    )
 
                 # 语音识别
                 start_time = time.time()
-                result = self.model.generate(
-                    input=combined_pcm_data,
-                    cache={},
-                    language="auto",
-                    use_itn=True,
-                    batch_size_s=60,
-                )
-                text = rich_transcription_postprocess(result[0]["text"])
+                text = await self.scheduler.run(combined_pcm_data)
                 logger.bind(tag=TAG).debug(
                     f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
                 )
@@ -116,7 +148,7 @@ class ASRProvider(ASRProviderBase):
                 logger.bind(tag=TAG).warning(
                     f"语音识别失败，正在重试（{retry_count}/{MAX_RETRIES}）: {e}"
                 )
-                time.sleep(RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
 
             except Exception as e:
                 logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
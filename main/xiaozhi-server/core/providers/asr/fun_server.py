@@ -13,6 +13,8 @@ logger = setup_logging()
 
 
 class ASRProvider(ASRProviderBase):
+    blocking_recognition = False
+
     def __init__(self, config: dict, delete_audio_file: bool):
         """
         Initialize the ASRProvider with server configuration.
@@ -119,7 +121,7 @@ class ASRProvider(ASRProviderBase):
         if self.delete_audio_file:
             pass
         else:
-            file_path = self.save_audio_to_file(pcm_data, session_id)
+            file_path = await self.save_audio_to_file_async(pcm_data, session_id)
         auth_header = {"Authorization": "Bearer; {}".format(self.api_key)}
         async with websockets.connect(
             self.uri,
@@ -1,12 +1,13 @@
 import time
-import wave
 import os
 import sys
 import io
+import concurrent.futures
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
+from core.utils.batch_scheduler import BatchScheduler
 
 import numpy as np
 import sherpa_onnx
@@ -16,6 +17,11 @@ from modelscope.hub.file_download import model_file_download
 TAG = __name__
 logger = setup_logging()
 
+# 需要保留音频时在后台单线程写WAV，不占用识别时间，也避免多个文件同时写SD卡
+_audio_writer = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="sherpa-asr-audio-writer"
+)
+
 
 # 捕获标准输出
 class CaptureOutput:
@@ -35,6 +41,9 @@ class CaptureOutput:
 
 
 class ASRProvider(ASRProviderBase):
+    supports_partial = True
+    blocking_recognition = False
+
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
         self.interface_type = InterfaceType.LOCAL
@@ -96,54 +105,71 @@ class ASRProvider(ASRProviderBase):
                     use_itn=True,
                 )
 
-    def read_wave(self, wave_filename: str) -> Tuple[np.ndarray, int]:
-        """
-        Args:
-        wave_filename:
-            Path to a wave file. It should be single channel and each sample should
-            be 16-bit. Its sample rate does not need to be 16kHz.
-        Returns:
-        Return a tuple containing:
-        - A 1-D array of dtype np.float32 containing the samples, which are
-        normalized to the range [-1, 1].
-        - sample rate of the wave file
-        """
-
-        with wave.open(wave_filename) as f:
-            assert f.getnchannels() == 1, f.getnchannels()
-            assert f.getsampwidth() == 2, f.getsampwidth()  # it is in bytes
-            num_samples = f.getnframes()
-            samples = f.readframes(num_samples)
-            samples_int16 = np.frombuffer(samples, dtype=np.int16)
-            samples_float32 = samples_int16.astype(np.float32)
-
-            samples_float32 = samples_float32 / 32768
-            return samples_float32, f.getframerate()
+        # 边说边识别：说话停顿时提前识别已收到的音频，语音结束时直接使用结果
+        self.load_partial_config(config)
+
+        # 所有连接共享同一个模型实例，同时结束的语音合并成一批识别
+        batch_max_size = config.get("batch_max_size", 8)
+        batch_max_wait_ms = config.get("batch_max_wait_ms", 10)
+        self.scheduler = BatchScheduler(
+            self._decode_batch,
+            max_batch=int(batch_max_size) if batch_max_size else 8,
+            max_wait_ms=float(batch_max_wait_ms) if batch_max_wait_ms else 10,
+            name="sherpa_onnx_local-asr",
+        )
+
+    def _decode_batch(self, waveforms: List[Tuple[np.ndarray, int]]) -> List[str]:
+        """一次解码多段音频，按输入顺序返回文本"""
+        streams = []
+        for samples, sample_rate in waveforms:
+            s = self.model.create_stream()
+            s.accept_waveform(sample_rate, samples)
+            streams.append(s)
+        self.model.decode_streams(streams)
+        return [s.result.text for s in streams]
+
+    @staticmethod
+    def pcm_to_samples(pcm_data) -> np.ndarray:
+        """16位PCM转换为[-1, 1]范围的float32采样点"""
+        return np.frombuffer(pcm_data, dtype=np.int16).astype(np.float32) / 32768
+
+    def _save_audio_in_background(self, pcm_data: List[bytes], session_id: str) -> str:
+        file_path = self.audio_file_path(session_id)
+        future = _audio_writer.submit(self.write_wav_file, file_path, pcm_data)
+
+        def on_done(f: concurrent.futures.Future):
+            if f.exception() is not None:
+                logger.bind(tag=TAG).error(
+                    f"音频文件保存失败: {file_path} | 错误: {f.exception()}"
+                )
+
+        future.add_done_callback(on_done)
+        return file_path
+
+    async def recognize_pcm(self, pcm_data: bytes) -> str:
+        """识别一段PCM，用于边说边识别"""
+        return await self.scheduler.run((self.pcm_to_samples(pcm_data), 16000))
 
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
     ) -> Tuple[Optional[str], Optional[str]]:
-        """语音转文本主处理逻辑"""
+        """语音转文本主处理逻辑，音频直接在内存中识别，不经过WAV文件"""
         file_path = None
         try:
-            # 保存音频文件
-            start_time = time.time()
             if audio_format == "pcm":
                 pcm_data = opus_data
             else:
                 pcm_data = self.decode_opus(opus_data)
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-            logger.bind(tag=TAG).debug(
-                f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
-            )
+            combined_pcm_data = pcm_data[0] if len(pcm_data) == 1 else b"".join(pcm_data)
+
+            # 配置了保留音频时才写文件，且不等待写入完成
+            if not self.delete_audio_file:
+                file_path = self._save_audio_in_background(pcm_data, session_id)
 
             # 语音识别
             start_time = time.time()
-            s = self.model.create_stream()
-            samples, sample_rate = self.read_wave(file_path)
-            s.accept_waveform(sample_rate, samples)
-            self.model.decode_stream(s)
-            text = s.result.text
+            samples = self.pcm_to_samples(combined_pcm_data)
+            text = await self.scheduler.run((samples, 16000))
             logger.bind(tag=TAG).debug(
                 f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
             )
@@ -153,11 +179,3 @@ class ASRProvider(ASRProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
             return "", file_path
-        finally:
-            # 文件清理逻辑
-            if self.delete_audio_file and file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
@@ -9,10 +9,12 @@ from time import mktime
 from datetime import datetime
 from urllib.parse import urlencode
 from typing import List
+from functools import partial
 from config.logger import setup_logging
 from wsgiref.handlers import format_date_time
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.ws_pool import get_ws_pool
 
 TAG = __name__
 logger = setup_logging()
@@ -22,7 +24,56 @@ STATUS_FIRST_FRAME = 0  # 第一帧的标识
 STATUS_CONTINUE_FRAME = 1  # 中间帧标识
 STATUS_LAST_FRAME = 2  # 最后一帧的标识
 
+
+def create_url(api_key, api_secret) -> str:
+    """生成认证URL"""
+    url = 'ws://iat.cn-huabei-1.xf-yun.com/v1'
+    # 生成RFC1123格式的时间戳
+    now = datetime.now()
+    date = format_date_time(mktime(now.timetuple()))
+
+    # 拼接字符串
+    signature_origin = "host: " + "iat.cn-huabei-1.xf-yun.com" + "\n"
+    signature_origin += "date: " + date + "\n"
+    signature_origin += "GET " + "/v1 " + "HTTP/1.1"
+
+    # 进行hmac-sha256进行加密
+    signature_sha = hmac.new(api_secret.encode('utf-8'), signature_origin.encode('utf-8'),
+                             digestmod=hashlib.sha256).digest()
+    signature_sha = base64.b64encode(signature_sha).decode(encoding='utf-8')
+
+    authorization_origin = "api_key=\"%s\", algorithm=\"%s\", headers=\"%s\", signature=\"%s\"" % (
+        api_key, "hmac-sha256", "host date request-line", signature_sha)
+    authorization = base64.b64encode(authorization_origin.encode('utf-8')).decode(encoding='utf-8')
+
+    # 将请求的鉴权参数组合为字典
+    v = {
+        "authorization": authorization,
+        "date": date,
+        "host": "iat.cn-huabei-1.xf-yun.com"
+    }
+
+    # 拼接鉴权参数，生成url
+    url = url + '?' + urlencode(v)
+    return url
+
+
+async def _connect(api_key, api_secret):
+    """建立到ASR服务的WebSocket连接，鉴权URL每次重新生成；由共享连接池长期持有，只依赖服务配置"""
+    ws_url = create_url(api_key, api_secret)
+    logger.bind(tag=TAG).debug(f"正在连接ASR服务: {ws_url[:50]}...")
+    return await websockets.connect(
+        ws_url,
+        max_size=1000000000,
+        ping_interval=None,
+        ping_timeout=None,
+        close_timeout=10,
+    )
+
+
 class ASRProvider(ASRProviderBase):
+    blocking_recognition = False
+
     def __init__(self, config, delete_audio_file):
         super().__init__()
         self.interface_type = InterfaceType.STREAM
@@ -59,59 +110,40 @@ class ASRProvider(ASRProviderBase):
 
         self.output_dir = config.get("output_dir", "tmp/")
         self.delete_audio_file = delete_audio_file
+
+        # 同一应用的所有设备共享预连接池
+        self.ws_pool = get_ws_pool(
+            ("xunfei_stream", self.app_id, self.api_key),
+            "xunfei_stream",
+            partial(_connect, self.api_key, self.api_secret),
+            config,
+        )
     
     def create_url(self) -> str:
         """生成认证URL"""
-        url = 'ws://iat.cn-huabei-1.xf-yun.com/v1'
-        # 生成RFC1123格式的时间戳
-        now = datetime.now()
-        date = format_date_time(mktime(now.timetuple()))
-
-        # 拼接字符串
-        signature_origin = "host: " + "iat.cn-huabei-1.xf-yun.com" + "\n"
-        signature_origin += "date: " + date + "\n"
-        signature_origin += "GET " + "/v1 " + "HTTP/1.1"
-
-        # 进行hmac-sha256进行加密
-        signature_sha = hmac.new(self.api_secret.encode('utf-8'), signature_origin.encode('utf-8'),
-                                 digestmod=hashlib.sha256).digest()
-        signature_sha = base64.b64encode(signature_sha).decode(encoding='utf-8')
-
-        authorization_origin = "api_key=\"%s\", algorithm=\"%s\", headers=\"%s\", signature=\"%s\"" % (
-            self.api_key, "hmac-sha256", "host date request-line", signature_sha)
-        authorization = base64.b64encode(authorization_origin.encode('utf-8')).decode(encoding='utf-8')
-
-        # 将请求的鉴权参数组合为字典
-        v = {
-            "authorization": authorization,
-            "date": date,
-            "host": "iat.cn-huabei-1.xf-yun.com"
-        }
-
-        # 拼接鉴权参数，生成url
-        url = url + '?' + urlencode(v)
-        return url
+        return create_url(self.api_key, self.api_secret)
 
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
+        self.ws_pool.touch()
 
     async def receive_audio(self, conn, audio, audio_have_voice):
-        # 先调用父类方法处理基础逻辑
-        await super().receive_audio(conn, audio, audio_have_voice)
-
-        # 存储音频数据用于声纹识别
-        if not hasattr(conn, 'asr_audio_for_voiceprint'):
-            conn.asr_audio_for_voiceprint = []
-        conn.asr_audio_for_voiceprint.append(audio)
-
         # 如果本次有声音，且之前没有建立连接
+        # 先于父类处理建立连接，此时预录音队列中还是开始说话前的音频
         if audio_have_voice and self.asr_ws is None and not self.is_processing:
             try:
                 await self._start_recognition(conn)
             except Exception as e:
                 logger.bind(tag=TAG).error(f"建立ASR连接失败: {str(e)}")
                 await self._cleanup(conn)
-                return
+
+        # 调用父类方法处理基础逻辑
+        await super().receive_audio(conn, audio, audio_have_voice)
+
+        # 存储音频数据用于声纹识别
+        if not hasattr(conn, 'asr_audio_for_voiceprint'):
+            conn.asr_audio_for_voiceprint = []
+        conn.asr_audio_for_voiceprint.append(audio)
 
         # 发送当前音频数据
         if self.asr_ws and self.is_processing and self.server_ready:
@@ -126,17 +158,8 @@ class ASRProvider(ASRProviderBase):
         """开始识别会话"""
         try:
             self.is_processing = True
-            # 建立WebSocket连接
-            ws_url = self.create_url()
-            logger.bind(tag=TAG).info(f"正在连接ASR服务: {ws_url[:50]}...")
-
-            self.asr_ws = await websockets.connect(
-                ws_url,
-                max_size=1000000000,
-                ping_interval=None,
-                ping_timeout=None,
-                close_timeout=10,
-            )
+            # 从预连接池取出已建立的WebSocket连接
+            self.asr_ws = await self.ws_pool.acquire()
 
             logger.bind(tag=TAG).info("ASR WebSocket连接已建立")
             self.server_ready = False
@@ -144,22 +167,22 @@ class ASRProvider(ASRProviderBase):
             self.best_text = ""
             self.forward_task = asyncio.create_task(self._forward_results(conn))
 
-            # 发送首帧音频
-            if conn.asr_audio and len(conn.asr_audio) > 0:
-                first_audio = conn.asr_audio[-1] if conn.asr_audio else b''
-                pcm_frame = self.decoder.decode(first_audio, 960) if first_audio else b''
-                await self._send_audio_frame(pcm_frame, STATUS_FIRST_FRAME)
-                self.server_ready = True
-                logger.bind(tag=TAG).info("已发送首帧，开始识别")
-
-                # 发送缓存的音频数据
-                for cached_audio in conn.asr_audio[-10:]:
-                    try:
-                        pcm_frame = self.decoder.decode(cached_audio, 960)
-                        await self._send_audio_frame(pcm_frame, STATUS_CONTINUE_FRAME)
-                    except Exception as e:
-                        logger.bind(tag=TAG).info(f"发送缓存音频数据时发生错误: {e}")
-                        break
+            # 预录音的第一帧作为首帧发送，没有预录音时发送空的首帧
+            preroll = list(conn.asr_audio_preroll)
+            first_audio = preroll.pop(0) if preroll else b''
+            pcm_frame = self.decoder.decode(first_audio, 960) if first_audio else b''
+            await self._send_audio_frame(pcm_frame, STATUS_FIRST_FRAME)
+            self.server_ready = True
+            logger.bind(tag=TAG).info("已发送首帧，开始识别")
+
+            # 发送其余的预录音
+            for cached_audio in preroll:
+                try:
+                    pcm_frame = self.decoder.decode(cached_audio, 960)
+                    await self._send_audio_frame(pcm_frame, STATUS_CONTINUE_FRAME)
+                except Exception as e:
+                    logger.bind(tag=TAG).info(f"发送缓存音频数据时发生错误: {e}")
+                    break
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"建立ASR连接失败: {str(e)}")
@@ -318,8 +341,7 @@ class ASRProvider(ASRProviderBase):
             if conn:
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
-                if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                conn.asr_audio_preroll.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
 
@@ -405,8 +427,7 @@ class ASRProvider(ASRProviderBase):
         if conn:
             if hasattr(conn, 'asr_audio_for_voiceprint'):
                 conn.asr_audio_for_voiceprint = []
-            if hasattr(conn, 'asr_audio'):
-                conn.asr_audio = []
+            conn.asr_audio_preroll.clear()
             if hasattr(conn, 'has_valid_voice'):
                 conn.has_valid_voice = False
 
@@ -436,7 +457,6 @@ class ASRProvider(ASRProviderBase):
             for conn in self._connections.values():
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
-                if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                conn.asr_audio_preroll.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
\ No newline at end of file
@@ -92,11 +92,11 @@ class TTSProvider(TTSProviderBase):
             self.last_active_time = None
             raise
 
-    def tts_text_priority_thread(self):
-        """流式TTS文本处理线程"""
+    async def tts_text_consumer(self):
+        """流式TTS文本处理任务，在事件循环中等待新文本并转发给上游会话"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = await self.tts_text_queue.get_async()
                 logger.bind(tag=TAG).debug(
                     f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
                 )
@@ -120,11 +120,7 @@ class TTSProvider(TTSProviderBase):
                             logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
 
                         logger.bind(tag=TAG).info("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.start_session(self.conn.sentence_id)
                         self.before_stop_play_files.clear()
                         logger.bind(tag=TAG).info("TTS会话启动成功")
                     except Exception as e:
@@ -137,11 +133,7 @@ class TTSProvider(TTSProviderBase):
                             logger.bind(tag=TAG).debug(
                                 f"开始发送TTS文本: {message.content_detail}"
                             )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
+                            await self.text_to_speak(message.content_detail, None)
                             logger.bind(tag=TAG).debug("TTS文本发送成功")
                         except Exception as e:
                             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
@@ -153,22 +145,22 @@ class TTSProvider(TTSProviderBase):
                     )
                     if message.content_file and os.path.exists(message.content_file):
                         # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                        await self._run_blocking(
+                            self._process_audio_file_stream,
+                            message.content_file,
+                            lambda audio_data: self.handle_audio_file(audio_data, message.content_detail),
+                        )
 
                 if message.sentence_type == SentenceType.LAST:
                     try:
                         logger.bind(tag=TAG).info("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.finish_session(self.conn.sentence_id)
                     except Exception as e:
                         logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
                         continue
 
-            except queue.Empty:
-                continue
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
@@ -319,6 +311,9 @@ class TTSProvider(TTSProviderBase):
             self.ws = None
             self.last_active_time = None
 
+        # 归还Opus编码器到编码器池
+        self.opus_encoder.close()
+
     async def _start_monitor_tts_response(self):
         """监听TTS响应"""
         try:
@@ -7,6 +7,7 @@ import requests
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
+from core.utils.token_cache import TOKEN_REQUEST_TIMEOUT, get_access_token
 import time
 import uuid
 from urllib import parse
@@ -71,7 +72,7 @@ class AccessToken:
         )
         # print('url: %s' % full_url)
         # 提交HTTP GET请求
-        response = requests.get(full_url)
+        response = requests.get(full_url, timeout=TOKEN_REQUEST_TIMEOUT)
         if response.ok:
             root_obj = response.json()
             key = "Token"
@@ -124,11 +125,15 @@ class TTSProvider(TTSProviderBase):
             self.token = config.get("token")
             self.expire_time = None
 
-    def _refresh_token(self):
-        """刷新Token并记录过期时间"""
+    def _refresh_token(self, force=False):
+        """刷新Token并记录过期时间，force为True时忽略缓存重新获取"""
         if self.access_key_id and self.access_key_secret:
-            self.token, expire_time_str = AccessToken.create_token(
-                self.access_key_id, self.access_key_secret
+            self.token, expire_time_str = get_access_token(
+                "aliyun",
+                self.access_key_id,
+                self.access_key_secret,
+                AccessToken.create_token,
+                force=force,
             )
             if not expire_time_str:
                 raise ValueError("无法获取有效的Token过期时间")
@@ -185,7 +190,7 @@ class TTSProvider(TTSProviderBase):
                 self.api_url, json.dumps(request_json), headers=self.header
             )
             if resp.status_code == 401:  # Token过期特殊处理
-                self._refresh_token()
+                self._refresh_token(force=True)
                 resp = requests.post(
                     self.api_url, json.dumps(request_json), headers=self.header
                 )
@@ -8,6 +8,7 @@ import queue
 import asyncio
 import traceback
 from asyncio import Task
+from functools import partial
 import websockets
 import os
 from datetime import datetime
@@ -17,6 +18,8 @@ from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from core.utils.tts import MarkdownCleaner
 from core.utils import opus_encoder_utils, textUtils
 from config.logger import setup_logging
+from core.utils.token_cache import TOKEN_REQUEST_TIMEOUT, get_access_token
+from core.utils.tts_session_mux import get_session_mux
 
 TAG = __name__
 logger = setup_logging()
@@ -73,7 +76,7 @@ class AccessToken:
 
         import requests
 
-        response = requests.get(full_url)
+        response = requests.get(full_url, timeout=TOKEN_REQUEST_TIMEOUT)
         if response.ok:
             root_obj = response.json()
             key = "Token"
@@ -84,6 +87,32 @@ class AccessToken:
         return None, None
 
 
+async def _connect(ws_url, access_key_id, access_key_secret, token):
+    """建立新的上游WebSocket连接，由共享的连接复用器长期持有，只依赖服务配置
+
+    使用AccessKey时从进程级缓存取Token，缓存会在过期前刷新。
+    """
+    if access_key_id and access_key_secret:
+        # 缓存未命中或正在刷新时会阻塞在HTTP请求上，放到线程中执行
+        token, _ = await asyncio.to_thread(
+            get_access_token,
+            "aliyun",
+            access_key_id,
+            access_key_secret,
+            AccessToken.create_token,
+        )
+    logger.bind(tag=TAG).info("开始建立新连接...")
+    ws = await websockets.connect(
+        ws_url,
+        additional_headers={"X-NLS-Token": token},
+        ping_interval=30,
+        ping_timeout=10,
+        close_timeout=10,
+    )
+    logger.bind(tag=TAG).info("WebSocket连接建立成功")
+    return ws
+
+
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
@@ -145,11 +174,39 @@ class TTSProvider(TTSProviderBase):
             self.token = config.get("token")
             self.expire_time = None
 
+        # 上游连接由同一账号的所有设备共享。音频帧不带task_id，每条连接同一时刻只承载一个会话，
+        # 会话正常结束后留给下一个会话；服务端约10秒无数据会断开，空闲连接9秒后关闭
+        self._session_id = None
+        self._responses = None
+        self.mux = get_session_mux(
+            (
+                "aliyun_stream",
+                self.ws_url,
+                self.appkey,
+                self.access_key_id or self.token,
+            ),
+            "阿里云流式TTS",
+            partial(
+                _connect,
+                self.ws_url,
+                self.access_key_id,
+                self.access_key_secret,
+                self.token,
+            ),
+            lambda msg: None,
+            config,
+            max_sessions=1,
+            max_idle_s=9,
+        )
+
     def _refresh_token(self):
         """刷新Token并记录过期时间"""
         if self.access_key_id and self.access_key_secret:
-            self.token, expire_time_str = AccessToken.create_token(
-                self.access_key_id, self.access_key_secret
+            self.token, expire_time_str = get_access_token(
+                "aliyun",
+                self.access_key_id,
+                self.access_key_secret,
+                AccessToken.create_token,
             )
             if not expire_time_str:
                 raise ValueError("无法获取有效的Token过期时间")
@@ -176,27 +233,17 @@ class TTSProvider(TTSProviderBase):
             return False
         return time.time() > self.expire_time
 
-    async def _ensure_connection(self):
-        """确保WebSocket连接可用"""
+    async def _ensure_connection(self, session_id):
+        """从共享连接中为会话分配一条上游连接"""
         try:
             if self._is_token_expired():
                 logger.bind(tag=TAG).warning("Token已过期，正在自动刷新...")
-                self._refresh_token()
-            current_time = time.time()
-            if self.ws and current_time - self.last_active_time < 10:
-                # 10秒内才可以复用链接进行连续对话
-                logger.bind(tag=TAG).info(f"使用已有链接...")
-                return self.ws
-            logger.bind(tag=TAG).info("开始建立新连接...")
-
-            self.ws = await websockets.connect(
-                self.ws_url,
-                additional_headers={"X-NLS-Token": self.token},
-                ping_interval=30,
-                ping_timeout=10,
-                close_timeout=10,
+                await asyncio.to_thread(self._refresh_token)
+            self._responses = asyncio.Queue()
+            self.ws = await self.mux.open_session(
+                session_id, self._responses.put_nowait
             )
-            logger.bind(tag=TAG).info("WebSocket连接建立成功")
+            self._session_id = session_id
             self.last_active_time = time.time()
             return self.ws
         except Exception as e:
@@ -205,11 +252,19 @@ class TTSProvider(TTSProviderBase):
             self.last_active_time = None
             raise
 
-    def tts_text_priority_thread(self):
-        """流式文本处理线程"""
+    async def _release_session(self, broken=False):
+        """归还上游连接，会话异常结束时关闭该连接"""
+        session_id, self._session_id = self._session_id, None
+        self.ws = None
+        self.last_active_time = None
+        if session_id:
+            await self.mux.release(session_id, broken=broken)
+
+    async def tts_text_consumer(self):
+        """流式文本处理任务，在事件循环中等待新文本并转发给上游会话"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = await self.tts_text_queue.get_async()
                 logger.bind(tag=TAG).debug(
                     f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
                 )
@@ -234,11 +289,7 @@ class TTSProvider(TTSProviderBase):
                         self.message_id = str(uuid.uuid4().hex)
 
                         logger.bind(tag=TAG).info("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.start_session(self.conn.sentence_id)
                         self.before_stop_play_files.clear()
                         logger.bind(tag=TAG).info("TTS会话启动成功")
 
@@ -252,11 +303,7 @@ class TTSProvider(TTSProviderBase):
                             logger.bind(tag=TAG).debug(
                                 f"开始发送TTS文本: {message.content_detail}"
                             )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
+                            await self.text_to_speak(message.content_detail, None)
                             logger.bind(tag=TAG).debug("TTS文本发送成功")
                         except Exception as e:
                             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
@@ -268,21 +315,21 @@ class TTSProvider(TTSProviderBase):
                     )
                     if message.content_file and os.path.exists(message.content_file):
                         # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                        await self._run_blocking(
+                            self._process_audio_file_stream,
+                            message.content_file,
+                            lambda audio_data: self.handle_audio_file(audio_data, message.content_detail),
+                        )
                 if message.sentence_type == SentenceType.LAST:
                     try:
                         logger.bind(tag=TAG).info("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.finish_session(self.conn.sentence_id)
                     except Exception as e:
                         logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
                         continue
 
-            except queue.Empty:
-                continue
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
@@ -310,12 +357,7 @@ class TTSProvider(TTSProviderBase):
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            await self._release_session(broken=True)
             raise
 
     async def start_session(self, session_id):
@@ -332,8 +374,8 @@ class TTSProvider(TTSProviderBase):
                 )
                 await self.close()
 
-            # 建立新连接
-            await self._ensure_connection()
+            # 分配上游连接
+            await self._ensure_connection(self.conn.sentence_id)
 
             # 启动监听任务
             self._monitor_task = asyncio.create_task(self._start_monitor_tts_response())
@@ -408,13 +450,11 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning(f"关闭时取消监听任务错误: {e}")
             self._monitor_task = None
 
-        if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
-            self.ws = None
-            self.last_active_time = None
+        # 会话未正常结束，上游状态不确定，关闭其所在连接
+        await self._release_session(broken=True)
+
+        # 归还Opus编码器到编码器池
+        self.opus_encoder.close()
 
     async def _start_monitor_tts_response(self):
         """监听TTS响应"""
@@ -422,7 +462,10 @@ class TTSProvider(TTSProviderBase):
             session_finished = False  # 标记会话是否正常结束
             while not self.conn.stop_event.is_set():
                 try:
-                    msg = await self.ws.recv()
+                    msg = await self._responses.get()
+                    if msg is None:
+                        logger.bind(tag=TAG).warning("WebSocket连接已关闭")
+                        break
                     self.last_active_time = time.time()
                     # 检查客户端是否中止
                     if self.conn.client_abort:
@@ -466,13 +509,8 @@ class TTSProvider(TTSProviderBase):
                         f"处理TTS响应时出错: {e}\n{traceback.format_exc()}"
                     )
                     break
-            # 仅在连接异常时才关闭
-            if not session_finished and self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            # 会话正常结束时连接留给下一个会话，异常时关闭
+            await self._release_session(broken=not session_finished)
         # 监听任务退出时清理引用
         finally:
             self._monitor_task = None
@@ -492,7 +530,7 @@ class TTSProvider(TTSProviderBase):
             async def _generate_audio():
                 # 刷新Token（如果需要）
                 if self._is_token_expired():
-                    self._refresh_token()
+                    await asyncio.to_thread(self._refresh_token)
 
                 # 建立WebSocket连接
                 ws = await websockets.connect(
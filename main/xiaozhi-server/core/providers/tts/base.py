@@ -11,11 +11,17 @@ from datetime import datetime
 from core.utils import textUtils
 from typing import Callable, Any
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
+from core.utils.tts_cache import get_tts_cache
+from core.utils.async_queue import AsyncQueue
+from core.utils.sentence_segmenter import SentenceSegmenter
+from core.utils.tts_pipeline import OrderedSynthesisPipeline, SynthesisSegment
 from core.utils.output_counter import add_device_output
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
+from core.utils.audio_decoder import StreamingAudioDecoder
 from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream
 from core.providers.tts.dto.dto import (
     TTSMessageDTO,
@@ -27,20 +33,41 @@ from core.providers.tts.dto.dto import (
 TAG = __name__
 logger = setup_logging()
 
+# 各连接共用的TTS合成线程池，首次打开音频通道时按配置创建
+_synthesis_executor = None
+
+
+def get_synthesis_executor(config=None) -> ThreadPoolExecutor:
+    """获取共享的合成线程池，合成、解码等阻塞操作在这里执行，不占用事件循环"""
+    global _synthesis_executor
+    if _synthesis_executor is None:
+        workers = (config or {}).get("tts_synthesis_workers", 64)
+        _synthesis_executor = ThreadPoolExecutor(
+            max_workers=int(workers) if workers else 64,
+            thread_name_prefix="tts-synth",
+        )
+    return _synthesis_executor
+
 
 class TTSProviderBase(ABC):
+    # 子类实现了异步生成器text_to_speak_stream(text)，按合成顺序逐块返回音频数据（格式为audio_file_type）时设为True，
+    # 合成结果边接收边解码
+    supports_audio_stream = False
+
     def __init__(self, config, delete_audio_file):
         self.interface_type = InterfaceType.NON_STREAM
         self.conn = None
         self.delete_audio_file = delete_audio_file
         self.audio_file_type = "wav"
         self.output_file = config.get("output_dir", "tmp/")
-        self.tts_text_queue = queue.Queue()
-        self.tts_audio_queue = queue.Queue()
+        self.tts_text_queue = AsyncQueue()
+        self.tts_audio_queue = AsyncQueue()
+        # 事件循环中的文本处理和音频播放任务
+        self.tts_text_task = None
+        self.audio_play_task = None
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
 
-        self.tts_text_buff = []
         self.punctuations = (
             "。",
             "？",
@@ -66,8 +93,18 @@ class TTSProviderBase(ABC):
             "：",
         )
         self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+        # 增量分句，只扫描LLM新输出的文本
+        self.segmenter = SentenceSegmenter(
+            self.punctuations, self.first_sentence_punctuations
+        )
+        # 非流式TTS的并行合成流水线，在open_audio_channels中按配置创建
+        self.synthesis_pipeline = None
+
+        # 音频缓存键使用的合成参数：配置中的音色、语速、音调等，以及所用的账号和模型
+        self.cache_params = {
+            k: v for k, v in config.items() if k not in ("output_dir", "type")
+        }
+        self.cache_params["type"] = type(self).__module__
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -82,16 +119,72 @@ class TTSProviderBase(ABC):
     def handle_audio_file(self, file_audio: bytes, text):
         self.before_stop_play_files.append((file_audio, text))
 
-    def to_tts_stream(self, text, opus_handler: Callable[[bytes], None] = None) -> None:
+    def to_tts_stream(
+        self,
+        text,
+        opus_handler: Callable[[bytes], None] = None,
+        audio_queue: queue.Queue = None,
+    ) -> None:
+        """合成一句话，句子开始标记写入audio_queue（默认为播放队列），音频帧交给opus_handler"""
         text = MarkdownCleaner.clean_markdown(text)
+        if audio_queue is None:
+            audio_queue = self.tts_audio_queue
+        cache = get_tts_cache(self.conn.config if self.conn else None)
+        if cache is None or not cache.cacheable(text):
+            self._synthesize_stream(text, opus_handler, audio_queue)
+            return None
+
+        is_opus = self.delete_audio_file or self.conn.audio_format != "pcm"
+        key = cache.make_key(
+            self.cache_params["type"],
+            {
+                **self.cache_params,
+                "voice": getattr(self, "voice", None),
+                "opus": is_opus,
+            },
+            text,
+        )
+        frames, leader = cache.acquire(key)
+        if frames is not None:
+            logger.bind(tag=TAG).info(f"语音命中缓存: {text}")
+            audio_queue.put((SentenceType.FIRST, None, text))
+            for frame in frames:
+                opus_handler(frame)
+            return None
+
+        collected = []
+
+        def collect(frame):
+            collected.append(frame)
+            opus_handler(frame)
+
+        success = False
+        try:
+            success = self._synthesize_stream(text, collect, audio_queue)
+        finally:
+            if leader:
+                cache.release(key, collected if success else None)
+        return None
+
+    def _synthesize_stream(
+        self,
+        text,
+        opus_handler: Callable[[bytes], None] = None,
+        audio_queue: queue.Queue = None,
+    ) -> bool:
+        """合成一句话并把音频帧交给opus_handler，返回是否合成成功"""
+        if audio_queue is None:
+            audio_queue = self.tts_audio_queue
         max_repeat_time = 5
+        if self.delete_audio_file and self.supports_audio_stream:
+            return self._synthesize_audio_stream(text, opus_handler, audio_queue)
         if self.delete_audio_file:
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
                     audio_bytes = asyncio.run(self.text_to_speak(text, None))
                     if audio_bytes:
-                        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                        audio_queue.put((SentenceType.FIRST, None, text))
                         audio_bytes_to_data_stream(
                             audio_bytes,
                             file_type=self.audio_file_type,
@@ -114,7 +207,7 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).error(
                     f"语音生成失败: {text}，请检查网络或服务是否正常"
                 )
-            return None
+            return max_repeat_time > 0
         else:
             tmp_file = self.generate_filename()
             try:
@@ -138,12 +231,65 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).error(
                         f"语音生成失败: {text}，请检查网络或服务是否正常"
                     )
-                    self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                    audio_queue.put((SentenceType.FIRST, None, text))
                 self._process_audio_file_stream(tmp_file, callback=opus_handler)
+                return max_repeat_time > 0
             except Exception as e:
                 logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
-                return None
-    
+                return False
+
+
+    def _synthesize_audio_stream(
+        self,
+        text,
+        opus_handler: Callable[[bytes], None] = None,
+        audio_queue: queue.Queue = None,
+    ) -> bool:
+        """边接收音频块边解码，首个音频块到达即开始输出，不必等整句合成完成"""
+        if audio_queue is None:
+            audio_queue = self.tts_audio_queue
+        max_repeat_time = 5
+        while max_repeat_time > 0:
+            decoder = StreamingAudioDecoder(self.audio_file_type, True, opus_handler)
+            emitted = False
+
+            async def consume():
+                nonlocal emitted
+                async for chunk in self.text_to_speak_stream(text):
+                    if not chunk:
+                        continue
+                    if not emitted:
+                        emitted = True
+                        audio_queue.put((SentenceType.FIRST, None, text))
+                    decoder.feed(chunk)
+
+            try:
+                asyncio.run(consume())
+                if emitted:
+                    decoder.finish()
+                    logger.bind(tag=TAG).info(
+                        f"语音生成成功: {text}，重试{5 - max_repeat_time}次"
+                    )
+                    return True
+                max_repeat_time -= 1
+            except Exception as e:
+                logger.bind(tag=TAG).warning(
+                    f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
+                )
+                if emitted:
+                    # 已经开始播放，重试会重复播放前半句，输出已解码的部分后结束
+                    try:
+                        decoder.finish()
+                    except Exception:
+                        pass
+                    return False
+                max_repeat_time -= 1
+            finally:
+                # 归还解码器占用的编码器，finish()之后调用不会产生影响
+                decoder.close()
+        logger.bind(tag=TAG).error(f"语音生成失败: {text}，请检查网络或服务是否正常")
+        return False
+
     def to_tts(self, text):
         text = MarkdownCleaner.clean_markdown(text)
         max_repeat_time = 5
@@ -252,108 +398,178 @@ class TTSProviderBase(ABC):
 
     async def open_audio_channels(self, conn):
         self.conn = conn
-        # tts 消化线程
-        self.tts_priority_thread = threading.Thread(
-            target=self.tts_text_priority_thread, daemon=True
+        # 首句的字数和时间预算，LLM迟迟不输出标点时提前切出首句
+        max_chars = conn.config.get("tts_first_segment_max_chars", 20)
+        max_ms = conn.config.get("tts_first_segment_max_ms", 800)
+        self.segmenter.configure_first_segment(
+            int(max_chars) if max_chars not in (None, "") else 20,
+            float(max_ms) if max_ms not in (None, "") else 800,
         )
-        self.tts_priority_thread.start()
+        # 非流式TTS最多同时合成几段文本，按顺序播放
+        lookahead = conn.config.get("tts_lookahead", 2)
+        lookahead = int(lookahead) if lookahead not in (None, "") else 2
+        executor = get_synthesis_executor(conn.config)
+        if self.interface_type == InterfaceType.NON_STREAM and lookahead > 1:
+            self.synthesis_pipeline = OrderedSynthesisPipeline(
+                self.tts_audio_queue, executor, lookahead
+            )
+        # 文本处理任务，流式TTS在子类中重写tts_text_consumer
+        self.tts_text_task = asyncio.create_task(self.tts_text_consumer())
 
-        # 音频播放 消化线程
-        self.audio_play_priority_thread = threading.Thread(
-            target=self._audio_play_priority_thread, daemon=True
-        )
-        self.audio_play_priority_thread.start()
+        # 音频播放任务，按帧时长节奏发送音频
+        self.audio_play_task = asyncio.create_task(self._audio_play_loop())
+
+    def stop_audio_channels(self):
+        """停止文本处理和音频播放任务，在这些任务中调用时由stop_event结束循环"""
+        current = asyncio.current_task()
+        for task in (self.tts_text_task, self.audio_play_task):
+            if task is not None and not task.done() and task is not current:
+                task.cancel()
+
+    async def _run_blocking(self, func, *args):
+        """在共享合成线程池中执行阻塞操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_synthesis_executor(), func, *args)
 
     # 这里默认是非流式的处理方式
-    # 流式处理方式请在子类中重写
-    def tts_text_priority_thread(self):
+    async def tts_text_consumer(self):
+        """在事件循环中处理TTS文本：分句在这里完成，合成放到共享合成线程池"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                # 首句有时间预算时，到期后即使没有新文本也要切出首句；
+                # 被打断后不再切分，一直等到下一条消息
+                message = await self.tts_text_queue.get_async(
+                    timeout=None
+                    if self.conn.client_abort
+                    else self.segmenter.time_until_flush()
+                )
                 if message.sentence_type == SentenceType.FIRST:
                     self.conn.client_abort = False
                 if self.conn.client_abort:
                     logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+                    self.segmenter.reset()
                     continue
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
+                    self.segmenter.reset()
                     self.tts_audio_first_sentence = True
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
+                    self.segmenter.append(message.content_detail)
                     segment_text = self._get_segment_text()
                     if segment_text:
-                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
+                        await self._speak_segment(segment_text)
                 elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
+                    await self._process_remaining_text_stream()
                     tts_file = message.content_file
                     if tts_file and os.path.exists(tts_file):
-                        self._process_audio_file_stream(
-                            tts_file, callback=self.handle_opus
-                        )
+                        await self._play_file(tts_file)
                 if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
+                    await self._process_remaining_text_stream()
+                    # 并行合成的段已按顺序排在播放队列中，结束标记直接排在其后
                     self.tts_audio_queue.put(
                         (message.sentence_type, [], message.content_detail)
                     )
 
             except queue.Empty:
+                if self.conn.client_abort:
+                    # 等待期间被打断，丢弃尚未切出的文本
+                    self.segmenter.reset()
+                elif self.segmenter.time_until_flush() == 0:
+                    segment_text = self._get_segment_text()
+                    if segment_text:
+                        await self._speak_segment(segment_text)
                 continue
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
                 continue
 
-    def _audio_play_priority_thread(self):
-        # 需要上报的文本和音频列表
-        enqueue_text = None
-        enqueue_audio = None
-        while not self.conn.stop_event.is_set():
-            text = None
-            try:
-                try:
-                    sentence_type, audio_datas, text = self.tts_audio_queue.get(
-                        timeout=0.1
-                    )
-                except queue.Empty:
-                    if self.conn.stop_event.is_set():
-                        break
-                    continue
-
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
-                    enqueue_text, enqueue_audio = None, []
-                    continue
-
-                # 收到下一个文本开始或会话结束时进行上报
-                if sentence_type is not SentenceType.MIDDLE:
-                    # 上报TTS数据
-                    if enqueue_text is not None and enqueue_audio is not None:
-                        enqueue_tts_report(self.conn, enqueue_text, enqueue_audio)
-                    enqueue_audio = []
-                    enqueue_text = text
-
-                # 收集上报音频数据
-                if isinstance(audio_datas, bytes) and enqueue_audio is not None:
-                    enqueue_audio.append(audio_datas)
-
-                # 发送音频
-                future = asyncio.run_coroutine_threadsafe(
-                    sendAudioMessage(self.conn, sentence_type, audio_datas, text),
-                    self.conn.loop,
-                )
-                future.result()
+    async def _speak_segment(self, text):
+        """合成一段文本，开启并行合成时提前合成后面的段，按顺序播放"""
+        if self.synthesis_pipeline is None:
+            await self._run_blocking(self.to_tts_stream, text, self.handle_opus)
+            return
+        await self.synthesis_pipeline.submit(self._synthesize_segment, text)
+
+    def _synthesize_segment(self, segment_queue: queue.Queue, text):
+        if self.conn.client_abort:
+            # 已被打断，排队中的段不再合成
+            return
+        self.to_tts_stream(
+            text,
+            opus_handler=lambda data: segment_queue.put(
+                (SentenceType.MIDDLE, data, None)
+            ),
+            audio_queue=segment_queue,
+        )
 
-                # 记录输出和报告
-                if self.conn.max_output_size > 0 and text:
-                    add_device_output(self.conn.headers.get("device-id"), len(text))
+    async def _play_file(self, tts_file):
+        """播放音频文件，开启并行合成时排在之前的段之后"""
+        if self.synthesis_pipeline is None:
+            await self._run_blocking(
+                self._process_audio_file_stream, tts_file, self.handle_opus
+            )
+            return
+        await self.synthesis_pipeline.submit(
+            lambda segment_queue: self._process_audio_file_stream(
+                tts_file,
+                callback=lambda data: segment_queue.put(
+                    (SentenceType.MIDDLE, data, None)
+                ),
+            )
+        )
 
-            except Exception as e:
-                logger.bind(tag=TAG).error(f"audio_play_priority_thread: {text} {e}")
+    async def _audio_play_loop(self):
+        """音频播放任务：有音频时立即唤醒，按帧时长节奏发送"""
+        # 需要上报的文本和音频列表
+        self._report_text = None
+        self._report_audio = None
+        while not self.conn.stop_event.is_set():
+            item = await self.tts_audio_queue.get_async()
+            if isinstance(item, SynthesisSegment):
+                # 并行合成的段，读完这一段再播放后面的内容
+                async for entry in self.synthesis_pipeline.read(item):
+                    await self._play_audio_item(entry)
+            else:
+                await self._play_audio_item(item)
+
+    async def _play_audio_item(self, item):
+        text = None
+        try:
+            sentence_type, audio_datas, text = item
+
+            if self.conn.client_abort:
+                logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
+                self._report_text, self._report_audio = None, []
+                return
+
+            # 收到下一个文本开始或会话结束时进行上报
+            if sentence_type is not SentenceType.MIDDLE:
+                # 上报TTS数据
+                if self._report_text is not None and self._report_audio is not None:
+                    enqueue_tts_report(self.conn, self._report_text, self._report_audio)
+                self._report_audio = []
+                self._report_text = text
+
+            # 收集上报音频数据
+            if isinstance(audio_datas, bytes) and self._report_audio is not None:
+                self._report_audio.append(audio_datas)
+
+            # 发送音频
+            await sendAudioMessage(self.conn, sentence_type, audio_datas, text)
+
+            # 记录输出和报告
+            if self.conn.max_output_size > 0 and text:
+                add_device_output(self.conn.headers.get("device-id"), len(text))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"audio_play_loop: {text} {e}")
 
     async def start_session(self, session_id):
         pass
@@ -363,44 +579,19 @@ class TTSProviderBase(ABC):
 
     async def close(self):
         """资源清理方法"""
+        if self.synthesis_pipeline is not None:
+            self.synthesis_pipeline.close()
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
     def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(
-                segment_text_raw
-            )
-            self.processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-            # 如果是第一句话，在找到第一个逗号后，将标志设置为False
-            if self.is_first_sentence:
-                self.is_first_sentence = False
-
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
+        # 第一句在逗号等标点处切分，之后在句末标点处切分
+        segment_text_raw = self.segmenter.pop_segment()
+        if segment_text_raw is not None:
+            return textUtils.get_string_no_punctuation_or_emoji(segment_text_raw)
+        elif self.tts_stop_request and len(self.segmenter):
+            segment_text = self.segmenter.take_remaining()
+            self.segmenter.is_first_sentence = True  # 重置标志
             return segment_text
         else:
             return None
@@ -435,20 +626,16 @@ class TTSProviderBase(ABC):
         self.before_stop_play_files.clear()
         self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
-    def _process_remaining_text_stream(
-        self, opus_handler: Callable[[bytes], None] = None
-    ):
+    async def _process_remaining_text_stream(self):
         """处理剩余的文本并生成语音
 
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
+        remaining_text = self.segmenter.take_remaining()
         if remaining_text:
             segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
             if segment_text:
-                self.to_tts_stream(segment_text, opus_handler=opus_handler)
-                self.processed_chars += len(full_text)
+                await self._speak_segment(segment_text)
                 return True
         return False
@@ -6,6 +6,9 @@ from core.providers.tts.base import TTSProviderBase
 
 
 class TTSProvider(TTSProviderBase):
+    # 实现了text_to_speak_stream，边接收边解码
+    supports_audio_stream = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         if config.get("private_voice"):
@@ -43,4 +46,13 @@ class TTSProvider(TTSProviderBase):
                 return audio_bytes
         except Exception as e:
             error_msg = f"Edge TTS请求失败: {e}"
-            raise Exception(error_msg)  # 抛出异常，让调用方捕获
\ No newline at end of file
+            raise Exception(error_msg)  # 抛出异常，让调用方捕获
+
+    async def text_to_speak_stream(self, text):
+        try:
+            communicate = edge_tts.Communicate(text, voice=self.voice)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    yield chunk["data"]
+        except Exception as e:
+            raise Exception(f"Edge TTS请求失败: {e}")
@@ -4,12 +4,14 @@ import json
 import queue
 import asyncio
 import traceback
+from functools import partial
 from typing import Callable, Any
 import websockets
 from core.utils.tts import MarkdownCleaner
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.util import check_model_key
+from core.utils.tts_session_mux import get_session_mux
 from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from asyncio import Task
@@ -129,6 +131,24 @@ class Optional:
         return option_bytes
 
 
+def _session_id_of(msg) -> str | None:
+    """从下行帧中取出会话ID，连接级事件和错误帧返回None"""
+    if isinstance(msg, str) or len(msg) < 12:
+        return None
+    if msg[1] & 0x0F != MsgTypeFlagWithEvent:
+        return None
+    event = int.from_bytes(msg[4:8], "big", signed=True)
+    if event in (
+        EVENT_NONE,
+        EVENT_ConnectionStarted,
+        EVENT_ConnectionFailed,
+        EVENT_ConnectionFinished,
+    ):
+        return None
+    size = int.from_bytes(msg[8:12], "big", signed=True)
+    return msg[12 : 12 + size].decode("utf-8", errors="ignore")
+
+
 class Response:
     def __init__(self, header: Header, optional: Optional):
         self.optional = optional
@@ -139,6 +159,22 @@ class Response:
         return super().__str__()
 
 
+async def _connect(ws_url, app_id, access_token, resource_id):
+    """建立新的上游WebSocket连接，由共享的连接复用器长期持有，只依赖服务配置"""
+    logger.bind(tag=TAG).info("开始建立新连接...")
+    ws_header = {
+        "X-Api-App-Key": app_id,
+        "X-Api-Access-Key": access_token,
+        "X-Api-Resource-Id": resource_id,
+        "X-Api-Connect-Id": uuid.uuid4(),
+    }
+    ws = await websockets.connect(
+        ws_url, additional_headers=ws_header, max_size=1000000000
+    )
+    logger.bind(tag=TAG).info("WebSocket连接建立成功")
+    return ws
+
+
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
@@ -171,6 +207,25 @@ class TTSProvider(TTSProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
+        # 上游连接由同一账号、资源的所有设备共享，下行消息按会话ID分发
+        self._session_id = None
+        self._responses = None
+        self.mux = get_session_mux(
+            (
+                "huoshan_double_stream",
+                self.ws_url,
+                self.appId,
+                self.access_token,
+                self.resource_id,
+            ),
+            "火山双流式TTS",
+            partial(
+                _connect, self.ws_url, self.appId, self.access_token, self.resource_id
+            ),
+            _session_id_of,
+            config,
+        )
+
     async def open_audio_channels(self, conn):
         try:
             await super().open_audio_channels(conn)
@@ -179,34 +234,32 @@ class TTSProvider(TTSProviderBase):
             self.ws = None
             raise
 
-    async def _ensure_connection(self):
-        """建立新的WebSocket连接"""
+    async def _ensure_connection(self, session_id):
+        """从共享连接中为会话分配一条上游连接"""
         try:
-            if self.ws:
-                logger.bind(tag=TAG).info(f"使用已有链接...")
-                return self.ws
-            logger.bind(tag=TAG).info("开始建立新连接...")
-            ws_header = {
-                "X-Api-App-Key": self.appId,
-                "X-Api-Access-Key": self.access_token,
-                "X-Api-Resource-Id": self.resource_id,
-                "X-Api-Connect-Id": uuid.uuid4(),
-            }
-            self.ws = await websockets.connect(
-                self.ws_url, additional_headers=ws_header, max_size=1000000000
+            self._responses = asyncio.Queue()
+            self.ws = await self.mux.open_session(
+                session_id, self._responses.put_nowait
             )
-            logger.bind(tag=TAG).info("WebSocket连接建立成功")
+            self._session_id = session_id
             return self.ws
         except Exception as e:
             logger.bind(tag=TAG).error(f"建立连接失败: {str(e)}")
             self.ws = None
             raise
 
-    def tts_text_priority_thread(self):
-        """火山引擎双流式TTS的文本处理线程"""
+    async def _release_session(self, broken=False):
+        """归还上游连接，会话异常结束时关闭该连接"""
+        session_id, self._session_id = self._session_id, None
+        self.ws = None
+        if session_id:
+            await self.mux.release(session_id, broken=broken)
+
+    async def tts_text_consumer(self):
+        """火山引擎双流式TTS的文本处理任务，在事件循环中等待新文本并转发给上游会话"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = await self.tts_text_queue.get_async()
                 logger.bind(tag=TAG).debug(
                     f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
                 )
@@ -217,10 +270,7 @@ class TTSProvider(TTSProviderBase):
                 if self.conn.client_abort:
                     try:
                         logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                        asyncio.run_coroutine_threadsafe(
-                            self.cancel_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
+                        await self.cancel_session(self.conn.sentence_id)
                         continue
                     except Exception as e:
                         logger.bind(tag=TAG).error(f"取消TTS会话失败: {str(e)}")
@@ -234,11 +284,7 @@ class TTSProvider(TTSProviderBase):
                             logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
 
                         logger.bind(tag=TAG).info("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.start_session(self.conn.sentence_id)
                         self.before_stop_play_files.clear()
                         logger.bind(tag=TAG).info("TTS会话启动成功")
                     except Exception as e:
@@ -251,11 +297,7 @@ class TTSProvider(TTSProviderBase):
                             logger.bind(tag=TAG).debug(
                                 f"开始发送TTS文本: {message.content_detail}"
                             )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
+                            await self.text_to_speak(message.content_detail, None)
                             logger.bind(tag=TAG).debug("TTS文本发送成功")
                         except Exception as e:
                             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
@@ -267,21 +309,21 @@ class TTSProvider(TTSProviderBase):
                     )
                     if message.content_file and os.path.exists(message.content_file):
                         # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                        await self._run_blocking(
+                            self._process_audio_file_stream,
+                            message.content_file,
+                            lambda audio_data: self.handle_audio_file(audio_data, message.content_detail),
+                        )
                 if message.sentence_type == SentenceType.LAST:
                     try:
                         logger.bind(tag=TAG).info("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.finish_session(self.conn.sentence_id)
                     except Exception as e:
                         logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
                         continue
 
-            except queue.Empty:
-                continue
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
@@ -304,12 +346,7 @@ class TTSProvider(TTSProviderBase):
             return
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            await self._release_session(broken=True)
             raise
 
     async def start_session(self, session_id):
@@ -324,8 +361,8 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).info("检测到未完成的上个会话，关闭监听任务和连接...")
                 await self.close()
 
-            # 建立新连接
-            await self._ensure_connection()
+            # 分配上游连接
+            await self._ensure_connection(session_id)
 
             # 启动监听任务
             self._monitor_task = asyncio.create_task(self._start_monitor_tts_response())
@@ -416,12 +453,11 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning(f"关闭时取消监听任务错误: {e}")
             self._monitor_task = None
 
-        if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
-            self.ws = None
+        # 会话未正常结束，上游状态不确定，关闭其所在连接
+        await self._release_session(broken=True)
+
+        # 归还Opus编码器到编码器池
+        self.opus_encoder.close()
 
     async def _start_monitor_tts_response(self):
         """监听TTS响应"""
@@ -429,8 +465,10 @@ class TTSProvider(TTSProviderBase):
             session_finished = False  # 标记会话是否正常结束
             while not self.conn.stop_event.is_set():
                 try:
-                    # 确保 `recv()` 运行在同一个 event loop
-                    msg = await self.ws.recv()
+                    msg = await self._responses.get()
+                    if msg is None:
+                        logger.bind(tag=TAG).warning("WebSocket连接已关闭")
+                        break
                     res = self.parser_response(msg)
                     self.print_response(res, "send_text res:")
 
@@ -466,13 +504,8 @@ class TTSProvider(TTSProviderBase):
                     )
                     traceback.print_exc()
                     break
-            # 仅在连接异常时才关闭
-            if not session_finished and self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            # 会话正常结束时连接留给下一个会话，异常时关闭
+            await self._release_session(broken=not session_finished)
         # 监听任务退出时清理引用
         finally:
             self._monitor_task = None
@@ -36,22 +36,23 @@ class TTSProvider(TTSProviderBase):
         # PCM缓冲区
         self.pcm_buffer = bytearray()
 
-    def tts_text_priority_thread(self):
-        """流式文本处理线程"""
+    async def tts_text_consumer(self):
+        """流式文本处理任务，分句在事件循环中完成，合成放到共享合成线程池"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = await self.tts_text_queue.get_async()
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
+                    self.segmenter.reset()
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
+                    self.segmenter.append(message.content_detail)
                     segment_text = self._get_segment_text()
                     if segment_text:
-                        self.to_tts_single_stream(segment_text)
+                        await self._run_blocking(
+                            self.to_tts_single_stream, segment_text
+                        )
 
                 elif ContentType.FILE == message.content_type:
                     logger.bind(tag=TAG).info(
@@ -59,33 +60,33 @@ class TTSProvider(TTSProviderBase):
                     )
                     if message.content_file and os.path.exists(message.content_file):
                         # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                        await self._run_blocking(
+                            self._process_audio_file_stream,
+                            message.content_file,
+                            lambda audio_data: self.handle_audio_file(audio_data, message.content_detail),
+                        )
 
                 if message.sentence_type == SentenceType.LAST:
-                    # 处理剩余的文本
-                    self._process_remaining_text_stream(True)
+                    # 处理剩余的文本：分句器只在事件循环中访问，合成放到合成线程池
+                    remaining_text = self.segmenter.take_remaining()
+                    await self._run_blocking(self._speak_last_segment, remaining_text)
 
-            except queue.Empty:
-                continue
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
 
-    def _process_remaining_text_stream(self, is_last=False):
-        """处理剩余的文本并生成语音
-        Returns:
-            bool: 是否成功处理了文本
-        """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
-            else:
-                self._process_before_stop_play_files()
+    def _speak_last_segment(self, remaining_text):
+        """合成事件循环中取出的剩余文本作为最后一句，没有可合成的文本时播放停止前的音频文件"""
+        segment_text = (
+            textUtils.get_string_no_punctuation_or_emoji(remaining_text)
+            if remaining_text
+            else ""
+        )
+        if segment_text:
+            self.to_tts_single_stream(segment_text, True)
         else:
             self._process_before_stop_play_files()
 
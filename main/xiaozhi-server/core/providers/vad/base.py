@@ -1,5 +1,20 @@
+import time
+import asyncio
+import weakref
+import threading
+import numpy as np
+import opuslib_next
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from config.logger import setup_logging
+from core.utils.vad_engine import VADBatchEngine, VADSession, VAD_CHUNK_SAMPLES
+
+TAG = __name__
+logger = setup_logging()
+
+# 没有批量推理的VAD实现共用的推理线程，单线程保证模型不会被并发调用
+_vad_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vad")
 
 
 class VADProviderBase(ABC):
@@ -7,3 +22,227 @@ class VADProviderBase(ABC):
     def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    async def is_vad_async(self, conn, data) -> bool:
+        """检测语音活动，推理放到共享的VAD线程执行，不阻塞事件循环；支持批量推理的实现可重写此方法"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_vad_executor, self.is_vad, conn, data)
+
+
+class BatchVADProviderBase(VADProviderBase):
+    """按512采样点分块、跨连接批量推理的VAD基类
+
+    子类只需要实现模型加载、_new_state和_infer_batch，
+    解码、分块、双阈值判断和静默检测在这里统一处理。
+    """
+
+    def __init__(self, config):
+        # 处理空字符串的情况
+        threshold = config.get("threshold", "0.5")
+        threshold_low = config.get("threshold_low", "0.2")
+        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
+
+        self.vad_threshold = float(threshold) if threshold else 0.5
+        self.vad_threshold_low = float(threshold_low) if threshold_low else 0.2
+
+        self.silence_threshold_ms = (
+            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
+        )
+
+        # 至少要多少帧才算有语音
+        self.frame_window_threshold = 3
+
+        # 能量预筛：明显静音的音频块不送入模型
+        energy_gate = config.get("energy_gate", True)
+        self.energy_gate = str(energy_gate).lower() in ("true", "1", "yes")
+        min_rms = config.get("energy_gate_min_rms", "0.003")
+        noise_ratio = config.get("energy_gate_noise_ratio", "2.0")
+        max_rms = config.get("energy_gate_max_rms", "0.03")
+        self.gate_min_rms = float(min_rms) if min_rms else 0.003
+        self.gate_noise_ratio = float(noise_ratio) if noise_ratio else 2.0
+        self.gate_max_rms = float(max_rms) if max_rms else 0.03
+        # 过零率高于该值的低能量音频块可能是清辅音（s、sh等），仍交给模型判断
+        self.gate_fricative_zcr = 0.3
+        self.gate_total = 0
+        self.gate_skipped = 0
+
+        # 每个连接独立的解码器和模型循环状态
+        self._sessions = weakref.WeakKeyDictionary()
+        self._sessions_lock = threading.Lock()
+
+        # 跨连接批量推理
+        batch_max_size = config.get("batch_max_size", 64)
+        batch_max_wait_ms = config.get("batch_max_wait_ms", 4)
+        self.engine = VADBatchEngine(
+            self._infer_batch,
+            max_batch=int(batch_max_size) if batch_max_size else 64,
+            max_wait_ms=float(batch_max_wait_ms) if batch_max_wait_ms else 4,
+        )
+
+    @abstractmethod
+    def _new_state(self):
+        """返回(state, context)，作为新连接的模型初始循环状态"""
+        pass
+
+    @abstractmethod
+    def _infer_batch(self, chunks: np.ndarray, sessions) -> np.ndarray:
+        """批量推理(B, 512)的音频块，返回B个语音概率并更新各会话的循环状态"""
+        pass
+
+    def _skip_chunk(self, session, chunk):
+        """音频块被能量预筛跳过时调用，默认把模型循环状态重置为初始状态
+
+        跳过的音频块不经过模型，沿用之前的循环状态会让下一次推理基于过期的上下文。
+        """
+        session.state, session.context = self._new_state()
+
+    def _get_session(self, conn) -> VADSession:
+        with self._sessions_lock:
+            session = self._sessions.get(conn)
+            if session is None:
+                state, context = self._new_state()
+                session = VADSession(
+                    decoder=opuslib_next.Decoder(16000, 1),
+                    state=state,
+                    context=context,
+                    noise_floor=self.gate_min_rms,
+                )
+                self._sessions[conn] = session
+            return session
+
+    def _split_chunks(self, conn, opus_packet):
+        """解码opus并切分出完整的512采样点音频块"""
+        session = self._get_session(conn)
+        conn.client_pcm_frame = None
+        pcm_frame = session.decoder.decode(opus_packet, 960)
+        # 记录本包的解码结果，供ASR和声纹识别复用，不再重复解码
+        conn.client_pcm_frame = pcm_frame
+        conn.client_audio_buffer.write(pcm_frame)  # 将新数据加入缓冲区
+
+        chunks = []
+        # 处理缓冲区中的完整帧（每次处理512采样点）
+        while len(conn.client_audio_buffer) >= VAD_CHUNK_SAMPLES:
+            # 取出512个采样点的视图，转换为模型需要的格式
+            audio_int16 = conn.client_audio_buffer.read(VAD_CHUNK_SAMPLES)
+            chunks.append(audio_int16.astype(np.float32) / 32768.0)
+        return session, chunks
+
+    def _gate_features(self, chunks) -> Optional[List[Tuple[float, float]]]:
+        """向量化计算每个音频块的RMS和过零率，未开启能量预筛时返回None"""
+        if not self.energy_gate or not chunks:
+            return None
+        frames = np.stack(chunks)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        return list(zip(rms.tolist(), zcr.tolist()))
+
+    def _energy_gate(self, conn, session, chunk_rms, chunk_zcr) -> bool:
+        """判断一个音频块能否跳过模型推理
+
+        只有在当前不处于语音状态（last_is_voice为False）时才跳过，跳过的音频块按语音概率0处理，
+        不影响client_voice_stop的判断。需要在前一个音频块的结果更新last_is_voice之后再调用，
+        包中间开始说话时后面的音频块不会被跳过。
+        """
+        gate = min(
+            max(self.gate_min_rms, session.noise_floor * self.gate_noise_ratio),
+            self.gate_max_rms,
+        )
+        fricative = chunk_zcr >= self.gate_fricative_zcr and (
+            chunk_rms >= self.gate_min_rms
+        )
+        skip = not conn.last_is_voice and chunk_rms < gate and not fricative
+        if skip or chunk_rms < session.noise_floor:
+            # 底噪快降慢升，只用疑似静音的音频块更新
+            alpha = 0.1 if chunk_rms < session.noise_floor else 0.02
+            session.noise_floor += alpha * (chunk_rms - session.noise_floor)
+
+        session.gate_total += 1
+        self.gate_total += 1
+        if skip:
+            session.gate_skipped += 1
+            self.gate_skipped += 1
+        return skip
+
+    def _should_skip(self, conn, session, features, index) -> bool:
+        return features is not None and self._energy_gate(
+            conn, session, *features[index]
+        )
+
+    def get_stats(self) -> dict:
+        """VAD运行统计，包括能量预筛跳过的音频块数量和批量推理情况"""
+        return {
+            "gate_total": self.gate_total,
+            "gate_skipped": self.gate_skipped,
+            "gate_skip_ratio": (
+                self.gate_skipped / self.gate_total if self.gate_total else 0.0
+            ),
+            "batches": self.engine.batches,
+            "average_batch_size": self.engine.average_batch_size,
+        }
+
+    def _update_voice_state(self, conn, speech_prob) -> bool:
+        # 双阈值判断
+        if speech_prob >= self.vad_threshold:
+            is_voice = True
+        elif speech_prob <= self.vad_threshold_low:
+            is_voice = False
+        else:
+            is_voice = conn.last_is_voice
+
+        # 声音没低于最低值则延续前一个状态，判断为有声音
+        conn.last_is_voice = is_voice
+
+        # 更新滑动窗口
+        conn.client_voice_window.append(is_voice)
+        client_have_voice = (
+            conn.client_voice_window.count(True) >= self.frame_window_threshold
+        )
+
+        # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
+        if conn.client_have_voice and not client_have_voice:
+            stop_duration = time.time() * 1000 - conn.last_activity_time
+            if stop_duration >= self.silence_threshold_ms:
+                conn.client_voice_stop = True
+        if client_have_voice:
+            conn.client_have_voice = True
+            conn.last_activity_time = time.time() * 1000
+        return client_have_voice
+
+    def is_vad(self, conn, opus_packet):
+        try:
+            session, chunks = self._split_chunks(conn, opus_packet)
+            features = self._gate_features(chunks)
+            client_have_voice = False
+            for index, chunk in enumerate(chunks):
+                if self._should_skip(conn, session, features, index):
+                    self._skip_chunk(session, chunk)
+                    speech_prob = 0.0
+                else:
+                    speech_prob = self.engine.submit(session, chunk).result()
+                client_have_voice = self._update_voice_state(conn, speech_prob)
+            return client_have_voice
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+
+    async def is_vad_async(self, conn, opus_packet):
+        try:
+            session, chunks = self._split_chunks(conn, opus_packet)
+            features = self._gate_features(chunks)
+            client_have_voice = False
+            # 逐块推理：是否跳过下一块取决于这一块的推理结果
+            for index, chunk in enumerate(chunks):
+                if self._should_skip(conn, session, features, index):
+                    self._skip_chunk(session, chunk)
+                    speech_prob = 0.0
+                else:
+                    speech_prob = await asyncio.wrap_future(
+                        self.engine.submit(session, chunk)
+                    )
+                client_have_voice = self._update_voice_state(conn, speech_prob)
+            return client_have_voice
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
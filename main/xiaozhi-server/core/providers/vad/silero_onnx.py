@@ -0,0 +1,63 @@
+import os
+import time
+import numpy as np
+import onnxruntime
+from config.logger import setup_logging
+from core.providers.vad.base import BatchVADProviderBase
+
+TAG = __name__
+logger = setup_logging()
+
+# Silero模型在16kHz下每次推理需要拼接的上下文采样点数
+CONTEXT_SAMPLES = 64
+DEFAULT_MODEL_FILE = os.path.join("src", "silero_vad", "data", "silero_vad.onnx")
+
+
+class VADProvider(BatchVADProviderBase):
+    """通过onnxruntime运行Silero VAD，不依赖torch"""
+
+    def __init__(self, config):
+        logger.bind(tag=TAG).info("SileroVAD(onnx)", config)
+        start_time = time.time()
+        model_path = config.get("model_path") or os.path.join(
+            config["model_dir"], DEFAULT_MODEL_FILE
+        )
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"Silero ONNX模型文件不存在: {model_path}")
+
+        # 显式使用单线程会话，避免每个进程按CPU核数开线程
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self.sample_rate = np.array(16000, dtype=np.int64)
+        logger.bind(tag=TAG).info(
+            f"SileroVAD(onnx)模型加载耗时: {time.time() - start_time:.3f}s"
+        )
+        super().__init__(config)
+
+    def _new_state(self):
+        return (
+            np.zeros((2, 1, 128), dtype=np.float32),
+            np.zeros((1, CONTEXT_SAMPLES), dtype=np.float32),
+        )
+
+    def _skip_chunk(self, session, chunk):
+        """跳过的音频块重置循环状态，上下文取该块末尾的采样点，与推理后的上下文一致"""
+        session.state = self._new_state()[0]
+        session.context = chunk[-CONTEXT_SAMPLES:].reshape(1, -1).copy()
+
+    def _infer_batch(self, chunks: np.ndarray, sessions) -> np.ndarray:
+        """一次推理多个连接的音频块，循环状态显式传入传出"""
+        context = np.concatenate([s.context for s in sessions], axis=0)
+        x = np.concatenate([context, chunks], axis=1)
+        state = np.concatenate([s.state for s in sessions], axis=1)
+        out, state = self.session.run(
+            None, {"input": x, "state": state, "sr": self.sample_rate}
+        )
+        for i, session in enumerate(sessions):
+            session.state = state[:, i : i + 1].copy()
+            session.context = x[i : i + 1, -CONTEXT_SAMPLES:].copy()
+        return out.reshape(-1)
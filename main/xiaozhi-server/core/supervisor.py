@@ -0,0 +1,398 @@
+"""
+多进程服务
+单个asyncio进程最多用满一个CPU核心。多进程模式下主进程（supervisor）先加载VAD、本地ASR等共享模型，
+再fork出多个工作进程，模型内存按写时复制由各工作进程共用；每个工作进程运行自己的事件循环，
+通过SO_REUSEPORT监听同一端口，由内核把新连接分配给各个进程。
+supervisor负责重启异常退出的工作进程，收到SIGHUP时逐个平滑重启工作进程，并定期汇总各进程的运行统计。
+仅支持Linux。
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Deque, Dict, Optional
+
+from config.logger import setup_logging
+from core.http_server import SimpleHttpServer
+from core.websocket_server import WebSocketServer
+from core.utils.audio_assets import preload_assets
+from core.utils.modules_initialize import initialize_modules
+from core.utils.worker_pools import get_pool_stats
+
+TAG = __name__
+logger = setup_logging()
+
+# 工作进程启动后这么久内退出视为启动失败，重启间隔按失败次数递增
+MIN_WORKER_UPTIME_S = 10
+MAX_RESTART_DELAY_S = 30
+
+
+def multiprocess_supported() -> bool:
+    """多进程模式依赖fork和按连接负载均衡的SO_REUSEPORT，仅Linux可用"""
+    return sys.platform.startswith("linux") and hasattr(os, "fork")
+
+
+def get_worker_count(config: dict) -> int:
+    workers = config.get("server", {}).get("workers", 1)
+    return max(1, int(workers)) if workers else 1
+
+
+async def _worker_main(config, shared_modules, index, stats_conn, stats_interval, drain_timeout):
+    """工作进程入口：运行WebSocket和HTTP服务，收到SIGTERM后停止接受新连接并等待现有连接结束"""
+    ws_server = WebSocketServer(config, shared_modules, reuse_port=True)
+    http_server = SimpleHttpServer(config, reuse_port=True)
+    ws_task = asyncio.create_task(ws_server.start())
+    http_task = asyncio.create_task(http_server.start())
+
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    stop_task = asyncio.create_task(stop_event.wait())
+
+    # 开始监听后通知supervisor
+    while ws_server.server is None and not ws_task.done():
+        await asyncio.sleep(0.1)
+    stats_task = None
+    if not ws_task.done():
+        _send(stats_conn, {"type": "ready"})
+        stats_task = asyncio.create_task(
+            _report_stats(ws_server, stats_conn, stats_interval)
+        )
+        logger.bind(tag=TAG).info(f"工作进程{index}开始监听")
+
+    try:
+        await asyncio.wait({ws_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        if ws_task.done():
+            # 监听失败等异常
+            ws_task.result()
+            return
+        logger.bind(tag=TAG).info(f"工作进程{index}收到停止信号，等待现有连接结束")
+        await ws_server.shutdown(drain_timeout)
+    finally:
+        for task in (ws_task, http_task, stop_task, stats_task):
+            if task is not None:
+                task.cancel()
+
+
+async def _report_stats(ws_server, stats_conn, interval):
+    while True:
+        stats = {
+            "type": "stats",
+            "connections": len(ws_server.active_connections),
+            "admission": ws_server.admission.get_stats(),
+            "pools": get_pool_stats(),
+            "vad": ws_server.get_vad_stats(),
+        }
+        if not _send(stats_conn, stats):
+            return
+        await asyncio.sleep(interval)
+
+
+def _send(conn, message) -> bool:
+    try:
+        conn.send(message)
+        return True
+    except (BrokenPipeError, OSError):
+        return False
+
+
+class _WorkerProcess:
+    def __init__(self, index: int, pid: int, reader):
+        self.index = index
+        self.pid = pid
+        self.reader = reader
+        self.started_at = time.monotonic()
+        self.ready = False
+        self.retiring = False  # 已被替换，退出后不再重启
+        self.terminated_at: Optional[float] = None
+        self.stats: dict = {}
+
+
+class Supervisor:
+    """多进程模式的主进程
+
+    - SIGTERM/SIGINT：通知所有工作进程停止接受新连接，等待现有连接结束后退出
+    - SIGHUP：逐个平滑重启工作进程，新进程开始监听后旧进程才停止接受新连接
+    - 工作进程异常退出时自动重启，启动即失败的按次数递增重启间隔
+    """
+
+    def __init__(self, config: dict, workers: int):
+        self.config = config
+        self.workers = workers
+        server_config = config.get("server", {})
+        drain_timeout = server_config.get("worker_drain_timeout", 30)
+        stats_interval = server_config.get("worker_stats_interval", 60)
+        self.drain_timeout = (
+            float(drain_timeout) if drain_timeout not in (None, "") else 30
+        )
+        self.stats_interval = float(stats_interval) if stats_interval else 60
+        self.shared_modules = {}
+
+        self._workers: Dict[int, _WorkerProcess] = {}  # pid -> 工作进程
+        self._slots: Dict[int, int] = {}  # 编号 -> 当前承担该编号的pid
+        self._failures: Dict[int, int] = {}  # 编号 -> 连续启动失败次数
+        self._respawn_at: Dict[int, float] = {}  # 编号 -> 计划重启时间
+        self._restart_queue: Deque[int] = deque()
+        self._replacing = None  # (编号, 旧pid, 新pid)
+        self._stopping = False
+        self._stop_sent = False
+        self._reload_requested = False
+
+    def _load_shared_modules(self) -> dict:
+        """在主进程加载VAD和ASR，fork后由各工作进程共享"""
+        selected = self.config["selected_module"]
+        init_asr = "ASR" in selected and not self._asr_in_subprocess()
+        modules = initialize_modules(
+            logger, self.config, "VAD" in selected, init_asr
+        )
+        count = preload_assets()
+        logger.bind(tag=TAG).info(
+            f"共享模块已加载: {', '.join(modules) or '无'}，预加载{count}个提示音资源"
+        )
+        return modules
+
+    def _asr_in_subprocess(self) -> bool:
+        # 开启了ASR副本进程时，副本进程的管道不能被多个工作进程共用，由各工作进程自行创建
+        asr_name = self.config["selected_module"].get("ASR")
+        asr_config = self.config.get("ASR", {}).get(asr_name, {}) or {}
+        replicas = asr_config.get("process_replicas", 0)
+        return bool(replicas) and int(replicas) > 0
+
+    def run(self):
+        self.shared_modules = self._load_shared_modules()
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.bind(tag=TAG).info(
+            f"多进程模式已启动，工作进程数: {self.workers}，发送SIGHUP可逐个平滑重启"
+        )
+
+        last_report = time.monotonic()
+        while self._workers or (not self._stopping and self._respawn_at):
+            readers = [w.reader for w in self._workers.values() if w.reader]
+            if readers:
+                for reader in wait(readers, timeout=1):
+                    self._receive(reader)
+            else:
+                time.sleep(1)
+
+            self._reap()
+            if self._stopping:
+                self._stop_all()
+                continue
+            self._respawn_due()
+            if self._reload_requested:
+                self._reload_requested = False
+                self._start_rolling_restart()
+            self._restart_step()
+            if time.monotonic() - last_report >= self.stats_interval:
+                last_report = time.monotonic()
+                self._log_stats()
+        logger.bind(tag=TAG).info("所有工作进程已退出")
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        # 信号处理函数中只设置标志，在主循环中处理
+        self._reload_requested = True
+
+    def _start_rolling_restart(self):
+        if self._restart_queue or self._replacing:
+            logger.bind(tag=TAG).warning("上一次平滑重启尚未完成，忽略本次请求")
+            return
+        logger.bind(tag=TAG).info("收到SIGHUP，开始逐个平滑重启工作进程")
+        self._restart_queue.extend(sorted(self._slots))
+
+    def _spawn(self, index: int) -> int:
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(index, reader, writer)
+        writer.close()
+        self._workers[pid] = _WorkerProcess(index, pid, reader)
+        self._slots[index] = pid
+        logger.bind(tag=TAG).info(f"工作进程{index}已启动，PID: {pid}")
+        return pid
+
+    def _run_child(self, index, reader, writer):
+        code = 0
+        try:
+            reader.close()
+            for worker in self._workers.values():
+                if worker.reader:
+                    worker.reader.close()
+            # 停止和重启由supervisor统一调度，终端的Ctrl-C只由主进程处理
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            asyncio.run(
+                _worker_main(
+                    self.config,
+                    self.shared_modules,
+                    index,
+                    writer,
+                    self.stats_interval,
+                    self.drain_timeout,
+                )
+            )
+        except BaseException as e:
+            logger.bind(tag=TAG).error(f"工作进程{index}异常退出: {e}")
+            code = 1
+        finally:
+            try:
+                logger.complete()
+            except Exception:
+                pass
+            os._exit(code)
+
+    def _receive(self, reader):
+        worker = next((w for w in self._workers.values() if w.reader is reader), None)
+        if worker is None:
+            return
+        try:
+            message = reader.recv()
+        except (EOFError, OSError):
+            # 工作进程已退出，由_reap处理
+            reader.close()
+            worker.reader = None
+            return
+        if message.get("type") == "ready":
+            worker.ready = True
+        elif message.get("type") == "stats":
+            worker.stats = message
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                break
+            worker = self._workers.pop(pid, None)
+            if worker is None:
+                continue
+            if worker.reader:
+                worker.reader.close()
+            code = os.waitstatus_to_exitcode(status)
+            if worker.retiring or self._stopping:
+                logger.bind(tag=TAG).info(f"工作进程{worker.index}(PID {pid})已退出")
+                continue
+            if self._slots.get(worker.index) != pid:
+                continue
+            # 异常退出，计划重启
+            if time.monotonic() - worker.started_at < MIN_WORKER_UPTIME_S:
+                failures = self._failures.get(worker.index, 0) + 1
+            else:
+                failures = 0
+            self._failures[worker.index] = failures
+            delay = min(MAX_RESTART_DELAY_S, 2**failures) if failures else 1
+            self._respawn_at[worker.index] = time.monotonic() + delay
+            logger.bind(tag=TAG).error(
+                f"工作进程{worker.index}(PID {pid})异常退出，退出码: {code}，{delay}秒后重启"
+            )
+
+        # 超过等待时间仍未退出的旧进程强制结束
+        for worker in self._workers.values():
+            if (
+                worker.terminated_at is not None
+                and time.monotonic() - worker.terminated_at > self.drain_timeout + 10
+            ):
+                self._signal(worker.pid, signal.SIGKILL)
+
+    def _respawn_due(self):
+        now = time.monotonic()
+        for index, due in list(self._respawn_at.items()):
+            if now >= due:
+                del self._respawn_at[index]
+                self._spawn(index)
+
+    def _restart_step(self):
+        """平滑重启：先启动新进程，新进程开始监听后再让旧进程停止接受新连接"""
+        if self._replacing is None:
+            if not self._restart_queue:
+                return
+            index = self._restart_queue.popleft()
+            old_pid = self._slots.get(index)
+            new_pid = self._spawn(index)
+            self._replacing = (index, old_pid, new_pid)
+            return
+
+        index, old_pid, new_pid = self._replacing
+        new_worker = self._workers.get(new_pid)
+        if new_worker is None:
+            logger.bind(tag=TAG).error(f"工作进程{index}的替换进程启动失败，停止平滑重启")
+            self._restart_queue.clear()
+            self._replacing = None
+            return
+        if not new_worker.ready:
+            return
+        old_worker = self._workers.get(old_pid)
+        if old_worker is not None:
+            self._terminate(old_worker, retiring=True)
+        self._replacing = None
+
+    def _stop_all(self):
+        if self._stop_sent:
+            return
+        self._stop_sent = True
+        self._respawn_at.clear()
+        self._restart_queue.clear()
+        logger.bind(tag=TAG).info(
+            f"正在停止{len(self._workers)}个工作进程，最多等待{self.drain_timeout}秒"
+        )
+        for worker in self._workers.values():
+            self._terminate(worker)
+
+    def _terminate(self, worker: _WorkerProcess, retiring: bool = False):
+        worker.retiring = worker.retiring or retiring
+        worker.terminated_at = time.monotonic()
+        self._signal(worker.pid, signal.SIGTERM)
+
+    @staticmethod
+    def _signal(pid: int, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _log_stats(self):
+        workers = sorted(self._workers.values(), key=lambda w: w.index)
+        connections = {
+            w.index: w.stats.get("connections", 0) for w in workers if not w.retiring
+        }
+        pools: Dict[str, Dict[str, int]] = {}
+        for worker in workers:
+            for name, stats in worker.stats.get("pools", {}).items():
+                total = pools.setdefault(name, {"active": 0, "queued": 0})
+                total["active"] += stats.get("active", 0)
+                total["queued"] += stats.get("queued", 0)
+        rejected = sum(w.stats.get("admission", {}).get("rejected", 0) for w in workers)
+        gate_total = sum(w.stats.get("vad", {}).get("gate_total", 0) for w in workers)
+        gate_skipped = sum(
+            w.stats.get("vad", {}).get("gate_skipped", 0) for w in workers
+        )
+        pool_text = "，".join(
+            f"{name}: 运行{s['active']} 排队{s['queued']}" for name, s in pools.items()
+        )
+        logger.bind(tag=TAG).info(
+            f"多进程统计: 工作进程{len(workers)}个，连接数{sum(connections.values())} "
+            f"{connections}，累计拒绝连接{rejected}"
+            + (f"，线程池 {pool_text}" if pool_text else "")
+            + (
+                f"，VAD预筛跳过{gate_skipped}/{gate_total}"
+                f"（{gate_skipped / gate_total:.1%}）"
+                if gate_total
+                else ""
+            )
+        )
+
@@ -0,0 +1,164 @@
+"""
+连接准入控制
+每个新连接都要深拷贝配置、拉取差异化配置、创建TTS和各组件，网络抖动后成千上万台设备同时重连时，
+全部立即初始化会把机器拖进swap。这里限制同时在线的连接数和同时初始化的连接数，
+超出初始化上限的连接在短队列中等待，队列也满了就立即拒绝，并让设备在随机抖动后的时间重试，
+避免被拒绝的设备又同时重连。
+"""
+
+import random
+import asyncio
+from collections import deque
+from typing import Deque, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class AdmissionTicket:
+    """已准入连接持有的名额，initialized()归还初始化名额，release()归还全部名额"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._initializing = True
+        self._active = True
+
+    def initialized(self):
+        if self._initializing:
+            self._initializing = False
+            self._controller._release_init()
+
+    def release(self):
+        self.initialized()
+        if self._active:
+            self._active = False
+            self._controller.active -= 1
+
+
+class AdmissionController:
+    """连接准入控制器，只在事件循环线程中使用
+
+    - max_connections：同时在线的连接数上限，0表示不限制
+    - max_initializing：同时进行初始化的连接数上限，0表示不限制
+    - max_waiting：等待初始化名额的连接数上限
+    - wait_timeout：等待初始化名额的最长时间(秒)
+    - retry_after、retry_jitter：建议设备重试的等待时间为retry_after加上0到retry_jitter秒的随机值
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 0,
+        max_initializing: int = 0,
+        max_waiting: int = 0,
+        wait_timeout: float = 5,
+        retry_after: float = 5,
+        retry_jitter: float = 10,
+    ):
+        self.max_connections = max(0, int(max_connections))
+        self.max_initializing = max(0, int(max_initializing))
+        self.max_waiting = max(0, int(max_waiting))
+        self.wait_timeout = max(0.0, float(wait_timeout))
+        self.retry_after = max(0.0, float(retry_after))
+        self.retry_jitter = max(0.0, float(retry_jitter))
+        self.active = 0  # 已准入（含等待初始化）的连接数
+        self.initializing = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # 统计信息
+        self.admitted = 0
+        self.rejected = 0
+        self.queued = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "AdmissionController":
+        config = config or {}
+
+        def number(key, default):
+            value = config.get(key, default)
+            return value if value not in (None, "") else default
+
+        return cls(
+            max_connections=number("max_connections", 0),
+            max_initializing=number("max_initializing", 32),
+            max_waiting=number("max_waiting", 64),
+            wait_timeout=number("wait_timeout", 5),
+            retry_after=number("retry_after", 5),
+            retry_jitter=number("retry_jitter", 10),
+        )
+
+    def _connections_full(self) -> bool:
+        return bool(self.max_connections) and self.active >= self.max_connections
+
+    def _init_full(self) -> bool:
+        return bool(self.max_initializing) and self.initializing >= self.max_initializing
+
+    def overloaded(self) -> bool:
+        """握手前的快速判断：已满时不必完成WebSocket握手和创建连接对象"""
+        if self._connections_full():
+            return True
+        return self._init_full() and len(self._waiters) >= self.max_waiting
+
+    def retry_after_seconds(self) -> int:
+        """建议设备重试前等待的秒数，加入随机抖动让被拒绝的设备错开重连"""
+        return int(self.retry_after + random.uniform(0, self.retry_jitter))
+
+    def reject(self, reason: str):
+        self.rejected += 1
+        logger.bind(tag=TAG).warning(
+            f"拒绝新连接: {reason}，在线{self.active}，初始化中{self.initializing}，"
+            f"等待{len(self._waiters)}"
+        )
+
+    async def admit(self) -> Optional[AdmissionTicket]:
+        """申请名额，需要时在队列中等待初始化名额，被拒绝时返回None"""
+        if self._connections_full():
+            self.reject("连接数已满")
+            return None
+        if self._init_full():
+            if len(self._waiters) >= self.max_waiting:
+                self.reject("初始化等待队列已满")
+                return None
+            self.active += 1
+            self.queued += 1
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), self.wait_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    # 超时的同时刚好分配到了名额，归还
+                    self._release_init()
+                else:
+                    waiter.cancel()
+                    self._waiters.remove(waiter)
+                self.active -= 1
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.reject("等待初始化超时")
+                return None
+            # 名额由_release_init直接转交，initializing计数不变
+        else:
+            self.active += 1
+            self.initializing += 1
+        self.admitted += 1
+        return AdmissionTicket(self)
+
+    def _release_init(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.initializing -= 1
+
+    def get_stats(self) -> dict:
+        return {
+            "active": self.active,
+            "initializing": self.initializing,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queued": self.queued,
+        }
@@ -16,6 +16,14 @@ logger = setup_logging()
 def create_instance(class_name: str, *args, **kwargs) -> ASRProviderBase:
     """工厂方法创建ASR实例"""
     if os.path.exists(os.path.join('core', 'providers', 'asr', f'{class_name}.py')):
+        # 配置了副本进程数时，模型加载到独立的工作进程中
+        config = args[0] if args else kwargs.get("config", {})
+        replicas = config.get("process_replicas", 0) if isinstance(config, dict) else 0
+        if replicas and int(replicas) > 0:
+            from core.utils.asr_process_pool import ProcessPoolASRProvider
+
+            return ProcessPoolASRProvider(class_name, int(replicas), *args, **kwargs)
+
         lib_name = f'core.providers.asr.{class_name}'
         if lib_name not in sys.modules:
             sys.modules[lib_name] = importlib.import_module(f'{lib_name}')
@@ -0,0 +1,188 @@
+"""
+服务器级ASR/声纹识别执行服务
+识别实现内部含有阻塞调用（本地模型、同步SDK）时，请求提交到常驻工作线程的事件循环中执行，
+不再为每句话创建线程池和事件循环；异步实现直接在连接的事件循环中等待，不占用工作线程。
+"""
+
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class _Worker:
+    def __init__(self, name: str):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+
+class _SlotPool:
+    """可跨事件循环使用的有界槽位池，槽位按需创建，用完后归还给最早的等待者"""
+
+    def __init__(self, size: int, factory: Callable[[int], Any]):
+        self.size = size
+        self._factory = factory
+        self._created = 0
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._waiters = deque()
+
+    async def acquire(self) -> Any:
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._idle:
+                return self._idle.popleft()
+            index = self._created
+            if index < self.size:
+                self._created += 1
+            else:
+                self._waiters.append(future)
+        if index < self.size:
+            return self._factory(index)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # 取消时恰好已经分配到槽位，需要归还
+            if not future.cancelled():
+                self.release(future.result())
+            raise
+
+    def release(self, slot: Any):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(slot)
+                    return
+            self._idle.append(slot)
+
+
+class ASRExecutor:
+    """识别执行服务
+
+    blocking=True的请求在工作线程中执行，每个工作线程同一时刻只执行一个请求，总并发数即工作线程数；
+    blocking=False的请求直接在调用方的事件循环中等待，max_concurrent大于0时按此限制并发。
+    超出限制的请求在调用方的事件循环中异步排队，排队时间不计入超时；等待和执行都可以取消，
+    取消或超时后对应的识别协程也会被取消。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        timeout: float = 15,
+        name: str = "asr-executor",
+        max_concurrent: int = 0,
+    ):
+        self.max_workers = max(1, int(max_workers))
+        self.max_concurrent = max(0, int(max_concurrent))
+        self.timeout = timeout
+        self.name = name
+        # 工作线程在第一次需要时创建
+        self._workers = _SlotPool(
+            self.max_workers, lambda i: _Worker(f"{name}-{i}")
+        )
+        self._slots = (
+            _SlotPool(self.max_concurrent, lambda i: i) if self.max_concurrent else None
+        )
+
+        # 统计信息
+        self.submitted = 0
+        self.timeouts = 0
+
+    async def run(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        blocking: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """执行func(*args)并等待结果，timeout只计算执行时间，默认使用服务配置
+
+        blocking表示func内部是否含有阻塞调用，含有时放到工作线程执行，避免阻塞连接的事件循环。
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self.submitted += 1
+        try:
+            if blocking:
+                return await self._run_blocking(func, args, timeout)
+            return await self._run_async(func, args, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def _run_blocking(self, func, args, timeout):
+        worker = await self._workers.acquire()
+        try:
+            future = asyncio.run_coroutine_threadsafe(func(*args), worker.loop)
+        except BaseException:
+            self._workers.release(worker)
+            raise
+        # 工作线程真正结束这个请求后才归还，避免被取消但仍在阻塞的请求占用的线程又接到新请求
+        future.add_done_callback(lambda _: self._workers.release(worker))
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+
+    async def _run_async(self, func, args, timeout):
+        if self._slots is None:
+            return await asyncio.wait_for(func(*args), timeout=timeout)
+        slot = await self._slots.acquire()
+        try:
+            return await asyncio.wait_for(func(*args), timeout=timeout)
+        finally:
+            self._slots.release(slot)
+
+
+_executor: Optional[ASRExecutor] = None
+_voiceprint_executor: Optional[ASRExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _timeout_from_config(config: dict) -> float:
+    timeout = config.get("asr_timeout", 15)
+    return float(timeout) if timeout else 15
+
+
+def get_asr_executor(config: Optional[dict] = None) -> ASRExecutor:
+    """获取服务器级的语音识别执行服务，首次调用时按配置创建"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                config = config or {}
+                max_workers = config.get("asr_workers", 4)
+                _executor = ASRExecutor(
+                    max_workers=int(max_workers) if max_workers else 4,
+                    timeout=_timeout_from_config(config),
+                )
+                logger.bind(tag=TAG).info(
+                    f"识别执行服务已启动，阻塞式识别的工作线程数: {_executor.max_workers}"
+                )
+    return _executor
+
+
+def get_voiceprint_executor(config: Optional[dict] = None) -> ASRExecutor:
+    """获取服务器级的声纹识别执行服务，与语音识别分开限制并发，首次调用时按配置创建"""
+    global _voiceprint_executor
+    if _voiceprint_executor is None:
+        with _executor_lock:
+            if _voiceprint_executor is None:
+                config = config or {}
+                max_concurrent = config.get("voiceprint_max_concurrent", 8)
+                max_concurrent = int(max_concurrent) if max_concurrent else 8
+                _voiceprint_executor = ASRExecutor(
+                    max_workers=max_concurrent,
+                    timeout=_timeout_from_config(config),
+                    name="voiceprint-executor",
+                    max_concurrent=max_concurrent,
+                )
+    return _voiceprint_executor
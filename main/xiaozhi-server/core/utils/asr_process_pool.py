@@ -0,0 +1,373 @@
+"""
+多进程本地ASR
+本地模型的推理是CPU密集型的，放在主进程的线程里会与事件循环争抢GIL，导致其他连接的TTS播放卡顿。
+开启后模型副本加载在独立的工作进程中，PCM通过每个副本复用的共享内存段传递，主进程只负责收发。
+"""
+
+import time
+import asyncio
+import importlib
+import itertools
+import threading
+import multiprocessing
+import concurrent.futures
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+from config.logger import setup_logging
+from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.dto.dto import InterfaceType
+
+TAG = __name__
+logger = setup_logging()
+
+# 每个副本共享内存段的初始大小，约30秒的16kHz 16位单声道PCM
+_INITIAL_SEGMENT_SIZE = 1 << 20
+# 副本进程意外退出后的重启间隔（秒），连续失败时逐渐加倍
+_RESPAWN_DELAY = 1
+_RESPAWN_MAX_DELAY = 60
+
+
+def _replica_main(class_name: str, config: dict, conn):
+    """工作进程入口：加载模型副本，循环处理主进程发来的识别请求"""
+    try:
+        module = importlib.import_module(f"core.providers.asr.{class_name}")
+        # 音频文件的保留由主进程负责
+        provider = module.ASRProvider(config, True)
+    except Exception as e:
+        conn.send(("error", None, f"模型加载失败: {e}"))
+        return
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    # 主进程的共享内存段：名称 -> [SharedMemory, 正在使用的请求数]
+    segments = {}
+    latest = [None]
+
+    def open_segment(name: str):
+        entry = segments.get(name)
+        if entry is None:
+            entry = segments[name] = [shared_memory.SharedMemory(name=name), 0]
+            latest[0] = name
+        entry[1] += 1
+        return entry[0]
+
+    def close_segment(name: str):
+        entry = segments[name]
+        entry[1] -= 1
+        # 主进程换用更大的段后，旧段在最后一个请求结束时关闭
+        if entry[1] == 0 and name != latest[0]:
+            del segments[name]
+            try:
+                entry[0].close()
+            except BufferError:
+                pass
+
+    async def handle(request_id: int, shm_name: str, offset: int, size: int):
+        try:
+            shm = open_segment(shm_name)
+            # 直接在共享内存上识别，不再复制一份PCM
+            pcm_view = shm.buf[offset : offset + size]
+            try:
+                text, _ = await provider.speech_to_text(
+                    [pcm_view], f"replica-{request_id}", "pcm"
+                )
+            finally:
+                try:
+                    pcm_view.release()
+                except BufferError:
+                    pass
+                close_segment(shm_name)
+            message = ("ok", request_id, text)
+        except Exception as e:
+            message = ("error", request_id, str(e))
+        conn.send(message)
+
+    def reader():
+        # 请求并发交给事件循环处理，副本内部的批量调度器仍然可以合并请求
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                break
+            if request is None:
+                break
+            loop.call_soon_threadsafe(lambda r=request: loop.create_task(handle(*r)))
+        loop.call_soon_threadsafe(loop.stop)
+
+    conn.send(("ready", None, None))
+    threading.Thread(target=reader, daemon=True).start()
+    loop.run_forever()
+
+
+class _SharedArena:
+    """一个副本复用的共享内存段
+
+    同一副本同时处理的多个请求各占段内的一个区间，请求结束后区间释放给后续请求复用；
+    放不下时换成更大的段，旧段在其中的请求全部结束后再释放。
+    """
+
+    def __init__(self, initial_size: int = _INITIAL_SEGMENT_SIZE):
+        self._initial_size = initial_size
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        # 请求ID -> (所在的段, 偏移, 长度)
+        self._regions = {}
+        # 已被替换但仍有请求在使用的旧段：段 -> 正在使用的请求数
+        self._retired = {}
+
+    def write(self, request_id: int, chunks) -> Tuple[str, int, int]:
+        """把PCM分块依次写入段内的空闲区间，返回(段名称, 偏移, 长度)"""
+        size = sum(len(chunk) for chunk in chunks)
+        offset = self._allocate(size)
+        segment = self._segment
+        position = offset
+        for chunk in chunks:
+            segment.buf[position : position + len(chunk)] = chunk
+            position += len(chunk)
+        self._regions[request_id] = (segment, offset, size)
+        return segment.name, offset, size
+
+    def free(self, request_id: int):
+        entry = self._regions.pop(request_id, None)
+        if entry is None:
+            return
+        segment = entry[0]
+        if segment in self._retired:
+            self._retired[segment] -= 1
+            if self._retired[segment] == 0:
+                del self._retired[segment]
+                self._release(segment)
+
+    def close(self):
+        for segment in list(self._retired) + [self._segment]:
+            if segment is not None:
+                self._release(segment)
+        self._segment = None
+        self._retired.clear()
+        self._regions.clear()
+
+    def _allocate(self, size: int) -> int:
+        if self._segment is not None:
+            # 在当前段已使用的区间之间寻找第一个放得下的空隙
+            used = sorted(
+                (offset, offset + length)
+                for segment, offset, length in self._regions.values()
+                if segment is self._segment
+            )
+            position = 0
+            for start, end in used:
+                if start - position >= size:
+                    return position
+                position = max(position, end)
+            if self._segment.size - position >= size:
+                return position
+
+        # 空间不足，换成至少两倍大的新段
+        capacity = self._initial_size
+        if self._segment is not None:
+            capacity = self._segment.size * 2
+            users = sum(
+                1 for entry in self._regions.values() if entry[0] is self._segment
+            )
+            if users:
+                self._retired[self._segment] = users
+            else:
+                self._release(self._segment)
+        while capacity < size:
+            capacity *= 2
+        self._segment = shared_memory.SharedMemory(create=True, size=capacity)
+        return 0
+
+    @staticmethod
+    def _release(segment):
+        segment.close()
+        segment.unlink()
+
+
+class _Replica:
+    """主进程中对一个工作进程的句柄，工作进程意外退出后自动重启"""
+
+    def __init__(self, ctx, class_name: str, config: dict, index: int):
+        self.index = index
+        self._ctx = ctx
+        self._class_name = class_name
+        self._config = config
+        self.alive = False
+        self._stopping = False
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._arena = _SharedArena()
+        self._start()
+
+    def _start(self):
+        self.conn, child_conn = self._ctx.Pipe()
+        self.process = self._ctx.Process(
+            target=_replica_main,
+            args=(self._class_name, self._config, child_conn),
+            name=f"asr-replica-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self):
+        status, _, payload = self.conn.recv()
+        if status != "ready":
+            raise RuntimeError(f"ASR副本{self.index}启动失败: {payload}")
+        with self._lock:
+            self.alive = True
+        threading.Thread(
+            target=self._read_results, name=f"asr-replica-{self.index}-reader", daemon=True
+        ).start()
+
+    @property
+    def load(self) -> int:
+        return len(self._pending)
+
+    def submit(self, request_id: int, chunks) -> concurrent.futures.Future:
+        """提交一段PCM（按顺序拼接的分块列表），返回识别文本的Future"""
+        future = concurrent.futures.Future()
+        with self._lock:
+            if not self.alive:
+                raise RuntimeError(f"ASR副本{self.index}已退出")
+            try:
+                shm_name, offset, size = self._arena.write(request_id, chunks)
+                self._pending[request_id] = future
+                self.conn.send((request_id, shm_name, offset, size))
+            except Exception:
+                self._pending.pop(request_id, None)
+                self._arena.free(request_id)
+                raise
+        return future
+
+    def _read_results(self):
+        while True:
+            try:
+                status, request_id, payload = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+                self._arena.free(request_id)
+            if future is None or future.done():
+                continue
+            if status == "ok":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+        # 工作进程退出，未完成的请求全部失败
+        with self._lock:
+            self.alive = False
+            pending, self._pending = self._pending, {}
+            for request_id in pending:
+                self._arena.free(request_id)
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"ASR副本{self.index}已退出"))
+        if self._stopping:
+            return
+        logger.bind(tag=TAG).error(
+            f"ASR副本{self.index}已退出，退出码: {self.process.exitcode}"
+        )
+        self._respawn()
+
+    def _respawn(self):
+        """重启工作进程，加载失败时逐渐拉长重试间隔"""
+        delay = _RESPAWN_DELAY
+        while not self._stopping:
+            time.sleep(delay)
+            if self._stopping:
+                return
+            try:
+                self.process.join(timeout=0)
+                self._start()
+                self.wait_ready()
+                logger.bind(tag=TAG).info(f"ASR副本{self.index}已重启")
+                return
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"ASR副本{self.index}重启失败: {e}")
+                if self.process.is_alive():
+                    self.process.terminate()
+                delay = min(delay * 2, _RESPAWN_MAX_DELAY)
+
+    def stop(self):
+        self._stopping = True
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(timeout=3)
+        if self.process.is_alive():
+            self.process.terminate()
+        with self._lock:
+            self._arena.close()
+
+
+class ProcessPoolASRProvider(ASRProviderBase):
+    """把本地ASR的推理转发到多个模型副本进程，对外与普通本地ASR一致"""
+    supports_partial = True
+    blocking_recognition = False
+
+    def __init__(
+        self, class_name: str, replicas: int, config: dict, delete_audio_file: bool = True
+    ):
+        super().__init__()
+        self.interface_type = InterfaceType.LOCAL
+        self.output_dir = config.get("output_dir", "tmp/")
+        self.delete_audio_file = delete_audio_file
+
+        self.load_partial_config(config)
+
+        worker_config = dict(config)
+        worker_config["process_replicas"] = 0
+        worker_config["streaming_partial"] = False
+
+        # 使用spawn启动，避免fork继承主进程的线程和事件循环
+        ctx = multiprocessing.get_context("spawn")
+        self._request_ids = itertools.count()
+        self._replicas = [
+            _Replica(ctx, class_name, worker_config, i) for i in range(replicas)
+        ]
+        try:
+            for replica in self._replicas:
+                replica.wait_ready()
+        except Exception:
+            self.stop()
+            raise
+        logger.bind(tag=TAG).info(f"{class_name}已在{replicas}个工作进程中加载")
+
+    def stop(self):
+        for replica in self._replicas:
+            replica.stop()
+
+    def _submit(self, chunks) -> concurrent.futures.Future:
+        replicas = [r for r in self._replicas if r.alive]
+        if not replicas:
+            raise RuntimeError("没有可用的ASR副本进程")
+        replica = min(replicas, key=lambda r: r.load)
+        return replica.submit(next(self._request_ids), chunks)
+
+    async def recognize_pcm(self, pcm_data: bytes) -> str:
+        """识别一段PCM，用于边说边识别"""
+        return await asyncio.wrap_future(self._submit([pcm_data]))
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """语音转文本主处理逻辑"""
+        file_path = None
+        try:
+            if audio_format == "pcm":
+                pcm_data = opus_data
+            else:
+                pcm_data = self.decode_opus(opus_data)
+            if not self.delete_audio_file:
+                file_path = await self.save_audio_to_file_async(pcm_data, session_id)
+
+            # 分块直接写入共享内存，不再先拼接成一整段
+            text = await asyncio.wrap_future(self._submit(pcm_data))
+            return text, file_path
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"语音识别失败: {e}")
+            return "", file_path
@@ -0,0 +1,61 @@
+"""
+线程与事件循环共用的队列
+TTS的文本和音频队列既有合成线程、LLM线程写入，也有事件循环中的协程写入。
+原先消费端是独立线程，按固定间隔轮询队列；这里在queue.Queue的基础上增加get_async，
+事件循环中的协程可以直接等待新数据，写入时立即唤醒，不再需要轮询线程。
+"""
+
+import queue
+import asyncio
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AsyncQueue(queue.Queue):
+    """兼容queue.Queue全部接口，额外支持在事件循环中等待读取"""
+
+    def __init__(self, maxsize: int = 0):
+        super().__init__(maxsize)
+        self._waiters = []  # 等待数据的(事件循环, future)
+
+    def _put(self, item):
+        # 调用时已持有self.mutex
+        super()._put(item)
+        waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    async def get_async(self, timeout: float = None):
+        """在事件循环中取出一项，timeout秒内没有数据时抛出queue.Empty，None表示一直等待"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self.mutex:
+                if self._qsize():
+                    item = self._get()
+                    self.not_full.notify()
+                    return item
+                remaining = None if deadline is None else deadline - loop.time()
+                expired = remaining is not None and remaining <= 0
+                if not expired:
+                    waiter = (loop, loop.create_future())
+                    self._waiters.append(waiter)
+            if expired:
+                # 超时也要让出事件循环，否则调用方循环调用时会一直占用事件循环
+                await asyncio.sleep(0)
+                raise queue.Empty
+            try:
+                await asyncio.wait_for(waiter[1], remaining)
+            except asyncio.TimeoutError:
+                raise queue.Empty
+            finally:
+                with self.mutex:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
@@ -0,0 +1,53 @@
+"""
+静态提示音资源库
+绑定码、数字播报、超出字数提示、结束提示音、唤醒词回复等音频每次播放都要调用ffmpeg转码。
+这里把资源文件转码后的帧列表缓存在内存中，按文件路径和修改时间记忆，文件更新后自动重新转码。
+"""
+
+import os
+import threading
+from typing import Dict, List, Tuple
+
+from config.logger import setup_logging
+from core.utils.util import audio_to_data
+
+TAG = __name__
+logger = setup_logging()
+
+ASSETS_DIR = "config/assets"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac", ".m4a")
+
+_frames: Dict[Tuple[str, bool], Tuple[float, int, List[bytes]]] = {}
+_lock = threading.Lock()
+
+
+def get_audio_frames(audio_file_path: str, is_opus: bool = True) -> List[bytes]:
+    """获取音频文件的Opus/PCM帧列表，与audio_to_data一致，但只在文件变化时转码"""
+    path = os.path.abspath(audio_file_path)
+    stat = os.stat(path)
+    key = (path, is_opus)
+    with _lock:
+        cached = _frames.get(key)
+    if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        # 返回副本，避免调用方修改缓存
+        return list(cached[2])
+
+    frames = audio_to_data(path, is_opus=is_opus)
+    with _lock:
+        _frames[key] = (stat.st_mtime, stat.st_size, frames)
+    return list(frames)
+
+
+def preload_assets(assets_dir: str = ASSETS_DIR, is_opus: bool = True) -> int:
+    """预先转码目录下的全部音频资源，返回成功加载的文件数"""
+    count = 0
+    for root, _, files in os.walk(assets_dir):
+        for name in files:
+            if not name.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+            try:
+                get_audio_frames(os.path.join(root, name), is_opus=is_opus)
+                count += 1
+            except Exception as e:
+                logger.bind(tag=TAG).warning(f"预加载音频资源失败: {name}，错误: {e}")
+    return count
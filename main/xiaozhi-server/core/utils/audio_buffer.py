@@ -0,0 +1,148 @@
+"""
+音频缓冲区工具类
+为每个连接提供预分配的PCM环形缓冲区和已解码PCM时间线，避免接收音频时反复申请、拷贝内存和重复解码
+"""
+
+import numpy as np
+from collections import deque
+from typing import Optional
+
+
+class PCMRingBuffer:
+    """固定容量的16位PCM环形缓冲区
+
+    写入时只拷贝一次到预分配数组，读取时尽量返回numpy视图，
+    只有在读取区间跨越缓冲区末尾时才拷贝到预分配的临时数组中。
+    """
+
+    def __init__(self, capacity: int = 16000):
+        """
+        Args:
+            capacity: 缓冲区容量（采样点数），默认1秒16kHz音频
+        """
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._scratch = np.zeros(capacity, dtype=np.int16)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """缓冲区中可读取的采样点数"""
+        return self._size
+
+    def write(self, pcm_data) -> None:
+        """写入PCM数据，超出容量时丢弃最旧的采样点"""
+        samples = np.frombuffer(pcm_data, dtype=np.int16)
+        count = len(samples)
+        if count == 0:
+            return
+        if count >= self.capacity:
+            # 新数据本身就超过容量，只保留最新的部分
+            self._buffer[:] = samples[-self.capacity :]
+            self._start = 0
+            self._size = self.capacity
+            return
+
+        overflow = self._size + count - self.capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self.capacity
+            self._size -= overflow
+
+        end = (self._start + self._size) % self.capacity
+        first = min(count, self.capacity - end)
+        self._buffer[end : end + first] = samples[:first]
+        if first < count:
+            self._buffer[: count - first] = samples[first:]
+        self._size += count
+
+    def read(self, count: int) -> np.ndarray:
+        """读取并移除count个采样点
+
+        返回的数组可能是缓冲区的视图，只在下一次写入前有效，需要保留时请自行拷贝。
+        """
+        if count > self._size:
+            raise ValueError(f"缓冲区数据不足: 需要{count}，现有{self._size}")
+        start = self._start
+        if start + count <= self.capacity:
+            out = self._buffer[start : start + count]
+        else:
+            first = self.capacity - start
+            out = self._scratch[:count]
+            out[:first] = self._buffer[start:]
+            out[first:] = self._buffer[: count - first]
+        self._start = (start + count) % self.capacity
+        self._size -= count
+        return out
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+
+class PCMTimeline:
+    """单个连接已解码PCM的时间线
+
+    VAD在入口处对每个opus包只解码一次，解码结果按顺序记录在这里，
+    与conn.asr_audio中的opus包一一对应。语音结束时整句PCM以memoryview
+    的形式交给ASR和声纹识别，不再重复解码和拷贝。
+    """
+
+    def __init__(self, preroll_packets: int = 10):
+        self._buffer = bytearray()
+        # 未检测到语音时的预录音，与conn.asr_audio_preroll对应
+        self._preroll = deque(maxlen=preroll_packets)
+        # 是否每个opus包都拿到了解码结果，缺失时ASR需回退到自行解码
+        self._complete = True
+        # 最后一个有声包结束时的PCM长度（字节）
+        self.voiced_length = 0
+        # 每取出或清空一次整句，代数加一，用于判断边说边识别的结果是否属于当前这句话
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def complete(self) -> bool:
+        return self._complete
+
+    def mark_voiced(self) -> None:
+        """标记当前位置之前的音频包含语音"""
+        self.voiced_length = len(self._buffer)
+
+    def snapshot(self) -> bytes:
+        """拷贝当前已记录的PCM，用于在说话过程中提前识别"""
+        return bytes(self._buffer)
+
+    def push_preroll(self, pcm_frame: Optional[bytes]) -> None:
+        self._preroll.append(pcm_frame)
+
+    def append(self, pcm_frame: Optional[bytes]) -> None:
+        if self._preroll:
+            for frame in self._preroll:
+                self._append(frame)
+            self._preroll.clear()
+        self._append(pcm_frame)
+
+    def _append(self, pcm_frame: Optional[bytes]) -> None:
+        if pcm_frame is None:
+            self._complete = False
+        else:
+            self._buffer += pcm_frame
+
+    def take(self) -> Optional[memoryview]:
+        """取出当前整句PCM并重置时间线，解码结果不完整时返回None"""
+        data, complete = self._buffer, self._complete
+        self._buffer = bytearray()
+        self._complete = True
+        self.voiced_length = 0
+        self.generation += 1
+        if not complete or not data:
+            return None
+        return memoryview(data)
+
+    def clear(self) -> None:
+        self._buffer = bytearray()
+        self._preroll.clear()
+        self._complete = True
+        self.voiced_length = 0
+        self.generation += 1
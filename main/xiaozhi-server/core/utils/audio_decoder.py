@@ -0,0 +1,402 @@
+"""
+进程内流式音频解码
+TTS输出的wav/pcm在进程内直接解析，mp3使用miniaudio在进程内解码，边接收边输出16kHz单声道60ms帧，
+不再为每句话启动ffmpeg进程，也不必等整段音频合成完成才开始编码。其他格式仍回退到pydub。
+"""
+
+import queue
+import struct
+import threading
+import numpy as np
+from io import BytesIO
+from typing import Any, Callable, Optional
+from core.utils.opus_encoder_utils import OpusEncoderUtils
+
+try:
+    import miniaudio
+except ImportError:  # 未安装时mp3回退到pydub
+    miniaudio = None
+
+TARGET_SAMPLE_RATE = 16000
+FRAME_DURATION_MS = 60
+FRAME_SAMPLES = TARGET_SAMPLE_RATE * FRAME_DURATION_MS // 1000  # 960
+FRAME_BYTES = FRAME_SAMPLES * 2
+
+
+class FrameSink:
+    """把16kHz单声道16位PCM切成60ms帧，按需编码为Opus后交给回调"""
+
+    def __init__(self, is_opus: bool, callback: Callable[[Any], Any]):
+        self.is_opus = is_opus
+        self.callback = callback
+        # 编码器来自进程级编码器池，使用libopus默认编码参数
+        self.encoder = (
+            OpusEncoderUtils(
+                TARGET_SAMPLE_RATE,
+                1,
+                FRAME_DURATION_MS,
+                bitrate=None,
+                complexity=None,
+                signal=None,
+            )
+            if is_opus
+            else None
+        )
+        self._buffer = bytearray()
+        self.closed = False
+
+    def push(self, pcm_data) -> None:
+        if self.closed:
+            return
+        if self.encoder is not None:
+            self.encoder.encode_pcm_to_opus_stream(pcm_data, False, self.callback)
+            return
+        self._buffer += pcm_data
+        offset = 0
+        while len(self._buffer) - offset >= FRAME_BYTES:
+            self.callback(bytes(self._buffer[offset : offset + FRAME_BYTES]))
+            offset += FRAME_BYTES
+        if offset:
+            del self._buffer[:offset]
+
+    def flush(self) -> None:
+        """输出剩余数据，最后一帧不足时补零，并归还编码器"""
+        if self.closed:
+            return
+        try:
+            if self.encoder is not None:
+                self.encoder.encode_pcm_to_opus_stream(b"", True, self.callback)
+            elif self._buffer:
+                self._buffer += b"\x00" * (FRAME_BYTES - len(self._buffer))
+                self.callback(bytes(self._buffer))
+                self._buffer.clear()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """丢弃剩余数据并归还编码器，可重复调用"""
+        self.closed = True
+        if self.encoder is not None:
+            self.encoder.close()
+
+
+class StreamingResampler:
+    """流式单声道重采样：降采样前先做低通滤波，再线性插值"""
+
+    TAPS = 63
+
+    def __init__(self, in_rate: int, out_rate: int = TARGET_SAMPLE_RATE):
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.step = in_rate / out_rate
+        self._pos = 0.0  # 下一个输出采样点在输入序列中的位置
+        self._offset = 0  # _pending[0]在输入序列中的位置
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._fir = None
+        self._fir_tail = None
+        if in_rate > out_rate:
+            cutoff = 0.9 * out_rate / in_rate
+            n = np.arange(self.TAPS) - (self.TAPS - 1) / 2
+            fir = cutoff * np.sinc(cutoff * n) * np.hamming(self.TAPS)
+            self._fir = (fir / fir.sum()).astype(np.float32)
+            self._fir_tail = np.zeros(self.TAPS - 1, dtype=np.float32)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.in_rate == self.out_rate:
+            return samples
+        if self._fir is not None:
+            extended = np.concatenate([self._fir_tail, samples])
+            self._fir_tail = extended[-(self.TAPS - 1) :]
+            samples = np.convolve(extended, self._fir, mode="valid").astype(np.float32)
+
+        buffer = np.concatenate([self._pending, samples])
+        last = self._offset + len(buffer) - 1
+        if len(buffer) == 0 or last < self._pos:
+            self._pending = buffer
+            return np.zeros(0, dtype=np.float32)
+        count = int((last - self._pos) // self.step) + 1
+        positions = self._pos + np.arange(count) * self.step - self._offset
+        out = np.interp(positions, np.arange(len(buffer)), buffer).astype(np.float32)
+        self._pos += count * self.step
+        # 保留下一个输出点插值所需的输入
+        keep_from = min(int(self._pos) - self._offset, len(buffer) - 1)
+        self._pending = buffer[keep_from:]
+        self._offset += keep_from
+        return out
+
+
+def _to_mono_float(data: bytes, channels: int, sample_width: int, is_float: bool):
+    """任意位宽、声道的PCM转换为[-1, 1]的单声道float32"""
+    if sample_width == 2:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+    elif sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        values = (
+            raw[:, 0].astype(np.int32)
+            | (raw[:, 1].astype(np.int32) << 8)
+            | (raw[:, 2].astype(np.int32) << 16)
+        )
+        values = np.where(values & 0x800000, values - 0x1000000, values)
+        samples = values.astype(np.float32) / 8388608
+    elif sample_width == 4 and is_float:
+        samples = np.frombuffer(data, dtype="<f4").astype(np.float32)
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"不支持的采样位宽: {sample_width}")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _float_to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class _PCMStage:
+    """原始PCM输入：对齐到完整采样帧后转换格式并重采样"""
+
+    def __init__(self, sink: FrameSink, sample_rate, channels, sample_width, is_float=False):
+        self.sink = sink
+        self.channels = channels
+        self.sample_width = sample_width
+        self.is_float = is_float
+        self.block = channels * sample_width
+        self.passthrough = (
+            sample_rate == TARGET_SAMPLE_RATE and channels == 1 and sample_width == 2
+        )
+        self.resampler = StreamingResampler(sample_rate)
+        self._remainder = b""
+
+    def feed(self, data: bytes) -> None:
+        if self._remainder:
+            data = self._remainder + data
+        usable = len(data) - len(data) % self.block
+        self._remainder = data[usable:]
+        if not usable:
+            return
+        if self.passthrough:
+            self.sink.push(data[:usable])
+            return
+        samples = _to_mono_float(
+            data[:usable], self.channels, self.sample_width, self.is_float
+        )
+        self.sink.push(_float_to_pcm16(self.resampler.process(samples)))
+
+
+class _WavStage:
+    """增量解析WAV头，data块之后的数据交给PCM处理"""
+
+    def __init__(self, sink: FrameSink):
+        self.sink = sink
+        self._buffer = b""
+        self._header_done = False
+        self._fmt = None
+        self._pcm: Optional[_PCMStage] = None
+
+    def feed(self, data: bytes) -> None:
+        if self._pcm is not None:
+            self._pcm.feed(data)
+            return
+        self._buffer += data
+        if not self._header_done:
+            if len(self._buffer) < 12:
+                return
+            if self._buffer[:4] != b"RIFF" or self._buffer[8:12] != b"WAVE":
+                raise ValueError("不是有效的WAV数据")
+            self._buffer = self._buffer[12:]
+            self._header_done = True
+        while len(self._buffer) >= 8:
+            chunk_id = self._buffer[:4]
+            chunk_size = struct.unpack("<I", self._buffer[4:8])[0]
+            if chunk_id == b"data":
+                if self._fmt is None:
+                    raise ValueError("WAV缺少fmt块")
+                audio_format, channels, sample_rate, bits = self._fmt
+                self._pcm = _PCMStage(
+                    self.sink, sample_rate, channels, bits // 8, audio_format == 3
+                )
+                # 流式WAV的data长度可能为0或0xFFFFFFFF，一律读到结尾
+                rest, self._buffer = self._buffer[8:], b""
+                self._pcm.feed(rest)
+                return
+            padded = chunk_size + (chunk_size & 1)
+            if len(self._buffer) < 8 + padded:
+                return
+            if chunk_id == b"fmt ":
+                audio_format, channels, sample_rate = struct.unpack(
+                    "<HHI", self._buffer[8:16]
+                )
+                bits = struct.unpack("<H", self._buffer[22:24])[0]
+                if audio_format == 0xFFFE and chunk_size >= 26:
+                    # WAVE_FORMAT_EXTENSIBLE，子格式GUID的前两个字节为实际格式
+                    audio_format = struct.unpack("<H", self._buffer[32:34])[0]
+                if audio_format not in (1, 3):
+                    raise ValueError(f"不支持的WAV编码格式: {audio_format}")
+                self._fmt = (audio_format, channels, sample_rate, bits)
+            self._buffer = self._buffer[8 + padded :]
+
+
+class _MiniaudioSource(miniaudio.StreamableSource if miniaudio else object):
+    """供miniaudio在解码线程中按需读取的数据源"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._buffer = b""
+        self._eof = False
+
+    def put(self, data: Optional[bytes]) -> None:
+        self._queue.put(data)
+
+    def read(self, num_bytes: int) -> bytes:
+        while len(self._buffer) < num_bytes and not self._eof:
+            data = self._queue.get()
+            if data is None:
+                self._eof = True
+            else:
+                self._buffer += data
+        out, self._buffer = self._buffer[:num_bytes], self._buffer[num_bytes:]
+        return out
+
+
+class _Mp3Stage:
+    """mp3在独立线程中由miniaudio流式解码，解码线程直接输出帧"""
+
+    def __init__(self, sink: FrameSink):
+        self.sink = sink
+        self.source = _MiniaudioSource()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            stream = miniaudio.stream_any(
+                self.source,
+                source_format=miniaudio.FileFormat.MP3,
+                output_format=miniaudio.SampleFormat.SIGNED16,
+                nchannels=1,
+                sample_rate=TARGET_SAMPLE_RATE,
+                frames_to_read=FRAME_SAMPLES,
+            )
+            for samples in stream:
+                self.sink.push(samples.tobytes())
+        except Exception as e:
+            self.error = e
+        finally:
+            # 解码失败时让生产者不再阻塞
+            self.source._eof = True
+
+    def feed(self, data: bytes) -> None:
+        self.source.put(data)
+
+    def finish(self) -> None:
+        self.source.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self) -> None:
+        # 放弃解码时结束数据源，等解码线程处理完已收到的数据后退出，之后才能归还编码器
+        self.source.put(None)
+        self.thread.join()
+
+
+class _BufferedStage:
+    """其他格式缓存完整数据后交给pydub（ffmpeg）转码"""
+
+    def __init__(self, sink: FrameSink, file_type: str):
+        self.sink = sink
+        self.file_type = file_type
+        self._buffer = BytesIO()
+
+    def feed(self, data: bytes) -> None:
+        self._buffer.write(data)
+
+    def finish(self) -> None:
+        from pydub import AudioSegment
+
+        self._buffer.seek(0)
+        audio = AudioSegment.from_file(
+            self._buffer, format=self.file_type, parameters=["-nostdin"]
+        )
+        audio = audio.set_channels(1).set_frame_rate(TARGET_SAMPLE_RATE).set_sample_width(2)
+        self.sink.push(audio.raw_data)
+
+
+def _sniff_format(header: bytes) -> Optional[str]:
+    """根据文件头判断实际格式，部分TTS会把mp3数据保存在.wav文件中"""
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:3] == b"ID3" or (
+        len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0
+    ):
+        return "mp3"
+    return None
+
+
+class StreamingAudioDecoder:
+    """流式音频解码器
+
+    feed()可以多次传入任意长度的音频数据，解码出的60ms帧（Opus或PCM）立即交给回调，
+    全部数据传入后调用finish()输出剩余数据，中途放弃时调用close()归还编码器。
+    格式以文件头为准，文件后缀只作为参考。
+    """
+
+    SNIFF_BYTES = 12
+
+    def __init__(
+        self,
+        file_type: str,
+        is_opus: bool,
+        callback: Callable[[Any], Any],
+        sample_rate: int = TARGET_SAMPLE_RATE,
+    ):
+        self.file_type = (file_type or "").lower().lstrip(".")
+        self.sink = FrameSink(is_opus, callback)
+        self.stage = None
+        self._header = b""
+        if self.file_type == "pcm":
+            self.stage = _PCMStage(self.sink, sample_rate, 1, 2)
+
+    def _create_stage(self, header: bytes):
+        file_type = _sniff_format(header) or self.file_type
+        if file_type == "wav" and header[:4] == b"RIFF":
+            return _WavStage(self.sink)
+        if file_type == "mp3" and miniaudio is not None:
+            return _Mp3Stage(self.sink)
+        return _BufferedStage(self.sink, file_type)
+
+    def feed(self, data: bytes) -> None:
+        if not data:
+            return
+        if self.stage is None:
+            self._header += data
+            if len(self._header) < self.SNIFF_BYTES:
+                return
+            data, self._header = self._header, b""
+            self.stage = self._create_stage(data)
+        self.stage.feed(data)
+
+    def finish(self) -> None:
+        if self.stage is None:
+            if not self._header:
+                return
+            data, self._header = self._header, b""
+            self.stage = self._create_stage(data)
+            self.stage.feed(data)
+        try:
+            finish = getattr(self.stage, "finish", None)
+            if finish is not None:
+                finish()
+        finally:
+            self.sink.flush()
+
+    def close(self) -> None:
+        """停止解码并归还编码器，finish()之后调用不会产生影响"""
+        close = getattr(self.stage, "close", None)
+        if close is not None:
+            close()
+        self.sink.close()
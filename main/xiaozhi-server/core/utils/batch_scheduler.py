@@ -0,0 +1,144 @@
+"""
+共享模型的批量推理调度器
+把多个连接几乎同时提交的推理请求在几毫秒内汇聚成一批，调用一次模型后把结果分发回各个请求。
+VAD的批量推理引擎和本地ASR的批量识别都基于这里的调度器。
+"""
+
+import time
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Callable, Hashable, List, Optional
+
+from config.logger import setup_logging
+from core.utils.fork_hooks import restart_after_fork
+
+TAG = __name__
+logger = setup_logging()
+
+
+class BatchScheduler:
+    """微批量调度器
+
+    所有请求进入同一个等待队列，后台线程在收到第一个请求后最多等待max_wait_ms，
+    或凑满max_batch个请求后调用一次process_batch。process_batch必须按输入顺序返回结果。
+    指定key时，key相同的请求不会进入同一批，留到下一批按提交顺序处理（例如同一连接的VAD音频块）。
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch: int = 8,
+        max_wait_ms: float = 10,
+        name: str = "batch-scheduler",
+        key: Optional[Callable[[Any], Hashable]] = None,
+    ):
+        self._process_batch = process_batch
+        self._key = key
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.name = name
+        self._stopped = False
+
+        # 统计信息
+        self.batches = 0
+        self.requests = 0
+
+        self._start()
+        restart_after_fork(self, "_start")
+
+    def _start(self):
+        """创建等待队列并启动调度线程，fork出的工作进程中会重新调用"""
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> concurrent.futures.Future:
+        """提交一个请求，返回结果的Future"""
+        future = concurrent.futures.Future()
+        with self._cond:
+            if self._stopped:
+                future.set_exception(RuntimeError(f"{self.name}已停止"))
+                return future
+            self._pending.append((item, future))
+            self._cond.notify()
+        return future
+
+    async def run(self, item: Any) -> Any:
+        """在任意事件循环中提交请求并等待结果"""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.requests / self.batches if self.batches else 0.0
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                for _, future in self._pending:
+                    # 请求方已取消的Future不能再设置结果
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(RuntimeError(f"{self.name}已停止"))
+                self._pending.clear()
+                return None
+
+            # 第一个请求到达后，短暂等待其他同时结束的请求
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            if self._key is None:
+                batch = self._pending[: self.max_batch]
+                self._pending = self._pending[self.max_batch :]
+                return batch
+
+            batch, rest, seen = [], [], set()
+            for pending in self._pending:
+                key = self._key(pending[0])
+                if key in seen or len(batch) >= self.max_batch:
+                    rest.append(pending)
+                else:
+                    seen.add(key)
+                    batch.append(pending)
+            self._pending = rest
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            # 标记为运行中后请求方无法再取消；已经取消（例如超时）的不再推理
+            batch = [
+                (item, future)
+                for item, future in batch
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            try:
+                results = self._process_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(
+                        f"批量结果数量{len(results)}与请求数量{len(batch)}不一致"
+                    )
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"{self.name}批量推理失败: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.requests += len(batch)
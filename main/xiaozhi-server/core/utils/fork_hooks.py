@@ -0,0 +1,23 @@
+"""
+多进程模式下的fork处理
+多进程模式先在主进程加载VAD、本地ASR等模型，再fork出工作进程共享这些只读的模型内存。
+fork后的子进程只保留调用fork的线程，模型加载时启动的后台推理线程在子进程中并不存在，
+需要在子进程中重新创建锁和线程。
+"""
+
+import os
+import weakref
+
+
+def restart_after_fork(obj, method_name: str):
+    """fork出的子进程中调用obj.method_name()，obj被回收后不再调用"""
+    if not hasattr(os, "register_at_fork"):
+        return
+    ref = weakref.ref(obj)
+
+    def hook():
+        target = ref()
+        if target is not None:
+            getattr(target, method_name)()
+
+    os.register_at_fork(after_in_child=hook)
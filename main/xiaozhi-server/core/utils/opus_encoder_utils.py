@@ -1,19 +1,84 @@
 """
 Opus编码工具类
 将PCM音频数据编码为Opus格式
+
+libopus编码器由进程级编码器池复用，不必每句话都重新创建；
+流式编码使用预分配的帧缓冲区，收到的PCM直接拷入帧缓冲区后编码，不再反复拼接数组。
 """
 
+import ctypes
 import logging
+import threading
 import traceback
-import numpy as np
+import opuslib_next
 from opuslib_next import Encoder
 from opuslib_next import constants
-from typing import Optional, Callable, Any
+from opuslib_next.api import encoder as opus_encoder_api
+from typing import Dict, List, Optional, Callable, Any, Tuple
+
+# 单个Opus数据包的最大字节数（libopus推荐值）
+MAX_PACKET_BYTES = 4000
+
+
+class OpusEncoderPool:
+    """按编码参数复用的libopus编码器池"""
+
+    def __init__(self, max_idle: int = 64):
+        self.max_idle = max_idle
+        self._idle: Dict[Tuple, List[Encoder]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(
+        self,
+        sample_rate: int,
+        channels: int,
+        bitrate: Optional[int] = None,
+        complexity: Optional[int] = None,
+        signal: Optional[int] = None,
+    ) -> Tuple[Tuple, Encoder]:
+        """取出一个编码器，返回(池键, 编码器)，用完后调用release归还"""
+        key = (sample_rate, channels, bitrate, complexity, signal)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return key, idle.pop()
+
+        encoder = Encoder(sample_rate, channels, constants.APPLICATION_AUDIO)
+        if bitrate is not None:
+            encoder.bitrate = bitrate
+        if complexity is not None:
+            encoder.complexity = complexity
+        if signal is not None:
+            encoder.signal = signal
+        return key, encoder
+
+    def release(self, key: Tuple, encoder: Encoder) -> None:
+        """重置编码器状态后放回池中，码率等设置会保留"""
+        try:
+            encoder.reset_state()
+        except Exception:
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(encoder)
+
+
+encoder_pool = OpusEncoderPool()
 
-class OpusEncoderUtils:
-    """PCM到Opus的编码器"""
 
-    def __init__(self, sample_rate: int, channels: int, frame_size_ms: int):
+class OpusEncoderUtils:
+    """PCM到Opus的流式编码器"""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int,
+        frame_size_ms: int,
+        bitrate: Optional[int] = 24000,
+        complexity: Optional[int] = 10,
+        signal: Optional[int] = constants.SIGNAL_VOICE,
+    ):
         """
         初始化Opus编码器
 
@@ -21,6 +86,9 @@ class OpusEncoderUtils:
             sample_rate: 采样率 (Hz)
             channels: 通道数 (1=单声道, 2=立体声)
             frame_size_ms: 帧大小 (毫秒)
+            bitrate: 比特率 (bps)，None表示使用libopus默认值
+            complexity: 编码复杂度，None表示使用libopus默认值
+            signal: 信号类型，None表示自动判断
         """
         self.sample_rate = sample_rate
         self.channels = channels
@@ -29,104 +97,101 @@ class OpusEncoderUtils:
         self.frame_size = (sample_rate * frame_size_ms) // 1000
         # 总帧大小 = 每帧样本数 * 通道数
         self.total_frame_size = self.frame_size * channels
+        self.frame_bytes = self.total_frame_size * 2
 
         # 比特率和复杂度设置
-        self.bitrate = 24000  # bps
-        self.complexity = 10  # 最高质量
-
-        # 缓冲区初始化为空
-        self.buffer = np.array([], dtype=np.int16)
-
+        self.bitrate = bitrate
+        self.complexity = complexity
+
+        # 预分配的帧缓冲区，_filled为已写入的字节数
+        self._frame = (ctypes.c_int16 * self.total_frame_size)()
+        self._frame_view = memoryview(self._frame).cast("B")
+        self._filled = 0
+        self._packet = (ctypes.c_char * MAX_PACKET_BYTES)()
+        # 防止close归还编码器时仍有线程在编码
+        self._lock = threading.Lock()
+
+        self._encoder_params = (sample_rate, channels, bitrate, complexity, signal)
         try:
-            # 创建Opus编码器
-            self.encoder = Encoder(
-                sample_rate, channels, constants.APPLICATION_AUDIO  # 音频优化模式
-            )
-            self.encoder.bitrate = self.bitrate
-            self.encoder.complexity = self.complexity
-            self.encoder.signal = constants.SIGNAL_VOICE  # 语音信号优化
+            # 从编码器池取出Opus编码器
+            self._pool_key, self.encoder = encoder_pool.acquire(*self._encoder_params)
         except Exception as e:
             logging.error(f"初始化Opus编码器失败: {e}")
             raise RuntimeError("初始化失败") from e
 
     def reset_state(self):
         """重置编码器状态"""
-        self.encoder.reset_state()
-        self.buffer = np.array([], dtype=np.int16)
+        with self._lock:
+            if self.encoder is not None:
+                self.encoder.reset_state()
+            self._filled = 0
 
     def encode_pcm_to_opus_stream(self, pcm_data: bytes, end_of_stream: bool, callback: Callable[[Any], Any]):
         """
         将PCM数据编码为Opus格式，以流式方式进行处理
 
         Args:
-            pcm_data: PCM字节数据
+            pcm_data: PCM字节数据（小端16位，支持bytes/bytearray/memoryview）
             end_of_stream: 是否为流的结束,
             callback: opus处理方法
-
-        Returns:
-            Opus数据包列表
         """
-        # 将字节数据转换为short数组
-        new_samples = self._convert_bytes_to_shorts(pcm_data)
-
-        # 校验PCM数据
-        self._validate_pcm_data(new_samples)
-
-        # 将新数据追加到缓冲区
-        self.buffer = np.append(self.buffer, new_samples)
-
+        data = memoryview(pcm_data).cast("B")
         offset = 0
+        total = len(data)
+
+        while offset < total:
+            # 拷入帧缓冲区，凑满一帧立即编码
+            count = min(self.frame_bytes - self._filled, total - offset)
+            self._frame_view[self._filled : self._filled + count] = data[
+                offset : offset + count
+            ]
+            self._filled += count
+            offset += count
+            if self._filled == self.frame_bytes:
+                self._emit(callback)
+
+        # 流结束时处理剩余数据，最后一帧用0填充
+        if end_of_stream and self._filled > 0:
+            ctypes.memset(
+                ctypes.addressof(self._frame) + self._filled,
+                0,
+                self.frame_bytes - self._filled,
+            )
+            self._emit(callback)
+
+    def _emit(self, callback: Callable[[Any], Any]) -> None:
+        self._filled = 0
+        output = self._encode()
+        if output:
+            callback(output)
 
-        # 处理所有完整帧
-        while offset <= len(self.buffer) - self.total_frame_size:
-            frame = self.buffer[offset : offset + self.total_frame_size]
-            output = self._encode(frame)
-            if output:
-                callback(output)
-            offset += self.total_frame_size
-
-        # 保留未处理的样本
-        self.buffer = self.buffer[offset:]
-
-        # 流结束时处理剩余数据
-        if end_of_stream and len(self.buffer) > 0:
-            # 创建最后一帧并用0填充
-            last_frame = np.zeros(self.total_frame_size, dtype=np.int16)
-            last_frame[: len(self.buffer)] = self.buffer
-
-            output = self._encode(last_frame)
-            if output:
-                callback(output)
-            self.buffer = np.array([], dtype=np.int16)
-
-    def _encode(self, frame: np.ndarray) -> Optional[bytes]:
-        """编码一帧音频数据"""
+    def _encode(self) -> Optional[bytes]:
+        """编码帧缓冲区中的一帧音频数据"""
         try:
-            # 将numpy数组转换为bytes
-            frame_bytes = frame.tobytes()
-            # opuslib要求输入字节数必须是channels*2的倍数
-            encoded = self.encoder.encode(frame_bytes, self.frame_size)
-            return encoded
+            with self._lock:
+                if self.encoder is None:
+                    # close后继续使用时重新从编码器池获取
+                    self._pool_key, self.encoder = encoder_pool.acquire(
+                        *self._encoder_params
+                    )
+                result = opus_encoder_api.libopus_encode(
+                    self.encoder.encoder_state,
+                    self._frame,
+                    self.frame_size,
+                    self._packet,
+                    MAX_PACKET_BYTES,
+                )
+                if result < 0:
+                    raise opuslib_next.OpusError(result)
+                return ctypes.string_at(self._packet, result)
         except Exception as e:
             logging.error(f"Opus编码失败: {e}")
             traceback.print_exc()
             return None
 
-    def _convert_bytes_to_shorts(self, bytes_data: bytes) -> np.ndarray:
-        """将字节数组转换为short数组 (16位PCM)"""
-        # 假设输入是小端字节序的16位PCM
-        return np.frombuffer(bytes_data, dtype=np.int16)
-
-    def _validate_pcm_data(self, pcm_shorts: np.ndarray) -> None:
-        """验证PCM数据是否有效"""
-        # 16位PCM数据范围是 -32768 到 32767
-        if np.any((pcm_shorts < -32768) | (pcm_shorts > 32767)):
-            invalid_samples = pcm_shorts[(pcm_shorts < -32768) | (pcm_shorts > 32767)]
-            logging.warning(f"发现无效PCM样本: {invalid_samples[:5]}...")
-            # 在实际应用中可以选择裁剪而不是抛出异常
-            # np.clip(pcm_shorts, -32768, 32767, out=pcm_shorts)
-
     def close(self):
-        """关闭编码器并释放资源"""
-        # opuslib没有明确的关闭方法，Python的垃圾回收会处理
-        pass
\ No newline at end of file
+        """归还编码器到编码器池，之后再编码会重新获取编码器"""
+        with self._lock:
+            encoder, self.encoder = self.encoder, None
+        if encoder is not None:
+            encoder_pool.release(self._pool_key, encoder)
@@ -0,0 +1,133 @@
+"""
+流式文本增量分句
+LLM每输出一个片段就要判断能否切出一句交给TTS。原先每次都把整段回复重新拼接后逐个标点rfind，
+回复越长越慢；这里只扫描新追加的文本，并且只保留尚未切出的部分。
+首句还可以设置字数和时间预算，LLM迟迟不输出标点时提前在词边界切出首句，尽快开始播放。
+"""
+
+import re
+import time
+from typing import Iterable, List, Optional
+
+
+class SentenceSegmenter:
+    """增量分句器
+
+    append()追加LLM输出的文本片段，pop_segment()取出到断句标点为止的文本。
+    第一句使用包含逗号等的标点集合，尽早切出首句以降低首字延迟；之后使用句末标点集合。
+    首句没有标点时，超过first_max_chars个字或距第一个片段超过first_max_ms毫秒也会切出。
+    """
+
+    # 预算触发时首句至少包含的字数，避免切出过短的片段
+    MIN_FIRST_CHARS = 2
+
+    def __init__(
+        self,
+        punctuations: Iterable[str],
+        first_sentence_punctuations: Iterable[str],
+        first_max_chars: int = 0,
+        first_max_ms: float = 0,
+    ):
+        self._pattern = self._compile(punctuations)
+        self._first_pattern = self._compile(first_sentence_punctuations)
+        self.configure_first_segment(first_max_chars, first_max_ms)
+        self.reset()
+
+    def configure_first_segment(self, max_chars: int = 0, max_ms: float = 0):
+        """设置首句的字数和时间预算，0表示不限制"""
+        self.first_max_chars = max(0, int(max_chars))
+        self.first_max_ms = max(0.0, float(max_ms))
+
+    @staticmethod
+    def _compile(punctuations: Iterable[str]):
+        return re.compile("|".join(re.escape(p) for p in punctuations))
+
+    def reset(self):
+        """开始新一轮回复"""
+        self._chunks: List[str] = []  # 尚未切出的文本片段
+        self._length = 0  # 尚未切出的文本长度
+        self._cut = 0  # 可以切出的位置（断句标点之后），0表示还没有
+        self._first_text_at = None  # 收到第一个片段的时间
+        self._budget_stalled = False  # 预算已到期但没有可切分的位置，等待新文本
+        self.is_first_sentence = True
+
+    def append(self, text: str):
+        """追加文本片段，只扫描这段新文本"""
+        if not text:
+            return
+        if self._first_text_at is None:
+            self._first_text_at = time.monotonic()
+        self._budget_stalled = False
+        self._scan(text, self._length)
+        self._chunks.append(text)
+        self._length += len(text)
+
+    def _scan(self, text: str, base: int):
+        if self.is_first_sentence:
+            # 首句在第一个标点处切出
+            if not self._cut:
+                match = self._first_pattern.search(text)
+                if match:
+                    self._cut = base + match.end()
+            return
+        # 之后的句子尽量切到最后一个句末标点
+        for match in self._pattern.finditer(text):
+            self._cut = base + match.end()
+
+    def pop_segment(self) -> Optional[str]:
+        """取出到断句标点为止的原始文本，没有可切出的内容时返回None"""
+        if not self._cut and self.is_first_sentence and self._first_over_budget():
+            self._cut = self._first_word_boundary()
+            # 只有一个单词时切不出首句，新文本到来前不再按时间唤醒
+            self._budget_stalled = not self._cut
+        if not self._cut:
+            return None
+        text = "".join(self._chunks)
+        segment, rest = text[: self._cut], text[self._cut :]
+        self.is_first_sentence = False
+        self._chunks = []
+        self._length = 0
+        self._cut = 0
+        # 剩余部分按句末标点重新扫描
+        self.append(rest)
+        return segment
+
+    def time_until_flush(self) -> Optional[float]:
+        """距首句时间预算到期还有多少秒，不需要按时间切分时返回None"""
+        if (
+            self._budget_stalled
+            or not self.first_max_ms
+            or not self.is_first_sentence
+            or self._cut
+            or self._first_text_at is None
+            or self._length < self.MIN_FIRST_CHARS
+        ):
+            return None
+        deadline = self._first_text_at + self.first_max_ms / 1000
+        return max(0.0, deadline - time.monotonic())
+
+    def _first_over_budget(self) -> bool:
+        if self.first_max_chars and self._length >= self.first_max_chars:
+            return True
+        remaining = self.time_until_flush()
+        return remaining is not None and remaining <= 0
+
+    def _first_word_boundary(self) -> int:
+        """首句预算到期时的切分位置，不在英文单词或数字中间切开，没有合适位置时返回0"""
+        text = "".join(self._chunks)
+        cut = len(text)
+        while cut > 0 and text[cut - 1].isascii() and text[cut - 1].isalnum():
+            cut -= 1
+        # 整段只有一个单词时等待后续文本
+        return cut if cut >= self.MIN_FIRST_CHARS else 0
+
+    def take_remaining(self) -> str:
+        """取出全部尚未切出的文本"""
+        text = "".join(self._chunks)
+        self._chunks = []
+        self._length = 0
+        self._cut = 0
+        return text
+
+    def __len__(self):
+        return self._length
@@ -0,0 +1,140 @@
+"""
+进程级云服务访问令牌缓存
+同一个AccessKey获取的临时Token被所有连接的ASR/TTS实例共享，
+在过期前由后台线程提前刷新，新连接直接使用缓存，不再每次请求令牌接口。
+"""
+
+import time
+import threading
+from functools import partial
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 距离过期还剩多少秒时开始提前刷新
+REFRESH_AHEAD_SECONDS = 600
+# 提前刷新失败后的重试间隔（秒）
+RETRY_INTERVAL_SECONDS = 60
+# 请求令牌接口的超时时间（秒），刷新期间持有缓存锁，不能无限等待
+TOKEN_REQUEST_TIMEOUT = 10
+
+Fetcher = Callable[[], Tuple[Optional[str], Any]]
+
+
+def parse_expire_time(expire_time) -> Optional[float]:
+    """把接口返回的过期时间（秒级时间戳或UTC时间字符串）转换为时间戳"""
+    expire_str = str(expire_time).strip()
+    try:
+        if expire_str.isdigit():
+            return float(expire_str)
+        return datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ").timestamp()
+    except ValueError:
+        return None
+
+
+class _Entry:
+    def __init__(self, fetch: Fetcher):
+        self.fetch = fetch
+        self.lock = threading.Lock()
+        self.token = None
+        self.expire_time = None  # 接口返回的原始过期时间
+        self.expire_at = None  # 解析后的过期时间戳
+        self.timer: Optional[threading.Timer] = None
+
+
+class TokenCache:
+    """按AccessKey缓存令牌，同一时刻同一个key最多只有一个请求在获取令牌"""
+
+    def __init__(self, refresh_ahead: float = REFRESH_AHEAD_SECONDS):
+        self.refresh_ahead = refresh_ahead
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, fetch: Fetcher, force: bool = False):
+        """获取令牌，返回(token, 原始过期时间)
+
+        缓存的令牌未过期时直接返回；force为True时（例如服务端返回401）重新获取。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(fetch)
+        with entry.lock:
+            if force or not self._is_valid(entry):
+                self._refresh(key, entry)
+            return entry.token, entry.expire_time
+
+    @staticmethod
+    def _is_valid(entry: _Entry) -> bool:
+        if not entry.token:
+            return False
+        return entry.expire_at is None or time.time() < entry.expire_at - 60
+
+    def _refresh(self, key: Hashable, entry: _Entry) -> bool:
+        """获取新令牌并安排下一次提前刷新，调用方需持有entry.lock"""
+        token, expire_time = entry.fetch()
+        if not token:
+            # 获取失败不写入缓存，由调用方按原有逻辑处理
+            return False
+        entry.token = token
+        entry.expire_time = expire_time
+        entry.expire_at = parse_expire_time(expire_time) if expire_time else None
+        self._schedule(key, entry)
+        return True
+
+    def _schedule(self, key: Hashable, entry: _Entry, delay: Optional[float] = None):
+        if entry.timer is not None:
+            entry.timer.cancel()
+            entry.timer = None
+        if delay is None:
+            if entry.expire_at is None:
+                return
+            delay = max(
+                entry.expire_at - self.refresh_ahead - time.time(),
+                RETRY_INTERVAL_SECONDS,
+            )
+        entry.timer = threading.Timer(delay, self._refresh_ahead, args=(key, entry))
+        entry.timer.daemon = True
+        entry.timer.start()
+
+    def _refresh_ahead(self, key: Hashable, entry: _Entry):
+        with entry.lock:
+            try:
+                if not self._refresh(key, entry):
+                    raise ValueError("令牌接口未返回有效Token")
+                logger.bind(tag=TAG).info(f"已提前刷新访问令牌: {key[0]}")
+            except Exception as e:
+                logger.bind(tag=TAG).warning(f"提前刷新访问令牌失败，稍后重试: {e}")
+                if entry.expire_at is None or time.time() < entry.expire_at:
+                    self._schedule(key, entry, RETRY_INTERVAL_SECONDS)
+
+
+_token_cache = TokenCache()
+
+
+def get_token(key: Hashable, fetch: Fetcher, force: bool = False):
+    """从进程级缓存获取令牌，返回(token, 原始过期时间)"""
+    return _token_cache.get(key, fetch, force)
+
+
+def get_access_token(
+    provider: str,
+    access_key_id: str,
+    access_key_secret: str,
+    create_token: Callable[[str, str], Tuple[Optional[str], Any]],
+    force: bool = False,
+):
+    """按AccessKey获取共享令牌，返回(token, 原始过期时间)
+
+    create_token(access_key_id, access_key_secret)负责请求令牌接口。缓存只保存密钥和这个函数，
+    不引用调用方的ASR/TTS实例，连接关闭后实例可以正常释放。
+    """
+    return get_token(
+        (provider, access_key_id),
+        partial(create_token, access_key_id, access_key_secret),
+        force,
+    )
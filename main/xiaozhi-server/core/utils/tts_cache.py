@@ -0,0 +1,188 @@
+"""
+句子级TTS音频缓存
+问候语、"好的"、工具确认、告别语等句子在不同连接间大量重复，每次都要调用一次付费的云端TTS。
+这里按(TTS类型, 音色及合成参数, 规范化文本)缓存最终的音频帧列表：
+内存LRU + 可选的磁盘缓存（p3格式），同一句话并发未命中时只合成一次，其余请求等待结果。
+"""
+
+import os
+import json
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config.logger import setup_logging
+from core.utils import p3
+
+TAG = __name__
+logger = setup_logging()
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.frames: Optional[List[bytes]] = None
+
+
+class TTSAudioCache:
+    def __init__(
+        self,
+        max_memory_mb: float = 64,
+        disk_dir: Optional[str] = None,
+        max_text_length: int = 60,
+        wait_timeout: float = 30,
+    ):
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.disk_dir = disk_dir or None
+        self.max_text_length = max_text_length
+        self.wait_timeout = wait_timeout
+        self._memory: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        return " ".join(text.split())
+
+    def make_key(self, provider_type: str, params: dict, text: str) -> str:
+        """根据TTS类型、合成参数和规范化文本计算缓存键"""
+        raw = json.dumps(
+            [provider_type, params, self.normalize_text(text)],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def cacheable(self, text: str) -> bool:
+        text = self.normalize_text(text)
+        return 0 < len(text) <= self.max_text_length
+
+    def acquire(self, key: str) -> Tuple[Optional[List[bytes]], bool]:
+        """查询缓存，返回(音频帧, 是否负责合成)
+
+        命中时返回音频帧；未命中且没有其他请求在合成时，由当前请求负责合成，
+        合成结束后必须调用release。已有请求在合成时等待其结果。
+        """
+        with self._lock:
+            frames = self._get_memory(key)
+            if frames is not None:
+                self.hits += 1
+                return frames, False
+            flight = self._flights.get(key)
+            if flight is None:
+                frames = self._load_disk(key)
+                if frames is not None:
+                    self.hits += 1
+                    self._put_memory(key, frames)
+                    return frames, False
+                self.misses += 1
+                self._flights[key] = _Flight()
+                return None, True
+
+        # 同一句话正在合成，等待结果
+        if flight.event.wait(self.wait_timeout) and flight.frames is not None:
+            with self._lock:
+                self.hits += 1
+            return flight.frames, False
+        # 合成失败或超时，自行合成但不参与缓存
+        return None, False
+
+    def release(self, key: str, frames: Optional[List[bytes]]):
+        """合成结束，frames为None表示合成失败"""
+        with self._lock:
+            flight = self._flights.pop(key, None)
+            if frames:
+                self._put_memory(key, frames)
+        if frames:
+            self._save_disk(key, frames)
+        if flight is not None:
+            flight.frames = frames or None
+            flight.event.set()
+
+    def _get_memory(self, key: str) -> Optional[List[bytes]]:
+        frames = self._memory.get(key)
+        if frames is not None:
+            self._memory.move_to_end(key)
+        return frames
+
+    def _put_memory(self, key: str, frames: List[bytes]):
+        size = sum(len(f) for f in frames)
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= sum(len(f) for f in old)
+        self._memory[key] = frames
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sum(len(f) for f in evicted)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.p3")
+
+    def _load_disk(self, key: str) -> Optional[List[bytes]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            frames, _ = p3.decode_opus_from_file(path)
+            return frames or None
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"读取TTS磁盘缓存失败: {path}，错误: {e}")
+            return None
+
+    def _save_disk(self, key: str, frames: List[bytes]):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                for frame in frames:
+                    f.write(struct.pack(">BBH", 0, 0, len(frame)))
+                    f.write(frame)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"写入TTS磁盘缓存失败: {path}，错误: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+_cache: Optional[TTSAudioCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache(config: Optional[dict]) -> Optional[TTSAudioCache]:
+    """获取进程级TTS缓存，未开启时返回None"""
+    global _cache
+    if _cache is None:
+        cache_config = (config or {}).get("tts_cache") or {}
+        enabled = cache_config.get("enabled", False)
+        if str(enabled).lower() not in ("true", "1", "yes"):
+            return None
+        with _cache_lock:
+            if _cache is None:
+                max_memory_mb = cache_config.get("max_memory_mb", 64)
+                max_text_length = cache_config.get("max_text_length", 60)
+                _cache = TTSAudioCache(
+                    max_memory_mb=float(max_memory_mb) if max_memory_mb else 64,
+                    disk_dir=cache_config.get("disk_dir") or None,
+                    max_text_length=int(max_text_length) if max_text_length else 60,
+                )
+                logger.bind(tag=TAG).info("TTS音频缓存已开启")
+    return _cache
@@ -0,0 +1,91 @@
+"""
+非流式TTS的并行合成流水线
+原先一句话合成、编码完成后才会请求下一句，云端合成耗时超过上一句的播放时长时句间就会出现停顿。
+流水线最多同时合成lookahead段文本，合成在共享合成线程池中执行；提交时各段的缓冲队列按顺序写入播放队列，
+播放任务读完一段再读下一段：当前段的音频边合成边播放，后面的段提前合成好等待播放。
+流水线只在事件循环中使用，不需要额外的线程。
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable
+
+from config.logger import setup_logging
+from core.utils.async_queue import AsyncQueue
+
+TAG = __name__
+logger = setup_logging()
+
+# 段结束标记
+_DONE = object()
+
+
+class SynthesisSegment:
+    """一段文本的合成输出，合成线程把播放项写入queue，播放任务按顺序读出"""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.queue = AsyncQueue()
+
+
+class OrderedSynthesisPipeline:
+    """有界前瞻的并行合成流水线，输出顺序与提交顺序一致"""
+
+    def __init__(self, output, executor: Executor, lookahead: int = 2):
+        self.output = output
+        self.executor = executor
+        self.lookahead = max(1, int(lookahead))
+        # 同时合成的段数不超过lookahead
+        self._slots = asyncio.Semaphore(self.lookahead)
+        self._generation = 0  # clear()后递增，之前提交的段不再播放
+        self._futures = set()
+        self._closed = False
+
+    async def submit(self, func: Callable[..., Any], *args) -> bool:
+        """提交一段合成任务，func(segment_queue, *args)在合成线程池中把播放项写入segment_queue
+
+        正在合成的段数已满时等待，流水线关闭时返回False。
+        """
+        if self._closed:
+            return False
+        await self._slots.acquire()
+        if self._closed:
+            self._slots.release()
+            return False
+        segment = SynthesisSegment(self._generation)
+        self.output.put(segment)
+
+        def run():
+            try:
+                func(segment.queue, *args)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"合成任务失败: {e}")
+            finally:
+                segment.queue.put(_DONE)
+
+        future = asyncio.get_running_loop().run_in_executor(self.executor, run)
+        self._futures.add(future)
+        future.add_done_callback(self._on_done)
+        return True
+
+    def _on_done(self, future):
+        self._futures.discard(future)
+        self._slots.release()
+
+    async def read(self, segment: SynthesisSegment) -> AsyncIterator[Any]:
+        """按顺序读出一段的播放项，段合成结束或已被clear()丢弃时结束"""
+        while segment.generation == self._generation:
+            item = await segment.queue.get_async()
+            if item is _DONE or segment.generation != self._generation:
+                return
+            yield item
+
+    def clear(self):
+        """丢弃已提交段中尚未播放的音频（例如用户打断时），正在合成的段仍会执行完"""
+        self._generation += 1
+
+    def close(self):
+        """停止流水线，未开始的合成任务不再执行"""
+        self._closed = True
+        for future in list(self._futures):
+            future.cancel()
@@ -0,0 +1,210 @@
+"""
+双流式TTS的共享上游连接
+火山双流式、阿里云流式TTS的协议都以会话为单位，原先每个设备连接各自持有一条上游WebSocket，
+设备一多就会碰到上游的连接数限制，而且每轮对话都可能要重新握手。
+这里按服务配置在进程内维护一组上游连接，设备的会话借用空闲连接，下行消息按会话ID分发给对应的会话；
+会话正常结束后连接留给下一个会话使用，空闲过久才关闭。
+"""
+
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 下行消息处理函数，连接断开时收到None
+MessageHandler = Callable[[Optional[object]], None]
+
+
+class _SharedSocket:
+    def __init__(self, ws):
+        self.ws = ws
+        self.sessions: Dict[str, MessageHandler] = {}
+        self.idle_since = time.monotonic()
+        self.closed = False
+        self.reader: Optional[asyncio.Task] = None
+
+
+class SessionMux:
+    """上游连接复用器
+
+    - 每条连接同时最多承载max_sessions个会话（上游协议只支持串行会话时为1）
+    - 连接总数不超过max_sockets（0表示不限制），连接都被占用时新会话等待
+    - session_id_of从下行消息中取出会话ID；取不到时（连接级消息、不带会话ID的音频帧）
+      交给该连接上的所有会话
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Awaitable],
+        session_id_of: Callable[[object], Optional[str]],
+        max_sessions: int = 1,
+        max_sockets: int = 0,
+        max_idle_s: float = 30,
+        acquire_timeout: float = 10,
+    ):
+        self.name = name
+        self._connect = connect
+        self._session_id_of = session_id_of
+        self.max_sessions = max(1, int(max_sessions))
+        self.max_sockets = max(0, int(max_sockets))
+        self.max_idle_s = max_idle_s
+        self.acquire_timeout = acquire_timeout
+        self._sockets: List[_SharedSocket] = []
+        self._dialing = 0
+        self._cond = asyncio.Condition()
+
+        # 统计信息
+        self.reused = 0
+        self.dialed = 0
+
+    async def open_session(self, session_id: str, on_message: MessageHandler):
+        """为会话分配上游连接并登记消息处理函数，返回可用于发送的WebSocket"""
+        deadline = time.monotonic() + self.acquire_timeout
+        async with self._cond:
+            while True:
+                self._prune()
+                sock = self._pick()
+                if sock is not None:
+                    sock.sessions[session_id] = on_message
+                    self.reused += 1
+                    return sock.ws
+                if not self.max_sockets or (
+                    len(self._sockets) + self._dialing < self.max_sockets
+                ):
+                    self._dialing += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{self.name}上游连接已全部占用")
+                await asyncio.wait_for(self._cond.wait(), timeout=remaining)
+
+        try:
+            ws = await self._connect()
+        finally:
+            async with self._cond:
+                self._dialing -= 1
+                self._cond.notify_all()
+        sock = _SharedSocket(ws)
+        sock.sessions[session_id] = on_message
+        sock.reader = asyncio.create_task(self._read(sock))
+        async with self._cond:
+            self._sockets.append(sock)
+        self.dialed += 1
+        return ws
+
+    async def release(self, session_id: str, broken: bool = False):
+        """会话结束，broken为True时（会话异常中断、上游状态不确定）关闭其所在连接"""
+        sock = self._find(session_id)
+        if sock is None:
+            return
+        async with self._cond:
+            sock.sessions.pop(session_id, None)
+            if not sock.sessions:
+                sock.idle_since = time.monotonic()
+            self._cond.notify_all()
+        if broken:
+            await self._close(sock)
+
+    def _find(self, session_id: str) -> Optional[_SharedSocket]:
+        for sock in self._sockets:
+            if session_id in sock.sessions:
+                return sock
+        return None
+
+    def _pick(self) -> Optional[_SharedSocket]:
+        # 优先使用已有会话的连接，让空闲连接尽早过期
+        best = None
+        for sock in self._sockets:
+            if sock.closed or len(sock.sessions) >= self.max_sessions:
+                continue
+            if best is None or len(sock.sessions) > len(best.sessions):
+                best = sock
+        return best
+
+    def _prune(self):
+        now = time.monotonic()
+        for sock in list(self._sockets):
+            if sock.closed:
+                self._sockets.remove(sock)
+            elif not sock.sessions and now - sock.idle_since > self.max_idle_s:
+                self._sockets.remove(sock)
+                sock.closed = True
+                asyncio.create_task(self._close_ws(sock))
+
+    async def _read(self, sock: _SharedSocket):
+        try:
+            async for msg in sock.ws:
+                session_id = self._session_id_of(msg)
+                if session_id is None:
+                    handlers = list(sock.sessions.values())
+                else:
+                    handler = sock.sessions.get(session_id)
+                    handlers = [handler] if handler else []
+                for handler in handlers:
+                    handler(msg)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"{self.name}上游连接异常断开: {e}")
+        finally:
+            sock.closed = True
+            for handler in list(sock.sessions.values()):
+                handler(None)
+            sock.sessions.clear()
+            async with self._cond:
+                if sock in self._sockets:
+                    self._sockets.remove(sock)
+                self._cond.notify_all()
+
+    async def _close(self, sock: _SharedSocket):
+        sock.closed = True
+        await self._close_ws(sock)
+
+    @staticmethod
+    async def _close_ws(sock: _SharedSocket):
+        try:
+            await sock.ws.close()
+        except Exception:
+            pass
+
+
+_muxes: Dict[Hashable, SessionMux] = {}
+
+
+def get_session_mux(
+    key: Hashable,
+    name: str,
+    connect: Callable[[], Awaitable],
+    session_id_of: Callable[[object], Optional[str]],
+    config: Optional[dict] = None,
+    max_sessions: Optional[int] = None,
+    max_idle_s: float = 30,
+) -> SessionMux:
+    """获取按服务配置共享的连接复用器，首次调用时创建
+
+    connect会被复用器长期持有，不应依赖某个设备连接的状态。
+    max_sessions为None时读取配置mux_max_sessions（默认1），协议不支持并发会话时由调用方固定为1。
+    """
+    mux = _muxes.get(key)
+    if mux is None:
+        config = config or {}
+        if max_sessions is None:
+            sessions = config.get("mux_max_sessions", 1)
+            max_sessions = int(sessions) if sessions else 1
+        sockets = config.get("mux_max_sockets", 0)
+        idle = config.get("mux_max_idle_s", max_idle_s)
+        mux = SessionMux(
+            name,
+            connect,
+            session_id_of,
+            max_sessions=max_sessions,
+            max_sockets=int(sockets) if sockets else 0,
+            max_idle_s=float(idle) if idle else max_idle_s,
+        )
+        _muxes[key] = mux
+    return mux
@@ -6,14 +6,16 @@ import wave
 import socket
 import requests
 import subprocess
-import numpy as np
 import opuslib_next
 from io import BytesIO
 from core.utils import p3
-from pydub import AudioSegment
+from core.utils.audio_decoder import StreamingAudioDecoder
+from core.utils.opus_encoder_utils import OpusEncoderUtils
 from typing import Callable, Any
 
 TAG = __name__
+# 读取音频文件时每次送入解码器的字节数
+AUDIO_READ_CHUNK_SIZE = 32 * 1024
 emoji_map = {
     "neutral": "😶",
     "happy": "🙂",
@@ -246,21 +248,22 @@ def extract_json_from_string(input_string):
 
 
 def audio_to_data_stream(audio_file_path, is_opus=True, callback: Callable[[Any], Any]=None) -> None:
+    """音频文件边读取边解码为Opus/PCM帧，wav、mp3在进程内解码"""
     # 获取文件后缀名
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
         file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
-    pcm_to_data_stream(raw_data, is_opus, callback)
+    decoder = StreamingAudioDecoder(file_type, is_opus, callback)
+    try:
+        with open(audio_file_path, "rb") as f:
+            while True:
+                data = f.read(AUDIO_READ_CHUNK_SIZE)
+                if not data:
+                    break
+                decoder.feed(data)
+        decoder.finish()
+    finally:
+        decoder.close()
 
 def audio_to_data(audio_file_path: str, is_opus: bool = True) -> list[bytes]:
     """
@@ -269,93 +272,46 @@ def audio_to_data(audio_file_path: str, is_opus: bool = True) -> list[bytes]:
         audio_file_path: 音频文件路径
         is_opus: 是否进行Opus编码
     """
-    # 获取文件后缀名
-    file_type = os.path.splitext(audio_file_path)[1]
-    if file_type:
-        file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
-
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
-    # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
     datas = []
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-
-        datas.append(frame_data)
-
+    audio_to_data_stream(audio_file_path, is_opus=is_opus, callback=datas.append)
     return datas
 
 def audio_bytes_to_data_stream(audio_bytes, file_type, is_opus, callback: Callable[[Any], Any]) -> None:
     """
-    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、p3
+    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、pcm、p3，其他格式回退到pydub
     """
     if file_type == "p3":
         # 直接用p3解码
         return p3.decode_opus_from_bytes_stream(audio_bytes, callback)
     else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
-        )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        raw_data = audio.raw_data
-        pcm_to_data_stream(raw_data, is_opus, callback)
+        decoder = StreamingAudioDecoder(file_type, is_opus, callback)
+        try:
+            decoder.feed(audio_bytes)
+            decoder.finish()
+        finally:
+            decoder.close()
 
 
 def pcm_to_data_stream(raw_data, is_opus=True, callback: Callable[[Any], Any] = None):
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
-    # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-            callback(frame_data)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-            callback(frame_data)
+    """16kHz单声道16位PCM切分为60ms帧，按需编码为Opus，最后一帧不足时补零"""
+    if is_opus:
+        # 编码器从进程级编码器池中获取，使用libopus默认编码参数
+        encoder = OpusEncoderUtils(
+            16000, 1, 60, bitrate=None, complexity=None, signal=None
+        )
+        try:
+            encoder.encode_pcm_to_opus_stream(raw_data, True, callback)
+        finally:
+            encoder.close()
+        return
+
+    frame_bytes = 960 * 2  # 60ms per frame, 16bit=2bytes/sample
+    data = memoryview(raw_data).cast("B")
+    for i in range(0, len(data), frame_bytes):
+        chunk = bytes(data[i : i + frame_bytes])
+        if len(chunk) < frame_bytes:
+            chunk += b"\x00" * (frame_bytes - len(chunk))
+        callback(chunk)
 
 def opus_datas_to_wav_bytes(opus_datas, sample_rate=16000, channels=1):
     """
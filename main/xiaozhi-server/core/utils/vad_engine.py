@@ -0,0 +1,78 @@
+"""
+VAD批量推理引擎
+将所有连接待处理的512采样点音频块在几毫秒内汇聚，合并成一次批量推理
+"""
+
+import concurrent.futures
+from typing import Any, Callable, List
+
+import numpy as np
+from core.utils.batch_scheduler import BatchScheduler
+
+# 16kHz采样率下Silero模型每次处理的采样点数
+VAD_CHUNK_SAMPLES = 512
+
+
+class VADSession:
+    """单个连接的VAD私有状态（解码器、模型循环状态）"""
+
+    def __init__(
+        self,
+        decoder=None,
+        state: Any = None,
+        context: Any = None,
+        noise_floor: float = 0.0,
+    ):
+        self.decoder = decoder
+        # 模型的循环状态与上下文，由具体的VAD实现负责初始化和更新
+        self.state = state
+        self.context = context
+        # 能量预筛使用的自适应底噪（归一化RMS）
+        self.noise_floor = noise_floor
+        # 能量预筛统计：总音频块数、跳过模型推理的音频块数
+        self.gate_total = 0
+        self.gate_skipped = 0
+
+
+class VADBatchEngine(BatchScheduler):
+    """跨连接的VAD微批量推理引擎
+
+    每个连接提交的音频块进入同一个等待队列，后台线程每隔max_wait_ms（或凑满max_batch）
+    取出一批执行一次推理。同一个连接的多个音频块必须按顺序推理（依赖循环状态），
+    所以一个批次里每个连接最多只包含一个音频块。
+    """
+
+    def __init__(
+        self,
+        infer_batch: Callable[[np.ndarray, List[VADSession]], np.ndarray],
+        max_batch: int = 64,
+        max_wait_ms: float = 4,
+        name: str = "vad-batch",
+    ):
+        """
+        Args:
+            infer_batch: 批量推理函数，输入(B, 512)的float32数组和对应的会话列表，
+                         返回长度为B的语音概率，并负责更新每个会话的循环状态
+            max_batch: 单批最大音频块数量
+            max_wait_ms: 收到第一个音频块后最多等待多久凑批（毫秒）
+        """
+        self._infer_batch = infer_batch
+        super().__init__(
+            self._process_chunks,
+            max_batch=max_batch,
+            max_wait_ms=max_wait_ms,
+            name=name,
+            key=lambda item: id(item[0]),
+        )
+
+    def submit(
+        self, session: VADSession, chunk: np.ndarray
+    ) -> concurrent.futures.Future:
+        """提交一个512采样点的float32音频块，返回语音概率的Future"""
+        return super().submit((session, chunk))
+
+    def _process_chunks(self, items) -> List[float]:
+        sessions = [session for session, _ in items]
+        chunks = np.stack([chunk for _, chunk in items])
+        probs = self._infer_batch(chunks, sessions)
+        return [float(prob) for prob in probs]
@@ -0,0 +1,209 @@
+"""
+服务器级命名工作线程池
+原先每个连接创建自己的ThreadPoolExecutor(max_workers=5)和一个上报线程，连接一多线程数和内存先耗尽，
+也无法限制上游LLM的总并发。这里按用途划分几个共享线程池（LLM对话、工具调用、聊天记录上报、连接初始化），
+每个池有全局并发上限；排队的任务按设备轮转取出，单个设备同时运行的任务数也有上限，
+避免个别设备占满线程池。
+"""
+
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 各线程池的默认配置，可在配置文件worker_pools中按池名覆盖
+DEFAULT_POOL_CONFIG = {
+    # LLM对话，同一设备上一轮对话被打断后可能还没退出，允许两个并发
+    "llm": {"max_workers": 64, "max_per_device": 2, "max_queue": 0},
+    # 意图识别触发的工具调用
+    "tool": {"max_workers": 32, "max_per_device": 2, "max_queue": 0},
+    # 聊天记录上报，同一设备按顺序上报
+    "report": {"max_workers": 8, "max_per_device": 1, "max_queue": 0},
+    # 连接初始化（加载记忆、意图、声纹等组件）
+    "init": {"max_workers": 16, "max_per_device": 1, "max_queue": 0},
+}
+
+
+class _DeviceQueue:
+    def __init__(self):
+        self.pending = deque()
+        self.running = 0
+        self.ready = False  # 是否在轮转队列中
+
+
+class WorkerPool:
+    """有界并发、按设备公平调度的线程池
+
+    - max_workers：线程数上限，即全局并发上限，线程按需创建
+    - max_per_device：单个设备同时运行的任务数上限，0表示不限制
+    - max_queue：排队任务数上限，超出时直接拒绝，0表示不限制
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_per_device: int = 0,
+        max_queue: int = 0,
+    ):
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.max_per_device = max(0, int(max_per_device))
+        self.max_queue = max(0, int(max_queue))
+        self._devices: Dict[Hashable, _DeviceQueue] = {}
+        self._ready = deque()  # 有可运行任务的设备，按轮转顺序排列
+        self._cond = threading.Condition()
+        self._threads = 0
+        self._idle = 0
+
+        # 统计信息
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs):
+        """以key（通常为设备ID）提交任务，返回concurrent.futures.Future"""
+        future = concurrent.futures.Future()
+        with self._cond:
+            if self.max_queue and self.queued >= self.max_queue:
+                self.rejected += 1
+                logger.bind(tag=TAG).warning(
+                    f"线程池{self.name}排队任务已满({self.queued})，拒绝设备{key}的任务"
+                )
+                future.set_exception(RuntimeError(f"线程池{self.name}已满"))
+                return future
+            device = self._devices.get(key)
+            if device is None:
+                device = self._devices[key] = _DeviceQueue()
+            device.pending.append((future, fn, args, kwargs))
+            self.submitted += 1
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            self._schedule(key, device)
+            # 空闲线程不够处理可运行的设备时再创建线程
+            if self._idle < len(self._ready) and self._threads < self.max_workers:
+                self._threads += 1
+                threading.Thread(
+                    target=self._worker,
+                    name=f"{self.name}-{self._threads}",
+                    daemon=True,
+                ).start()
+        return future
+
+    def _schedule(self, key, device: _DeviceQueue):
+        # 调用时已持有self._cond
+        if device.ready or not device.pending:
+            return
+        if self.max_per_device and device.running >= self.max_per_device:
+            return
+        device.ready = True
+        self._ready.append(key)
+        self._cond.notify()
+
+    def _take(self):
+        with self._cond:
+            self._idle += 1
+            while not self._ready:
+                self._cond.wait()
+            self._idle -= 1
+            key = self._ready.popleft()
+            device = self._devices[key]
+            device.ready = False
+            item = device.pending.popleft()
+            device.running += 1
+            self.queued -= 1
+            self.active += 1
+            # 该设备还有任务时排到轮转队列末尾
+            self._schedule(key, device)
+            return key, item
+
+    def _finish(self, key, ok: bool):
+        with self._cond:
+            self.active -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            device = self._devices[key]
+            device.running -= 1
+            if device.pending:
+                self._schedule(key, device)
+            elif device.running == 0:
+                del self._devices[key]
+
+    def _worker(self):
+        while True:
+            key, (future, fn, args, kwargs) = self._take()
+            ok = True
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        ok = False
+                        logger.bind(tag=TAG).error(
+                            f"线程池{self.name}任务执行失败: {type(e).__name__}: {e}"
+                        )
+                        future.set_exception(e)
+            finally:
+                self._finish(key, ok)
+
+    def get_stats(self) -> dict:
+        """线程池运行统计，queued为当前排队深度，max_queued为排队深度峰值"""
+        with self._cond:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "threads": self._threads,
+                "active": self.active,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "devices": len(self._devices),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+
+_pools: Dict[str, WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(name: str, config: Optional[dict] = None) -> WorkerPool:
+    """获取服务器级的命名线程池，首次调用时按配置worker_pools.<name>创建"""
+    pool = _pools.get(name)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            settings = dict(DEFAULT_POOL_CONFIG.get(name, {"max_workers": 8}))
+            overrides = ((config or {}).get("worker_pools") or {}).get(name) or {}
+            for k, v in overrides.items():
+                if k in ("max_workers", "max_per_device", "max_queue") and v not in (
+                    None,
+                    "",
+                ):
+                    settings[k] = int(v)
+            pool = WorkerPool(name, **settings)
+            _pools[name] = pool
+            logger.bind(tag=TAG).info(
+                f"线程池{name}已创建，最大线程数: {pool.max_workers}，"
+                f"单设备并发: {pool.max_per_device or '不限'}"
+            )
+    return pool
+
+
+def get_pool_stats() -> Dict[str, dict]:
+    """所有命名线程池的运行统计"""
+    return {name: pool.get_stats() for name, pool in list(_pools.items())}
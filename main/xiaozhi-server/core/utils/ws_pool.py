@@ -0,0 +1,151 @@
+"""
+上游WebSocket预连接池
+流式ASR每句话都要新建一条到云服务的连接，TLS握手和鉴权的耗时会直接叠加到首字延迟上。
+连接池按服务配置在所有设备连接间共享，提前建立好已鉴权的连接，检测到说话时直接取用。
+上游连接都是一次性的（一句话一条），池只负责预先建立，用完由各ASR自行关闭。
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+def _is_open(ws) -> bool:
+    state = getattr(ws, "state", None)
+    return state is not None and state.name == "OPEN"
+
+
+class WarmConnectionPool:
+    """预热连接池
+
+    - 最近keep_warm_s秒内有设备使用过时才保持预热，没有设备时不占用上游连接
+    - 空闲连接超过max_idle_s会被关闭并重建，避免被上游按空闲超时断开
+    - 池中没有可用连接时退化为现场建立连接
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Awaitable],
+        size: int = 1,
+        max_idle_s: float = 8,
+        keep_warm_s: float = 300,
+    ):
+        self.name = name
+        self._connect = connect
+        self.size = max(0, int(size))
+        self.max_idle_s = max_idle_s
+        self.keep_warm_s = keep_warm_s
+        self._idle = deque()  # (ws, 建立时间)
+        self._last_used = 0.0
+        self._wake = asyncio.Event()
+        self._maintain_task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def touch(self):
+        """标记有设备会用到该连接池，开始或继续预热"""
+        self._last_used = time.monotonic()
+        if self.size <= 0:
+            return
+        if self._maintain_task is None or self._maintain_task.done():
+            self._maintain_task = asyncio.create_task(self._maintain())
+        else:
+            self._wake.set()
+
+    async def acquire(self):
+        """取出一条已建立的连接，没有时现场建立"""
+        self.touch()
+        while self._idle:
+            ws, created_at = self._idle.popleft()
+            if _is_open(ws) and time.monotonic() - created_at < self.max_idle_s:
+                self.hits += 1
+                self._wake.set()
+                return ws
+            asyncio.create_task(self._close(ws))
+        self.misses += 1
+        return await self._connect()
+
+    async def _close(self, ws):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    def _prune(self):
+        now = time.monotonic()
+        keep = deque()
+        for ws, created_at in self._idle:
+            if _is_open(ws) and now - created_at < self.max_idle_s:
+                keep.append((ws, created_at))
+            else:
+                asyncio.create_task(self._close(ws))
+        self._idle = keep
+
+    async def _maintain(self):
+        retry_delay = 1
+        try:
+            while time.monotonic() - self._last_used < self.keep_warm_s:
+                self._prune()
+                while len(self._idle) < self.size:
+                    try:
+                        ws = await self._connect()
+                    except Exception as e:
+                        logger.bind(tag=TAG).warning(f"{self.name}预连接失败: {e}")
+                        await asyncio.sleep(retry_delay)
+                        retry_delay = min(retry_delay * 2, 30)
+                        break
+                    retry_delay = 1
+                    self._idle.append((ws, time.monotonic()))
+
+                # 等到最早的空闲连接过期或有连接被取走
+                if self._idle:
+                    timeout = self._idle[0][1] + self.max_idle_s - time.monotonic()
+                else:
+                    timeout = retry_delay
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(timeout, 0.1))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # 长时间无人使用，释放所有预连接
+            while self._idle:
+                ws, _ = self._idle.popleft()
+                await self._close(ws)
+
+
+_pools: Dict[Hashable, WarmConnectionPool] = {}
+
+
+def get_ws_pool(
+    key: Hashable,
+    name: str,
+    connect: Callable[[], Awaitable],
+    config: Optional[dict] = None,
+) -> WarmConnectionPool:
+    """获取按服务配置共享的连接池，首次调用时创建
+
+    connect会被池长期持有，不应依赖某个设备连接的状态。
+    """
+    pool = _pools.get(key)
+    if pool is None:
+        config = config or {}
+        size = config.get("pool_size", 1)
+        max_idle_s = config.get("pool_max_idle_s", 8)
+        pool = WarmConnectionPool(
+            name,
+            connect,
+            size=int(size) if size not in (None, "") else 1,
+            max_idle_s=float(max_idle_s) if max_idle_s else 8,
+        )
+        _pools[key] = pool
+    return pool
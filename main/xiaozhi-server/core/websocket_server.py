@@ -1,5 +1,8 @@
+import time
 import asyncio
 import json
+import threading
+from typing import Optional
 
 import websockets
 from config.logger import setup_logging
@@ -8,25 +11,42 @@ from config.config_loader import get_config_from_api
 from core.auth import AuthManager, AuthenticationError
 from core.utils.modules_initialize import initialize_modules
 from core.utils.util import check_vad_update, check_asr_update
+from core.utils.audio_assets import preload_assets
+from core.utils.admission import AdmissionController
 
 TAG = __name__
 
 
 class WebSocketServer:
-    def __init__(self, config: dict):
+    def __init__(
+        self,
+        config: dict,
+        shared_modules: Optional[dict] = None,
+        reuse_port: bool = False,
+    ):
+        """
+        Args:
+            config: 配置字典
+            shared_modules: 多进程模式下主进程预先加载、各工作进程共享的模块（vad、asr）
+            reuse_port: 多个工作进程通过SO_REUSEPORT监听同一端口
+        """
         self.config = config
         self.logger = setup_logging()
         self.config_lock = asyncio.Lock()
+        self.reuse_port = reuse_port
+        self.server = None
+        shared_modules = shared_modules or {}
         modules = initialize_modules(
             self.logger,
             self.config,
-            "VAD" in self.config["selected_module"],
-            "ASR" in self.config["selected_module"],
+            "VAD" in self.config["selected_module"] and "vad" not in shared_modules,
+            "ASR" in self.config["selected_module"] and "asr" not in shared_modules,
             "LLM" in self.config["selected_module"],
             False,
             "Memory" in self.config["selected_module"],
             "Intent" in self.config["selected_module"],
         )
+        modules.update(shared_modules)
         self._vad = modules["vad"] if "vad" in modules else None
         self._asr = modules["asr"] if "asr" in modules else None
         self._llm = modules["llm"] if "llm" in modules else None
@@ -34,6 +54,10 @@ class WebSocketServer:
         self._memory = modules["memory"] if "memory" in modules else None
 
         self.active_connections = set()
+        # 连接准入控制，重连风暴时限制同时初始化的连接数
+        self.admission = AdmissionController.from_config(
+            self.config["server"].get("admission", {})
+        )
 
         auth_config = self.config["server"].get("auth", {})
         self.auth_enable = auth_config.get("enabled", False)
@@ -43,16 +67,48 @@ class WebSocketServer:
         expire_seconds = auth_config.get("expire_seconds", None)
         self.auth = AuthManager(secret_key=secret_key, expire_seconds=expire_seconds)
 
+        # 后台预先转码提示音资源，播放时直接使用内存中的帧
+        threading.Thread(target=self._preload_assets, daemon=True).start()
+
+    def _preload_assets(self):
+        count = preload_assets()
+        self.logger.bind(tag=TAG).info(f"已预加载{count}个提示音资源")
+
     async def start(self):
         server_config = self.config["server"]
         host = server_config.get("ip", "0.0.0.0")
         port = int(server_config.get("port", 8000))
 
         async with websockets.serve(
-            self._handle_connection, host, port, process_request=self._http_response
-        ):
+            self._handle_connection,
+            host,
+            port,
+            process_request=self._http_response,
+            reuse_port=self.reuse_port,
+        ) as server:
+            self.server = server
             await asyncio.Future()
 
+    async def shutdown(self, drain_timeout: float = 0):
+        """停止接受新连接，等待现有连接结束，超过drain_timeout秒后关闭剩余连接"""
+        if self.server is None:
+            return
+        self.server.close(close_connections=False)
+        deadline = time.monotonic() + drain_timeout
+        while self.active_connections and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        if self.active_connections:
+            self.logger.bind(tag=TAG).info(
+                f"等待超时，关闭剩余的{len(self.active_connections)}个连接"
+            )
+        self.server.close()
+        await self.server.wait_closed()
+
+    def get_vad_stats(self) -> dict:
+        """返回共享VAD的能量预筛和批量推理统计，VAD不支持统计时返回空字典"""
+        get_stats = getattr(self._vad, "get_stats", None)
+        return get_stats() if get_stats else {}
+
     async def _handle_connection(self, websocket):
         headers = dict(websocket.request.headers)
         if headers.get("device-id", None) is None:
@@ -88,22 +144,30 @@ class WebSocketServer:
             await websocket.send("认证失败")
             await websocket.close()
             return
-        # 创建ConnectionHandler时传入当前server实例
-        handler = ConnectionHandler(
-            self.config,
-            self._vad,
-            self._asr,
-            self._llm,
-            self._memory,
-            self._intent,
-            self,  # 传入server实例
-        )
-        self.active_connections.add(handler)
+        # 申请准入名额，超出初始化上限时短暂排队
+        ticket = await self.admission.admit()
+        if ticket is None:
+            await self._reject_busy(websocket)
+            return
+        handler = None
         try:
+            # 创建ConnectionHandler时传入当前server实例
+            handler = ConnectionHandler(
+                self.config,
+                self._vad,
+                self._asr,
+                self._llm,
+                self._memory,
+                self._intent,
+                self,  # 传入server实例
+            )
+            handler.on_initialized = ticket.initialized
+            self.active_connections.add(handler)
             await handler.handle_connection(websocket)
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"处理连接时出错: {e}")
         finally:
+            ticket.release()
             # 确保从活动连接集合中移除
             self.active_connections.discard(handler)
             # 强制关闭连接（如果还没有关闭的话）
@@ -121,9 +185,25 @@ class WebSocketServer:
                     f"服务器端强制关闭连接时出错: {close_error}"
                 )
 
+    async def _reject_busy(self, websocket):
+        """握手后才发现过载时，以1013(Try Again Later)关闭，原因中带上建议的重试时间"""
+        retry_after = self.admission.retry_after_seconds()
+        try:
+            await websocket.close(1013, f"server busy, retry after {retry_after}s")
+        except Exception:
+            pass
+
     async def _http_response(self, websocket, request_headers):
         # 检查是否为 WebSocket 升级请求
         if request_headers.headers.get("connection", "").lower() == "upgrade":
+            if self.admission.overloaded():
+                # 过载时不进行握手，直接返回503和带随机抖动的Retry-After
+                self.admission.reject("服务器过载")
+                response = websocket.respond(503, "Server busy, retry later\n")
+                response.headers["Retry-After"] = str(
+                    self.admission.retry_after_seconds()
+                )
+                return response
             # 如果是 WebSocket 请求，返回 None 允许握手继续
             return None
         else:
@@ -0,0 +1,105 @@
+import json
+import subprocess
+import sys
+from tabulate import tabulate
+
+description = "VAD后端启动开销测试（torch与onnxruntime的导入耗时、内存占用对比）"
+
+MODEL_DIR = "models/snakers4_silero-vad"
+INFER_ROUNDS = 200
+
+# 在独立子进程中执行，保证每个后端都是冷启动
+BENCH_SCRIPT = r"""
+import json, os, sys, time
+import psutil
+process = psutil.Process(os.getpid())
+rss_base = process.memory_info().rss
+backend, model_dir, rounds = sys.argv[1], sys.argv[2], int(sys.argv[3])
+
+start = time.perf_counter()
+import numpy as np
+if backend == "silero":
+    import torch
+    import_time = time.perf_counter() - start
+    start = time.perf_counter()
+    model, _ = torch.hub.load(repo_or_dir=model_dir, source="local", model="silero_vad", force_reload=False)
+    load_time = time.perf_counter() - start
+    def infer(x):
+        with torch.no_grad():
+            return model(torch.from_numpy(x), 16000)
+else:
+    import onnxruntime
+    import_time = time.perf_counter() - start
+    start = time.perf_counter()
+    opts = onnxruntime.SessionOptions()
+    opts.inter_op_num_threads = 1
+    opts.intra_op_num_threads = 1
+    session = onnxruntime.InferenceSession(
+        os.path.join(model_dir, "src", "silero_vad", "data", "silero_vad.onnx"),
+        sess_options=opts, providers=["CPUExecutionProvider"],
+    )
+    load_time = time.perf_counter() - start
+    state = np.zeros((2, 1, 128), dtype=np.float32)
+    sr = np.array(16000, dtype=np.int64)
+    def infer(x):
+        global state
+        out, state = session.run(None, {"input": np.concatenate([np.zeros((1, 64), dtype=np.float32), x], axis=1), "state": state, "sr": sr})
+        return out
+
+chunk = (np.random.randn(1, 512) * 0.01).astype(np.float32)
+infer(chunk)
+start = time.perf_counter()
+for _ in range(rounds):
+    infer(chunk)
+infer_time = (time.perf_counter() - start) / rounds
+
+print(json.dumps({
+    "import_time": import_time,
+    "load_time": load_time,
+    "infer_time": infer_time,
+    "rss_mb": (process.memory_info().rss - rss_base) / 1024 / 1024,
+}))
+"""
+
+
+def run_backend(backend: str):
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", BENCH_SCRIPT, backend, MODEL_DIR, str(INFER_ROUNDS)],
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+        if result.returncode != 0:
+            print(f"{backend} 测试失败: {result.stderr.strip()[-500:]}")
+            return None
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    except Exception as e:
+        print(f"{backend} 测试失败: {e}")
+        return None
+
+
+def main():
+    table_data = []
+    for backend in ("silero", "silero_onnx"):
+        print(f"正在测试 {backend} ...")
+        stats = run_backend(backend)
+        if stats is None:
+            table_data.append([backend, "失败", "失败", "失败", "失败"])
+            continue
+        table_data.append(
+            [
+                backend,
+                f"{stats['import_time']:.3f}s",
+                f"{stats['load_time']:.3f}s",
+                f"{stats['rss_mb']:.1f}MB",
+                f"{stats['infer_time'] * 1000:.3f}ms",
+            ]
+        )
+
+    headers = ["VAD类型", "导入耗时", "模型加载耗时", "新增内存(RSS)", "单块推理耗时"]
+    print(tabulate(table_data, headers=headers, tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+admission = pytest.importorskip("core.utils.admission")
+AdmissionController = admission.AdmissionController
+
+
+def test_rejects_when_connections_full():
+    async def run():
+        controller = AdmissionController(max_connections=2)
+        first = await controller.admit()
+        second = await controller.admit()
+        assert first and second
+        assert controller.overloaded()
+        assert await controller.admit() is None
+
+        # 重复release只归还一次名额
+        first.release()
+        first.release()
+        assert controller.active == 1
+        assert await controller.admit() is not None
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.get_stats()["rejected"] == 1
+    assert controller.get_stats()["admitted"] == 3
+
+
+def test_waiter_receives_init_slot_in_order():
+    async def run():
+        controller = AdmissionController(max_initializing=1, max_waiting=1)
+        first = await controller.admit()
+        waiting = asyncio.create_task(controller.admit())
+        await asyncio.sleep(0)
+        assert controller.get_stats()["waiting"] == 1
+        # 初始化名额和等待队列都满了
+        assert controller.overloaded()
+        assert await controller.admit() is None
+
+        first.initialized()
+        second = await waiting
+        assert second is not None
+        # 名额直接转交给等待者，初始化中的数量不变
+        assert controller.initializing == 1
+        second.initialized()
+        assert controller.initializing == 0
+        assert controller.active == 2
+
+    asyncio.run(run())
+
+
+def test_wait_timeout_rejects_and_restores_counts():
+    async def run():
+        controller = AdmissionController(
+            max_initializing=1, max_waiting=4, wait_timeout=0.05
+        )
+        first = await controller.admit()
+        assert await controller.admit() is None
+        assert controller.get_stats() == {
+            "active": 1,
+            "initializing": 1,
+            "waiting": 0,
+            "admitted": 1,
+            "rejected": 1,
+            "queued": 1,
+        }
+        first.release()
+        assert (controller.active, controller.initializing) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_retry_after_adds_bounded_jitter():
+    controller = AdmissionController(retry_after=5, retry_jitter=10)
+    values = {controller.retry_after_seconds() for _ in range(200)}
+    assert min(values) >= 5 and max(values) <= 15
+    assert len(values) > 1
+    assert AdmissionController(retry_after=3, retry_jitter=0).retry_after_seconds() == 3
+
+
+def test_from_config_falls_back_on_empty_values():
+    controller = AdmissionController.from_config(
+        {"max_connections": "", "max_initializing": 8}
+    )
+    assert controller.max_connections == 0
+    assert controller.max_initializing == 8
+    assert controller.max_waiting == 64
@@ -0,0 +1,104 @@
+import io
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+audio_decoder = pytest.importorskip("core.utils.audio_decoder")
+
+FRAME_BYTES = audio_decoder.FRAME_BYTES
+StreamingResampler = audio_decoder.StreamingResampler
+StreamingAudioDecoder = audio_decoder.StreamingAudioDecoder
+
+
+def sine(rate, seconds, freq=440.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def resample_in_chunks(resampler, samples, sizes):
+    out, start, index = [], 0, 0
+    while start < len(samples):
+        size = sizes[index % len(sizes)]
+        out.append(resampler.process(samples[start : start + size]))
+        start += size
+        index += 1
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize("in_rate", [8000, 22050, 24000, 44100, 48000])
+def test_resampler_output_length_matches_rate(in_rate):
+    samples = sine(in_rate, 1.0)
+    out = resample_in_chunks(StreamingResampler(in_rate), samples, [1000, 333, 4097])
+    assert abs(len(out) - 16000) <= 2
+
+
+@pytest.mark.parametrize("in_rate", [8000, 24000, 48000])
+def test_chunk_boundaries_do_not_change_output(in_rate):
+    samples = sine(in_rate, 0.5)
+    whole = StreamingResampler(in_rate).process(samples)
+    chunked = resample_in_chunks(StreamingResampler(in_rate), samples, [1, 7, 500, 129])
+    # 分块边界处不能出现跳变，结果应与一次性处理一致
+    assert len(chunked) == len(whole)
+    assert np.allclose(chunked, whole, atol=1e-5)
+
+
+def test_downsampled_sine_is_continuous():
+    out = resample_in_chunks(StreamingResampler(48000), sine(48000, 1.0), [960, 17])
+    steady = out[200:]
+    # 440Hz正弦在16kHz下相邻采样点的最大差值约为0.5*2π*440/16000≈0.086
+    assert np.max(np.abs(np.diff(steady))) < 0.1
+    assert 0.45 < np.max(np.abs(steady)) < 0.55
+
+
+def test_same_rate_passes_through():
+    samples = sine(16000, 0.1)
+    assert StreamingResampler(16000).process(samples) is samples
+
+
+def make_wav(rate, channels, pcm):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def decode(data, piece, file_type="wav"):
+    frames = []
+    decoder = StreamingAudioDecoder(file_type, False, frames.append)
+    for start in range(0, len(data), piece):
+        decoder.feed(data[start : start + piece])
+    decoder.finish()
+    return frames
+
+
+def test_wav_split_into_padded_frames():
+    pcm = (np.arange(2500, dtype="<i2") % 1000).tobytes()
+    frames = decode(make_wav(16000, 1, pcm), piece=7)
+    assert all(len(frame) == FRAME_BYTES for frame in frames)
+    joined = b"".join(frames)
+    assert len(frames) == -(-len(pcm) // FRAME_BYTES)
+    assert joined[: len(pcm)] == pcm
+    assert joined[len(pcm) :] == b"\x00" * (len(joined) - len(pcm))
+
+
+def test_stereo_wav_is_resampled_to_16k_mono():
+    left = (sine(48000, 0.6) * 32767).astype("<i2")
+    stereo = np.stack([left, left], axis=1).tobytes()
+    frames = decode(make_wav(48000, 2, stereo), piece=1000)
+    samples = len(b"".join(frames)) // 2
+    assert abs(samples - 9600) <= len(frames) and samples % 960 == 0
+
+
+def test_close_stops_output():
+    frames = []
+    decoder = StreamingAudioDecoder("pcm", False, frames.append)
+    decoder.feed(b"\x01\x00" * 1500)
+    assert len(frames) == 1
+    decoder.close()
+    decoder.feed(b"\x01\x00" * 2000)
+    decoder.finish()
+    assert len(frames) == 1
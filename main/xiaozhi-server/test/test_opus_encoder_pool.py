@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("opuslib_next")
+
+from core.utils import opus_encoder_utils
+from core.utils.opus_encoder_utils import OpusEncoderPool, OpusEncoderUtils
+
+SAMPLE_RATE = 16000
+FRAME_MS = 60
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 * 2
+
+
+def test_released_encoder_is_reused_for_same_params():
+    pool = OpusEncoderPool()
+    key, encoder = pool.acquire(SAMPLE_RATE, 1, 24000, 10)
+    pool.release(key, encoder)
+    assert pool.acquire(SAMPLE_RATE, 1, 24000, 10) == (key, encoder)
+    # 参数不同时不会拿到同一个编码器
+    other_key, other = pool.acquire(SAMPLE_RATE, 1, 32000, 10)
+    assert other_key != key and other is not encoder
+
+
+def test_idle_encoders_are_capped():
+    pool = OpusEncoderPool(max_idle=1)
+    acquired = [pool.acquire(SAMPLE_RATE, 1) for _ in range(2)]
+    for key, encoder in acquired:
+        pool.release(key, encoder)
+    assert len(pool._idle[acquired[0][0]]) == 1
+
+
+def test_stream_encoding_pads_last_frame():
+    encoder = OpusEncoderUtils(SAMPLE_RATE, 1, FRAME_MS)
+    packets = []
+    pcm = b"\x01\x00" * (FRAME_BYTES // 2 * 3 + 100)
+    # 分两次送入，跨越帧边界
+    encoder.encode_pcm_to_opus_stream(pcm[:1000], False, packets.append)
+    encoder.encode_pcm_to_opus_stream(pcm[1000:], True, packets.append)
+    assert len(packets) == 4
+    assert all(isinstance(packet, bytes) and packet for packet in packets)
+    encoder.close()
+
+
+def test_encoding_after_close_reacquires_encoder():
+    encoder = OpusEncoderUtils(SAMPLE_RATE, 1, FRAME_MS)
+    first = encoder.encoder
+    encoder.close()
+    encoder.close()
+    assert encoder.encoder is None
+    assert first in opus_encoder_utils.encoder_pool._idle[encoder._pool_key]
+
+    packets = []
+    encoder.encode_pcm_to_opus_stream(b"\x00" * FRAME_BYTES, True, packets.append)
+    assert len(packets) == 1
+    assert encoder.encoder is not None
+    encoder.close()
@@ -0,0 +1,64 @@
+import time
+
+from core.utils.sentence_segmenter import SentenceSegmenter
+
+PUNCTUATIONS = ("。", "？", "?", "！", "!", "；", ";", "：")
+FIRST_PUNCTUATIONS = ("，", ",", "、") + PUNCTUATIONS
+
+
+def make_segmenter(max_chars=0, max_ms=0):
+    return SentenceSegmenter(PUNCTUATIONS, FIRST_PUNCTUATIONS, max_chars, max_ms)
+
+
+def test_first_segment_cut_at_first_punctuation():
+    segmenter = make_segmenter()
+    segmenter.append("你好，今天天气")
+    assert segmenter.pop_segment() == "你好，"
+    segmenter.append("不错。明天")
+    assert segmenter.pop_segment() == "今天天气不错。"
+    assert segmenter.pop_segment() is None
+    assert segmenter.take_remaining() == "明天"
+
+
+def test_time_budget_cuts_at_word_boundary():
+    segmenter = make_segmenter(max_ms=10)
+    segmenter.append("Hello wor")
+    time.sleep(0.02)
+    assert segmenter.time_until_flush() == 0
+    assert segmenter.pop_segment() == "Hello "
+
+
+def test_single_word_without_punctuation_does_not_spin():
+    segmenter = make_segmenter(max_ms=10)
+    segmenter.append("Absolutely")
+    time.sleep(0.02)
+    # 预算到期但只有一个单词，无法切分
+    assert segmenter.pop_segment() is None
+    # 新文本到来前不再要求立即唤醒
+    assert segmenter.time_until_flush() is None
+    assert segmenter.pop_segment() is None
+
+    segmenter.append(" sure")
+    assert segmenter.time_until_flush() == 0
+    assert segmenter.pop_segment() == "Absolutely "
+
+
+def test_long_single_token_waits_for_more_text():
+    segmenter = make_segmenter(max_chars=20, max_ms=10)
+    segmenter.append("a" * 29)
+    time.sleep(0.02)
+    assert segmenter.pop_segment() is None
+    assert segmenter.time_until_flush() is None
+    segmenter.append("，")
+    assert segmenter.pop_segment() == "a" * 29 + "，"
+
+
+def test_reset_clears_pending_first_segment_budget():
+    segmenter = make_segmenter(max_ms=10)
+    segmenter.append("你好啊")
+    time.sleep(0.02)
+    assert segmenter.time_until_flush() == 0
+    # 打断时重置，预算不再要求立即唤醒
+    segmenter.reset()
+    assert segmenter.time_until_flush() is None
+    assert segmenter.pop_segment() is None
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+tts_cache = pytest.importorskip("core.utils.tts_cache")
+TTSAudioCache = tts_cache.TTSAudioCache
+
+MB = 1024 * 1024
+
+
+def test_concurrent_misses_synthesize_once():
+    cache = TTSAudioCache()
+    key = cache.make_key("edge", {"voice": "a"}, "你好")
+    frames, owner = cache.acquire(key)
+    assert frames is None and owner
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(cache.acquire(key)))
+    waiter.start()
+    cache.release(key, [b"\x01\x02", b"\x03"])
+    waiter.join(timeout=5)
+
+    # 等待者拿到合成结果，不再自行合成
+    assert results == [([b"\x01\x02", b"\x03"], False)]
+    assert cache.acquire(key) == ([b"\x01\x02", b"\x03"], False)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_failed_synthesis_releases_waiters_without_caching():
+    cache = TTSAudioCache()
+    key = cache.make_key("edge", {}, "好的")
+    assert cache.acquire(key) == (None, True)
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(cache.acquire(key)))
+    waiter.start()
+    cache.release(key, None)
+    waiter.join(timeout=5)
+
+    # 合成失败时等待者自行合成，下一次请求重新负责合成
+    assert results == [(None, False)]
+    assert cache.acquire(key) == (None, True)
+
+
+def test_waiter_gives_up_after_wait_timeout():
+    cache = TTSAudioCache(wait_timeout=0.05)
+    key = cache.make_key("edge", {}, "再见")
+    assert cache.acquire(key) == (None, True)
+    assert cache.acquire(key) == (None, False)
+
+
+def test_lru_eviction_keeps_byte_accounting():
+    cache = TTSAudioCache(max_memory_mb=10 / MB)
+    for key in ("a", "b"):
+        cache.acquire(key)
+        cache.release(key, [b"x" * 4])
+    # 访问a后b成为最久未使用
+    assert cache.acquire("a")[0] == [b"x" * 4]
+    cache.acquire("c")
+    cache.release("c", [b"y" * 4])
+
+    assert list(cache._memory) == ["a", "c"]
+    assert cache._memory_bytes == 8
+    assert cache.acquire("b") == (None, True)
+
+
+def test_oversized_entry_is_not_cached():
+    cache = TTSAudioCache(max_memory_mb=4 / MB)
+    cache.acquire("big")
+    cache.release("big", [b"z" * 5])
+    assert cache._memory_bytes == 0
+    assert cache.acquire("big") == (None, True)
+
+
+def test_disk_cache_round_trip(tmp_path):
+    frames = [b"\x00" * 3, b"\xff" * 300]
+    cache = TTSAudioCache(disk_dir=str(tmp_path))
+    key = cache.make_key("edge", {"voice": "a"}, "欢迎回来")
+    cache.acquire(key)
+    cache.release(key, frames)
+
+    # 新进程中的缓存从磁盘读取，读到后放入内存
+    reloaded = TTSAudioCache(disk_dir=str(tmp_path))
+    assert reloaded.acquire(key) == (frames, False)
+    assert key in reloaded._memory
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_key_ignores_whitespace_differences():
+    cache = TTSAudioCache(max_text_length=4)
+    assert cache.make_key("edge", {}, " 你好 ") == cache.make_key("edge", {}, "你好")
+    assert cache.make_key("edge", {"voice": "a"}, "你好") != cache.make_key(
+        "edge", {"voice": "b"}, "你好"
+    )
+    assert cache.cacheable("你好")
+    assert not cache.cacheable("   ")
+    assert not cache.cacheable("你好你好你")
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+tts_base = pytest.importorskip("core.providers.tts.base")
+
+from core.providers.tts.dto.dto import ContentType, SentenceType, TTSMessageDTO
+from core.utils.async_queue import AsyncQueue
+from core.utils.sentence_segmenter import SentenceSegmenter
+
+
+class CountingQueue(AsyncQueue):
+    def __init__(self):
+        super().__init__()
+        self.waits = 0
+
+    async def get_async(self, timeout=None):
+        self.waits += 1
+        return await super().get_async(timeout=timeout)
+
+
+def make_provider():
+    segmenter = SentenceSegmenter(("。",), ("，", "。"), first_max_ms=10)
+    spoken = []
+
+    async def speak(text):
+        spoken.append(text)
+
+    provider = SimpleNamespace(
+        conn=SimpleNamespace(stop_event=threading.Event(), client_abort=False),
+        tts_text_queue=CountingQueue(),
+        segmenter=segmenter,
+        tts_stop_request=False,
+        tts_audio_first_sentence=True,
+        spoken=spoken,
+    )
+    provider._get_segment_text = segmenter.pop_segment
+    provider._speak_segment = speak
+    return provider
+
+
+def text_message(sentence_type, text=None):
+    return TTSMessageDTO("s1", sentence_type, ContentType.TEXT, text)
+
+
+def test_abort_before_first_segment_does_not_spin():
+    async def run():
+        provider = make_provider()
+        queue = provider.tts_text_queue
+        queue.put(text_message(SentenceType.FIRST))
+        queue.put(text_message(SentenceType.MIDDLE, "你好啊"))
+        task = asyncio.create_task(
+            tts_base.TTSProviderBase.tts_text_consumer(provider)
+        )
+        await asyncio.sleep(0)
+        # 首句切出之前被打断
+        provider.conn.client_abort = True
+        await asyncio.sleep(0.2)
+        waits = queue.waits
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return provider, waits
+
+    provider, waits = asyncio.run(run())
+    # 被打断后一直阻塞等待下一条消息，而不是不停地零超时轮询
+    assert waits < 10
+    assert provider.spoken == []
+    assert len(provider.segmenter) == 0
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+worker_pools = pytest.importorskip("core.utils.worker_pools")
+WorkerPool = worker_pools.WorkerPool
+
+
+def block_pool(pool):
+    """占住线程池唯一的线程，返回放行用的Event"""
+    gate = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        gate.wait(5)
+
+    future = pool.submit("gate", hold)
+    assert started.wait(5)
+    return gate, future
+
+
+def test_devices_take_turns():
+    pool = WorkerPool("test-fair", max_workers=1)
+    gate, _ = block_pool(pool)
+    order = []
+    futures = [pool.submit("a", order.append, f"a{i}") for i in range(3)]
+    futures += [pool.submit("b", order.append, f"b{i}") for i in range(2)]
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    # 排队的任务按设备轮转取出，不会先跑完a的所有任务
+    assert order == ["a0", "b0", "a1", "b1", "a2"]
+
+
+def test_max_per_device_limits_concurrency():
+    pool = WorkerPool("test-per-device", max_workers=4, max_per_device=2)
+    lock = threading.Lock()
+    running = {"device": 0, "other": 0}
+    peak = {"device": 0, "other": 0}
+
+    def task(key):
+        with lock:
+            running[key] += 1
+            peak[key] = max(peak[key], running[key])
+        time.sleep(0.05)
+        with lock:
+            running[key] -= 1
+
+    futures = [pool.submit("device", task, "device") for _ in range(6)]
+    futures.append(pool.submit("other", task, "other"))
+    for future in futures:
+        future.result(timeout=5)
+    # 同一设备最多同时运行2个，其他设备不受影响
+    assert peak == {"device": 2, "other": 1}
+    stats = pool.get_stats()
+    assert stats["completed"] == 7
+    assert stats["devices"] == 0
+
+
+def test_rejects_when_queue_full():
+    pool = WorkerPool("test-queue", max_workers=1, max_queue=1)
+    gate, _ = block_pool(pool)
+    queued = pool.submit("a", lambda: "ok")
+    rejected = pool.submit("b", lambda: "never")
+    with pytest.raises(RuntimeError):
+        rejected.result(timeout=1)
+    gate.set()
+    assert queued.result(timeout=5) == "ok"
+    stats = pool.get_stats()
+    assert stats["rejected"] == 1
+    assert stats["max_queued"] == 1
+
+
+def test_task_failure_is_counted_and_propagated():
+    pool = WorkerPool("test-fail", max_workers=1)
+
+    def boom():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        pool.submit("a", boom).result(timeout=5)
+    assert pool.submit("a", lambda: 1).result(timeout=5) == 1
+    stats = pool.get_stats()
+    assert (stats["failed"], stats["completed"]) == (1, 1)